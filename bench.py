@@ -0,0 +1,576 @@
+#!/usr/bin/env python
+""" Timing evaluation for the generation engines of rng.py & wl.py
+
+    Compares how many numbers per second every engine in rng.ENGINES produces
+    for counts of 10^min_exp through 10^max_exp, or with --passphrases, how
+    batch passphrase generation in wl.py scales over the same counts.
+
+    With --scaling, times a job of 10^max_exp numbers (or passphrases) split
+    across 1 up to every core with parallel.py, to see where speedup flattens.
+
+    With --startup, times interpreter startup of the command line tools
+    (best of --repeat runs each) against a bare interpreter, and the cost per
+    request of a single 'cli.py --stdin-batch' process answering many.
+
+    With --suite, runs the regression suite: RandomNumbers throughput over
+    several counts & range widths (also deduplicated by a bloom.py filter),
+    the cost of adding values to a Bloom filter, read_random_words latency
+    against wordlist size, print_stats cost and peak memory (tracemalloc).
+    Results can be saved as JSON and compared against a stored baseline,
+    failing (exit code 1) on any case slower or larger than the baseline by
+    more than --threshold.
+
+    Usage:
+        python bench.py --max-exp 8 --percall-max-exp 7
+        python bench.py --passphrases wordlist.txt --max-exp 6
+        python bench.py --scaling --max-exp 7 [--passphrases wordlist.txt]
+        python bench.py --startup [--passphrases wordlist.txt]
+        python bench.py --suite [--quick] [--json-out results.json]
+        python bench.py --suite --save-baseline
+"""
+
+################################################################################
+## Imports
+################################################################################
+
+from contextlib import ExitStack, redirect_stdout
+import gc
+import io
+import json
+import optparse
+import os
+import platform
+import random
+import subprocess
+import sys
+from sys import exit
+import tempfile
+from time import perf_counter, strftime
+import tracemalloc
+import bloom
+import drbg
+import rng
+import rngstats
+import wl
+
+
+
+################################################################################
+## Module Constants
+################################################################################
+
+# the baseline --suite compares against unless given another one
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+        'bench_baseline.json')
+
+# timings may differ from the baseline by this many seconds before they can
+# count as a regression, as sub-millisecond cases are mostly timer noise
+NOISE_FLOOR = 0.001
+
+# the directory every tool's script lives in
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# the range widths RandomNumbers throughput is measured over
+SUITE_RANGES = {
+    'small': (1, 10),
+    'word': (0, 65535),
+    'wide': (0, 2**40),
+    'huge': (0, 2**80),
+}
+
+
+
+################################################################################
+## Module Functions
+################################################################################
+
+def time_engine(engine, count, min=1, max=10):
+    """ Times the generation of 'count' numbers by a single engine
+
+    Args:
+        engine (str): the name of an engine in rng.ENGINES
+        count (int): the amount of numbers to generate
+        min (int): the minimum value (inclusive) of the numbers
+        max (int): the maximum value (inclusive) of the numbers
+
+    Returns:
+        float: the elapsed wall time in seconds
+    """
+    start = perf_counter()
+    rng.RandomNumbers(count=count, min=min, max=max, engine=engine)
+    return perf_counter() - start
+
+def compare_engines(counts, min=1, max=10, percall_limit=None):
+    """ Times every engine over every count
+
+    Args:
+        counts ([int]): the amounts of numbers to generate
+        min (int): the minimum value (inclusive) of the numbers
+        max (int): the maximum value (inclusive) of the numbers
+        percall_limit (int): counts above this skip the 'secrets' engine,
+            which is too slow to be practical at large counts
+
+    Returns:
+        [(int, {str: float})]: per count, the seconds taken by each engine
+    """
+    results = []
+    for count in counts:
+        times = {}
+        for engine in rng.ENGINES:
+            if engine == 'secrets' and percall_limit and count > percall_limit:
+                continue
+            times[engine] = time_engine(engine, count, min, max)
+        results.append((count, times))
+    return results
+
+def format_comparison(results):
+    """ Formats the results of compare_engines() into a throughput table
+    """
+    engines = list(rng.ENGINES)
+    lines = ["{:>12}".format("count") +
+            "".join("{:>16}".format(e + " n/s") for e in engines) +
+            "{:>10}".format("speedup")]
+    for count, times in results:
+        line = "{:>12}".format(count)
+        for engine in engines:
+            if engine in times:
+                line += "{:>16,.0f}".format(count / times[engine])
+            else:
+                line += "{:>16}".format("skipped")
+        if 'secrets' in times:
+            line += "{:>9.1f}x".format(times['secrets'] / times['bulk'])
+        lines.append(line)
+    return "\n".join(lines)
+
+def time_passphrases(words, batches, count=5):
+    """ Times batch passphrase generation for every batch size
+
+    Args:
+        words (object): any of the valid data types of wl.read_words()
+        batches ([int]): the amounts of passphrases to generate
+        count (int): the number of words per passphrase
+
+    Returns:
+        [(int, float)]: per batch size, the seconds taken
+    """
+    # load the wordlist into the cache upfront so only generation is timed
+    wl.read_words(words)
+    results = []
+    for batch in batches:
+        start = perf_counter()
+        for null in wl.generate_passphrases(words, batch, count):
+            pass
+        results.append((batch, perf_counter() - start))
+    return results
+
+def format_passphrases(results):
+    """ Formats the results of time_passphrases() into a scaling table
+    """
+    lines = ["{:>12}{:>12}{:>16}{:>14}".format(
+        "batch", "seconds", "phrases/s", "us/phrase")]
+    for batch, seconds in results:
+        lines.append("{:>12}{:>12.4f}{:>16,.0f}{:>14.3f}".format(
+            batch, seconds, batch / seconds, seconds / batch * 1e6))
+    return "\n".join(lines)
+
+
+def time_scaling(count, words=None, max_jobs=None, min=1, max=10):
+    """ Times one job split across 1 up to 'max_jobs' worker processes
+
+    Args:
+        count (int): the amount of numbers (or passphrases) to generate
+        words (object): a wordlist to time passphrases from instead of numbers
+        max_jobs (int): the most worker processes to try [default = cores]
+        min (int): the minimum value (inclusive) of the numbers
+        max (int): the maximum value (inclusive) of the numbers
+
+    Returns:
+        [(int, float)]: per number of jobs, the seconds taken
+    """
+    results = []
+    for jobs in range(1, (max_jobs or os.cpu_count() or 1) + 1):
+        start = perf_counter()
+        if words is None:
+            for null in rng.stream_numbers(count, min, max, jobs=jobs):
+                pass
+        else:
+            for null in wl.generate_passphrases(words, count, jobs=jobs):
+                pass
+        results.append((jobs, perf_counter() - start))
+    return results
+
+def format_scaling(results):
+    """ Formats the results of time_scaling() into a speedup table
+    """
+    base = results[0][1]
+    lines = ["{:>6}{:>12}{:>10}{:>12}".format(
+        "jobs", "seconds", "speedup", "efficiency")]
+    for jobs, seconds in results:
+        lines.append("{:>6}{:>12.4f}{:>9.2f}x{:>11.0%}".format(
+            jobs, seconds, base / seconds, base / seconds / jobs))
+    return "\n".join(lines)
+
+
+def startup_commands(words=None):
+    """ Returns the (name, argv) of every command time_startup() times
+    """
+    python = sys.executable
+    commands = [
+        ("python -c pass", [python, '-c', 'pass']),
+        ("import rng", [python, '-c', 'import rng']),
+        ("import wl", [python, '-c', 'import wl']),
+        ("rng.py -n 1", [python, os.path.join(HERE, 'rng.py'), '-n', '1']),
+        ("cli.py rng -n 1", [python, os.path.join(HERE, 'cli.py'), 'rng', '-n', '1']),
+    ]
+    if words:
+        commands.append(("wl.py -b 1", [python, os.path.join(HERE, 'wl.py'),
+            '-i', words, '-b', '1']))
+    return commands
+
+def time_startup(commands, repeat=5):
+    """ Times how long each command takes to run from start to exit
+
+    Returns:
+        [(str, float)]: per command name, the best of 'repeat' wall times
+    """
+    results = []
+    for name, argv in commands:
+        times = []
+        for null in range(repeat):
+            start = perf_counter()
+            subprocess.run(argv, cwd=HERE, stdout=subprocess.DEVNULL, check=True)
+            times.append(perf_counter() - start)
+        results.append((name, min(times)))
+    return results
+
+def time_batch(requests=1000):
+    """ Times a single 'cli.py --stdin-batch' process answering 'requests'
+    number requests (a random number each)
+
+    Returns:
+        float: the seconds per request, startup included
+    """
+    lines = b'{"op": "numbers", "count": 1, "min": 1, "max": 10}\n' * requests
+    start = perf_counter()
+    subprocess.run([sys.executable, os.path.join(HERE, 'cli.py'), '--stdin-batch'],
+            input=lines, cwd=HERE, stdout=subprocess.DEVNULL, check=True)
+    return (perf_counter() - start) / requests
+
+def format_startup(results, per_request=None):
+    """ Formats the results of time_startup() next to a bare interpreter
+    """
+    base = results[0][1]
+    lines = ["{:<24}{:>12}{:>14}".format("command", "ms", "over python")]
+    for name, seconds in results:
+        lines.append("{:<24}{:>12.1f}{:>+14.1f}".format(
+            name, seconds * 1000, (seconds - base) * 1000))
+    if per_request is not None:
+        lines.append("{:<24}{:>12.3f}".format("--stdin-batch request", per_request * 1000))
+    return "\n".join(lines)
+
+
+def best_of(fn, repeat):
+    """ Returns the fastest wall time in seconds of 'repeat' calls of fn,
+    with the garbage collector paused like timeit does
+    """
+    times = []
+    gc.collect()
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for null in range(repeat):
+            start = perf_counter()
+            fn()
+            times.append(perf_counter() - start)
+    finally:
+        if enabled:
+            gc.enable()
+    return min(times)
+
+def peak_memory(fn):
+    """ Returns the peak bytes allocated (tracemalloc) during a call of fn
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def write_wordlist(file_path, size, seed=0):
+    """ Writes a synthetic diceware style wordlist of 'size' words
+    """
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    gen = random.Random(seed)
+    with open(file_path, 'w') as file:
+        file.writelines("{}\t{}\n".format(i, ''.join(
+            gen.choices(letters, k=gen.randint(3, 9)))) for i in range(size))
+
+def suite_cases(directory, stack, quick=False):
+    """ Builds every case of the regression suite
+
+    Args:
+        directory (str): a scratch directory for the generated wordlists
+        stack (ExitStack): closes what the cases keep open, once they ran
+        quick (bool): drops the largest counts & wordlists
+
+    Returns:
+        [(str, str, callable)]: per case its name, its metric ('seconds' or
+            'peak_bytes') and the function to measure
+    """
+    counts = [10**4, 10**5] if quick else [10**4, 10**5, 10**6]
+    sizes = [10**3, 10**4, 10**5] if quick else [10**3, 10**4, 10**5, 10**6]
+    cases = []
+    for count in counts:
+        for name, (low, high) in SUITE_RANGES.items():
+            cases.append(("rng.bulk.n{}.{}".format(count, name), 'seconds',
+                lambda c=count, l=low, h=high: rng.RandomNumbers(c, l, h)))
+    cases.append(("rng.secrets.n{}.small".format(counts[0]), 'seconds',
+        lambda: rng.RandomNumbers(counts[0], 1, 10, engine='secrets')))
+    cases.append(("rng.drbg.n{}.small".format(counts[-1]), 'seconds',
+        lambda: rng.RandomNumbers(counts[-1], 1, 10,
+            randbytes=drbg.CounterDRBG(0))))
+    def deduped(count=counts[1]):
+        # a new filter every run, so the numbers are never seen already
+        with bloom.BloomFilter.create(os.path.join(directory, "seen.wlbf"),
+                count) as seen:
+            rng.RandomNumbers(count, 0, 2**40, seen=seen)
+    cases.append(("rng.bloom.n{}.wide".format(counts[1]), 'seconds', deduped))
+    # the filter alone, fresh values every run into one roomy filter
+    seen = stack.enter_context(bloom.BloomFilter.create(
+        os.path.join(directory, "added.wlbf"), 100 * counts[1]))
+    runs = [0]
+    def added(count=counts[1]):
+        start = runs[0]
+        runs[0] += count
+        seen.add_new(range(start, start + count))
+    cases.append(("bloom.add_new.n{}".format(counts[1]), 'seconds', added))
+
+    for size in sizes:
+        words = os.path.join(directory, "words{}.txt".format(size))
+        index = os.path.join(directory, "words{}.wlx".format(size))
+        write_wordlist(words, size)
+        wl.compile_wordlist(words, index)
+
+        def cold(words=words):
+            wl.wordlist_cache.clear()
+            wl.read_random_words(words)
+        cases.append(("wl.read_random_words.cold.w{}".format(size), 'seconds', cold))
+        cases.append(("wl.read_random_words.warm.w{}".format(size), 'seconds',
+            lambda words=words: wl.read_random_words(words)))
+        def mapped(index=index):
+            wl.wordlist_cache.clear()
+            wl.read_random_words(index)
+        cases.append(("wl.read_random_words.index.w{}".format(size), 'seconds', mapped))
+
+    for count in counts:
+        numbers = rng.RandomNumbers(count, 1, 10).numbers
+        def stats(numbers=numbers):
+            with redirect_stdout(io.StringIO()):
+                rngstats.StreamStats(numbers, min=1, max=10).print_stats()
+        cases.append(("rng.print_stats.n{}".format(count), 'seconds', stats))
+
+    big = counts[-1]
+    cases.append(("mem.rng.bulk.n{}".format(big), 'peak_bytes',
+        lambda: rng.RandomNumbers(big, 1, 10)))
+    def stream():
+        for null in rng.stream_numbers(big, 1, 10):
+            pass
+    cases.append(("mem.rng.stream.n{}".format(big), 'peak_bytes', stream))
+    def words():
+        wl.wordlist_cache.clear()
+        wl.read_words(os.path.join(directory, "words{}.txt".format(sizes[-1])))
+    cases.append(("mem.wl.read_words.w{}".format(sizes[-1]), 'peak_bytes', words))
+    return cases
+
+def run_suite(quick=False, repeat=5):
+    """ Runs the regression suite
+
+    Args:
+        quick (bool): drops the largest counts & wordlists
+        repeat (int): the number of runs each timing is the best of
+
+    Returns:
+        dict: 'meta' about the host, and 'results' mapping every case name
+            to its metric (ie. {'seconds': 0.01})
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as directory, ExitStack() as stack:
+        for name, metric, fn in suite_cases(directory, stack, quick):
+            if metric == 'seconds':
+                results[name] = {metric: best_of(fn, repeat)}
+            else:
+                results[name] = {metric: peak_memory(fn)}
+    wl.wordlist_cache.clear()
+    return {"meta": {"python": platform.python_version(),
+        "machine": platform.machine(), "system": platform.system(),
+        "cpus": os.cpu_count(), "date": strftime("%Y-%m-%d"), "quick": quick},
+        "results": results}
+
+def compare_suite(current, baseline, threshold=0.25):
+    """ Compares suite results against a baseline
+
+    Args:
+        current (dict): the results of run_suite()
+        baseline (dict): stored results of an earlier run_suite()
+        threshold (float): how much larger than the baseline a metric may get
+            before it counts as a regression, ie. 0.25 for 25%
+
+    Returns:
+        [(str, str, float, float, bool)]: per case in both, its name, metric,
+            baseline & current values and whether it regressed. Timings
+            within NOISE_FLOOR of the baseline never regress
+    """
+    rows = []
+    for name, metrics in current["results"].items():
+        if name not in baseline["results"]:
+            continue
+        for metric, value in metrics.items():
+            base = baseline["results"][name].get(metric)
+            if base is None:
+                continue
+            floor = NOISE_FLOOR if metric == 'seconds' else 0
+            rows.append((name, metric, base, value,
+                value > base * (1 + threshold) and value - base > floor))
+    return rows
+
+def format_suite(current, rows=None):
+    """ Formats the results of run_suite(), with a baseline comparison
+    """
+    compared = {(row[0], row[1]): row for row in rows or []}
+    lines = ["{:<40}{:>14}{:>14}{:>9}  {}".format(
+        "case", "value", "baseline", "change", "")]
+    for name, metrics in current["results"].items():
+        for metric, value in metrics.items():
+            fmt = "{:>12.3f}ms" if metric == 'seconds' else "{:>12,.0f}B "
+            scale = 1000 if metric == 'seconds' else 1
+            row = compared.get((name, metric))
+            if row is None:
+                lines.append("{:<40}".format(name) + fmt.format(value * scale))
+                continue
+            lines.append("{:<40}".format(name) + fmt.format(value * scale) +
+                    fmt.format(row[2] * scale) +
+                    "{:>+8.0%}  {}".format(value / row[2] - 1 if row[2] else 0,
+                        "REGRESSION" if row[4] else ""))
+    return "\n".join(lines)
+
+
+
+################################################################################
+## Main Execution
+################################################################################
+
+if __name__ == '__main__':
+    parser = optparse.OptionParser()
+    help_strings = {
+        "min_exp": "smallest count to time as a power of 10 [default = 3]",
+        "max_exp": "largest count to time as a power of 10 [default = 7]",
+        "percall_max_exp": "largest count (power of 10) to time the " +
+            "per-call secrets engine with [default = 7]",
+        "min": "sets the minimum value (inclusive) of random numbers [default = 1]",
+        "max": "sets the maximum value (inclusive) of random numbers [default = 10]",
+        "passphrases": "times batch passphrase generation from the given " +
+            "wordlist instead of the number engines",
+        "number": "sets the number of words per passphrase [default = 5]",
+        "scaling": "times a job of 10^max_exp items across 1 to every core",
+        "max_jobs": "sets the most worker processes --scaling tries " +
+            "[default = every core]",
+        "startup": "times the startup of the command line tools & the cost " +
+            "per request of a --stdin-batch process",
+        "suite": "runs the regression suite, comparing against the baseline",
+        "quick": "drops the largest counts & wordlists from the suite",
+        "repeat": "sets the number of runs each suite timing is the best of " +
+            "[default = 5]",
+        "json_out": "writes the suite results as JSON to the given path",
+        "baseline": "sets the baseline the suite compares against " +
+            "[default = bench_baseline.json]",
+        "save_baseline": "stores the suite results as the new baseline",
+        "threshold": "sets how much slower or larger than the baseline a " +
+            "case may get before failing, ie. 0.25 = 25% [default = 0.25]",
+        }
+
+    parser.add_option('--min-exp',
+            dest='min_exp', help=help_strings["min_exp"], type=int, default=3)
+    parser.add_option('--max-exp',
+            dest='max_exp', help=help_strings["max_exp"], type=int, default=7)
+    parser.add_option('--percall-max-exp',
+            dest='percall_max_exp', help=help_strings["percall_max_exp"],
+            type=int, default=7)
+    parser.add_option('-f', '--min',
+            dest='min', help=help_strings["min"], type=int, default=1)
+    parser.add_option('-c', '--max',
+            dest='max', help=help_strings["max"], type=int, default=10)
+    parser.add_option('-p', '--passphrases',
+            dest='passphrases', help=help_strings["passphrases"], type="string",
+            default=None)
+    parser.add_option('-n', '--number',
+            dest='number', help=help_strings["number"], type=int, default=5)
+    parser.add_option('--scaling',
+            dest='scaling', help=help_strings["scaling"], action="store_true",
+            default=False)
+    parser.add_option('--max-jobs',
+            dest='max_jobs', help=help_strings["max_jobs"], type=int, default=None)
+    parser.add_option('--startup',
+            dest='startup', help=help_strings["startup"], action="store_true",
+            default=False)
+    parser.add_option('--suite',
+            dest='suite', help=help_strings["suite"], action="store_true",
+            default=False)
+    parser.add_option('--quick',
+            dest='quick', help=help_strings["quick"], action="store_true",
+            default=False)
+    parser.add_option('--repeat',
+            dest='repeat', help=help_strings["repeat"], type=int, default=5)
+    parser.add_option('--json-out',
+            dest='json_out', help=help_strings["json_out"], type="string",
+            default=None)
+    parser.add_option('--baseline',
+            dest='baseline', help=help_strings["baseline"], type="string",
+            default=BASELINE_PATH)
+    parser.add_option('--save-baseline',
+            dest='save_baseline', help=help_strings["save_baseline"],
+            action="store_true", default=False)
+    parser.add_option('--threshold',
+            dest='threshold', help=help_strings["threshold"], type=float,
+            default=0.25)
+
+    (opts, args) = parser.parse_args()
+    counts = [10**e for e in range(opts.min_exp, opts.max_exp + 1)]
+    if opts.suite:
+        current = run_suite(opts.quick, opts.repeat)
+        if opts.json_out:
+            with open(opts.json_out, 'w') as file:
+                json.dump(current, file, indent=2)
+        if opts.save_baseline:
+            with open(opts.baseline, 'w') as file:
+                json.dump(current, file, indent=2)
+            print(format_suite(current))
+            exit(0)
+        rows = []
+        if os.path.isfile(opts.baseline):
+            with open(opts.baseline) as file:
+                rows = compare_suite(current, json.load(file), opts.threshold)
+        print(format_suite(current, rows))
+        regressions = [row for row in rows if row[4]]
+        if regressions:
+            print()
+            print("[ERROR]: {} case(s) regressed past the {:.0%} threshold".format(
+                len(regressions), opts.threshold))
+            exit(1)
+        exit(0)
+    if opts.startup:
+        print(format_startup(time_startup(startup_commands(opts.passphrases),
+            opts.repeat), time_batch()))
+        exit(0)
+    if opts.scaling:
+        print(format_scaling(time_scaling(10**opts.max_exp, opts.passphrases,
+            opts.max_jobs, opts.min, opts.max)))
+        exit(0)
+    if opts.passphrases:
+        print(format_passphrases(
+            time_passphrases(opts.passphrases, counts, opts.number)))
+        exit(0)
+    results = compare_engines(counts, opts.min, opts.max,
+            percall_limit=10**opts.percall_max_exp)
+    print(format_comparison(results))
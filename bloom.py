@@ -0,0 +1,565 @@
+#!/usr/bin/env python
+""" Persistent, memory-mapped Bloom filters to never issue a value twice
+
+    Generating passphrases or tokens in batches across days must not hand
+    out any value twice, but keeping every past value in a set doesn't
+    scale. A Bloom filter remembers them in a fixed amount of bits instead,
+    at the cost of a configurable false positive rate: a fresh value that
+    looks seen gets regenerated too, which only costs a redraw.
+
+    The filter is blocked: every value sets its bits in a single 512 bit
+    (cache line sized) block, split into four 128 bit sections. A value's
+    mask is a pattern in every section, each picked by its hash from a small
+    table derived from the filter's salt, so the amount of distinct masks
+    (2**48) keeps collisions between them far below the error rate. Filters
+    get sized for a capacity & error rate with the false positive rate of
+    such filters (a Poisson mixture over the values per block, see
+    blocked_error_rate()), about 41 bits per value at 1e-6.
+
+    Values get checked & added a batch at a time, with big integer & bytes
+    operations over the whole batch rather than a Python loop over it. Ints
+    below 2**64 (and their decimal strings) are their own 64 bit number,
+    anything else gets hashed to one with keyed BLAKE2b. Every number of a
+    batch sits in a 128 bit slot of one big integer, so a few multiplies
+    hash them all to their blocks & patterns, and a single OR tests & sets
+    all their blocks, read from & written back to the memory map in place.
+
+    BloomFilter.unique() drops the values a filter has seen & regenerates
+    them, which is how rng.py & wl.py deduplicate their output ('seen'
+    arguments, --bloom options).
+
+    File layout (all integers little-endian):
+        - magic (4 bytes): b'WLBF'
+        - version (uint32)
+        - hashes (uint32): the amount of bits every value sets
+        - blocks (uint64): the amount of 64 byte blocks
+        - count (uint64): the amount of values added
+        - salt (16 bytes): the key of the hash & the seed of the patterns
+        - padding up to 64 bytes, then every block back to back
+
+    Usage:
+        with open_filter('issued.wlbf', capacity=10**7) as seen:
+            fresh = seen.add_new(candidates)
+            numbers = rng.RandomNumbers(count=10**5, max=2**40, seen=seen)
+"""
+
+################################################################################
+## Imports
+################################################################################
+
+from array import array
+from collections import deque
+from functools import lru_cache
+import hashlib
+from itertools import chain, compress, count, islice, repeat
+from math import ceil, exp, lgamma, log
+import mmap
+from operator import ne
+import os
+import struct
+import sys
+import tempfile
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+
+################################################################################
+## Module Constants
+################################################################################
+
+MAGIC = b'WLBF'
+VERSION = 2
+EXTENSION = '.wlbf'
+DEFAULT_CAPACITY = 10**6
+DEFAULT_ERROR_RATE = 1e-6
+_HEADER = struct.Struct('<4sIIQQ16s20x')
+
+BLOCK_BITS = 512
+BLOCK_BYTES = BLOCK_BITS // 8
+
+# every mask is a pattern in each section of the block, picked from one table
+# by 12 bits of the hash per section
+_SECTIONS = 4
+_TABLE_BITS = 12
+SECTION_BITS = BLOCK_BITS // _SECTIONS
+SECTION_BYTES = SECTION_BITS // 8
+
+# ints below this are remembered as they are, anything else by a hash
+_NUMBERS = 1 << 64
+
+# the most bits a value may set, filter_size() picks the best multiple of
+# the sections up to it
+MAX_HASHES = 48
+
+# the amount of values checked & added at once
+CHUNK_SIZE = 4096
+
+# consecutive top ups without a single fresh value before giving up
+MAX_STALLS = 64
+
+# the drbg stream seeded runs draw their top ups from, no shard ever gets it
+TOP_UP_STREAM = (1 << 64) - 1
+
+# the mask of every bit position of a section
+_BITS = [1 << p for p in range(SECTION_BITS)]
+
+# a block read from or written to the memory map, & a batch of them split
+_BLOCK = struct.Struct('{}s'.format(BLOCK_BYTES))
+_BLOCKS = struct.Struct('{}s'.format(BLOCK_BYTES) * CHUNK_SIZE)
+
+# a 64 bit hash read as the 16 bit pattern index of every section, keeping
+# 12 bits of each
+_INDEX_MASK = sum(((1 << _TABLE_BITS) - 1) << 16 * i for i in range(_SECTIONS))
+
+
+
+################################################################################
+## Module Functions
+################################################################################
+
+def blocked_error_rate(load, hashes):
+    """ Returns the false positive rate of a blocked Bloom filter
+
+    Args:
+        load (float): the average amount of values per block
+        hashes (int): the amount of bits every value sets in its block,
+            the same amount in every section of the block
+
+    Returns:
+        float: the chance a fresh value looks seen, summed over the Poisson
+            distributed amount of values in its block, counting the chance
+            its pattern of a section was already set whole by another value
+    """
+    size = hashes // _SECTIONS
+    total = 0.0
+    j = 0
+    while True:
+        chance = exp(j * log(load) - load - lgamma(j + 1))
+        shared = 1 - (1 - 1 / (1 << _TABLE_BITS))**j
+        fill = 1 - (1 - size / SECTION_BITS)**j
+        rate = (shared + (1 - shared) * fill**size)**_SECTIONS
+        total += chance * rate
+        if j > load and chance < 1e-18:
+            return total
+        j += 1
+
+@lru_cache(maxsize=32)
+def filter_size(capacity, error_rate):
+    """ Works out the smallest filter holding 'capacity' values below an
+    error rate
+
+    Returns:
+        (int, int): the amount of blocks & the amount of bits per value
+    """
+    if capacity < 1 or not 0 < error_rate < 1:
+        raise ValueError("filters need a positive capacity & an error rate " +
+                "between 0 and 1")
+    best = None
+    for hashes in range(_SECTIONS, MAX_HASHES + 1, _SECTIONS):
+        # the most values per block that still meet the error rate
+        low, high = 1e-6, float(BLOCK_BITS)
+        for null in range(40):
+            middle = (low + high) / 2
+            if blocked_error_rate(middle, hashes) <= error_rate:
+                low = middle
+            else:
+                high = middle
+        blocks = ceil(capacity / low)
+        if best is not None and blocks > best[0]:
+            # the size only falls & then rises with the amount of hashes
+            break
+        if best is None or blocks < best[0]:
+            best = (blocks, hashes)
+    return best
+
+def _patterns(salt, hashes):
+    """ Builds the pattern table of a filter, deterministic from its salt
+
+    Returns:
+        [bytes]: the bytes of every pattern, as a section of a block
+    """
+    import drbg
+    source = drbg.CounterDRBG(salt)
+    bits = hashes // _SECTIONS
+    # every bit position is a byte, drawn for the whole table at once
+    masks = [_BITS[draw % SECTION_BITS] for draw in source(bits << _TABLE_BITS)]
+    patterns = [set(masks[i:i + bits]) for i in range(0, len(masks), bits)]
+    for pattern in patterns:
+        # positions drawn twice get redrawn, in order of the patterns
+        while len(pattern) < bits:
+            pattern.add(_BITS[source(1)[0] % SECTION_BITS])
+    return [sum(pattern).to_bytes(SECTION_BYTES, 'little')
+        for pattern in patterns]
+
+def _spread(value, slots):
+    """ Returns an int holding a value in each of its first 128 bit slots
+    """
+    return int.from_bytes(value.to_bytes(16, 'little') * slots, 'little')
+
+def top_up_source(seed=None, randbytes=None):
+    """ Returns the source of random bytes regenerating the values a filter
+    drops, so seeded runs with the same filter stay reproducible
+
+    Args:
+        seed (int, str or bytes): the seed of the run, if any
+        randbytes (callable): the source of random bytes of the run
+
+    Returns:
+        callable: a drbg.CounterDRBG on TOP_UP_STREAM of the seed, else
+            'randbytes' (which may be None)
+    """
+    if seed is None:
+        return randbytes
+    import drbg
+    return drbg.CounterDRBG(seed, TOP_UP_STREAM)
+
+def _key(item):
+    """ The bytes an item gets hashed as
+    """
+    if isinstance(item, bytes):
+        return item
+    if isinstance(item, int):
+        # bools as 0 & 1, the way array() reads them
+        return b'%d' % item
+    return str(item).encode('utf-8')
+
+def filter_path(file_path):
+    """ Returns the default filter path next to an output file
+    """
+    return file_path + EXTENSION
+
+def open_filter(file_path, capacity=DEFAULT_CAPACITY, error_rate=DEFAULT_ERROR_RATE):
+    """ Loads the filter at a path, creating it for a capacity & error rate
+    when there's none yet (an existing filter keeps its own size)
+
+    Returns:
+        BloomFilter: the memory-mapped, locked filter
+
+    Raises:
+        ValueError: when the filter is already open, see BloomFilter
+    """
+    if not os.path.isfile(file_path):
+        try:
+            return BloomFilter.create(file_path, capacity, error_rate,
+                    replace=False)
+        except FileExistsError:
+            # another process created it in the meantime, so share theirs
+            pass
+    return BloomFilter(file_path)
+
+
+
+################################################################################
+## Module Classes
+################################################################################
+
+class BloomFilter(object):
+    """ A persistent blocked Bloom filter, see the module docstring
+
+    Changes go straight to the memory map, flush() or close() store the
+    count. Loading takes an exclusive lock of the file (where fcntl exists)
+    until close(), so a filter open elsewhere, in this process or another,
+    gets refused instead of two writers losing each other's values.
+
+    Attributes:
+        path (str): the path of the filter file
+        hashes (int): the amount of bits every value sets
+        blocks (int): the amount of 512 bit blocks
+        count (int): the amount of values added
+        hits (int): the values found already seen since loading, true
+            duplicates and false positives alike
+    """
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'r+b')
+        try:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(self._file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    raise ValueError("{} is already open, a Bloom filter takes "
+                            "one writer at a time".format(path))
+            self._map = mmap.mmap(self._file.fileno(), 0)
+        except BaseException:
+            self._file.close()
+            raise
+        magic, version, hashes, blocks, count, salt = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            self._release()
+            raise ValueError("{} is not a version {} Bloom filter".format(
+                path, VERSION))
+        if len(self._map) != _HEADER.size + blocks * BLOCK_BYTES:
+            self._release()
+            raise ValueError("{} is truncated".format(path))
+        self.hashes = hashes
+        self.blocks = blocks
+        self.count = count
+        self.hits = 0
+        self._salt = salt
+        # copying a keyed state skips setting up the key for every item
+        self._hasher = hashlib.blake2b(digest_size=8, key=salt)
+        self._table = _patterns(salt, hashes)
+        keys = struct.unpack('<6Q', hashlib.blake2b(key=salt, digest_size=48,
+            person=b'folded-multiply').digest())
+        self._multipliers = keys[1::2]
+        # the constants of every slot of a batch, see _locate()
+        self._spreads = [_spread(value, CHUNK_SIZE) for value in ((1 << 64) - 1,
+            *keys[::2], (1 << 64) - BLOCK_BYTES, _HEADER.size, _INDEX_MASK)]
+
+    @classmethod
+    def create(cls, path, capacity=DEFAULT_CAPACITY, error_rate=DEFAULT_ERROR_RATE,
+            replace=True):
+        """ Creates an empty filter file for 'capacity' values at about
+        'error_rate' false positives
+
+        Args:
+            replace (bool): replaces any file at 'path', else raises
+                FileExistsError when there is one
+
+        Returns:
+            BloomFilter: the new filter
+        """
+        blocks, hashes = filter_size(capacity, error_rate)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)),
+                suffix='.tmp')
+        # mkstemp() creates files as 0600, filters get the usual permissions
+        umask = os.umask(0)
+        os.umask(umask)
+        try:
+            with open(fd, 'wb') as out:
+                os.chmod(tmp_path, 0o666 & ~umask)
+                out.write(_HEADER.pack(MAGIC, VERSION, hashes, blocks, 0,
+                    os.urandom(16)))
+                # a sparse file, the OS hands out zeroed pages as they're touched
+                out.truncate(_HEADER.size + blocks * BLOCK_BYTES)
+            if replace:
+                os.replace(tmp_path, path)
+            else:
+                # unlike a rename, linking never swaps out a filter in use
+                os.link(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        if not replace:
+            os.unlink(tmp_path)
+        return cls(path)
+
+    def _number(self, item):
+        """ Returns the 64 bit number an item gets remembered as
+        """
+        data = _key(item)
+        if data.isdigit() and len(data) <= 20:
+            value = int(data)
+            if value < _NUMBERS and data == b'%d' % value:
+                return value
+        state = self._hasher.copy()
+        state.update(data)
+        return int.from_bytes(state.digest(), 'little')
+
+    def _numbers(self, items):
+        """ Returns the numbers of a list of items (see _number()) as an array,
+        skipping the Python loop when they are all ints below 2**64 already
+        """
+        try:
+            return array('Q', items)
+        except (TypeError, OverflowError):
+            return array('Q', map(self._number, items))
+
+    def _locate(self, numbers):
+        """ Works out the blocks & masks of a batch of numbers at once
+
+        Args:
+            numbers (array): at most CHUNK_SIZE numbers, see _numbers()
+
+        Returns:
+            ([int], bytes): the offset of every number's block in the memory
+                map, and the masks of the blocks back to back
+        """
+        size = 16 * len(numbers)
+        spreads = self._spreads
+        if len(numbers) < CHUNK_SIZE:
+            spreads = [spread & (1 << 8 * size) - 1 for spread in spreads]
+        low, mix_key, block_key, mask_key, offsets, header, index = spreads
+        mix_mul, block_mul, mask_mul = self._multipliers
+        # every number in the low half of a 128 bit slot of one big int, so
+        # one multiply hashes them all: a keyed number times a key, the two
+        # halves of the product folded together with xor. Once to mix the
+        # numbers, then once for their blocks & once for their masks
+        slots = array('Q', bytes(size))
+        slots[::2] = numbers
+        x = int.from_bytes(slots, 'little')
+        x = (x ^ mix_key) * mix_mul
+        x = (x ^ x >> 64) & low
+        hashed = (x ^ block_key) * block_mul
+        hashed = (hashed ^ hashed >> 64) & low
+        # the high half of the hash times the amount of blocks, shifted 6 bits
+        # less, as offsets are multiples of the 64 bytes of a block
+        starts = ((hashed * self.blocks >> 58) & offsets) + header
+        starts = array('Q', starts.to_bytes(size, 'little'))[::2].tolist()
+        hashed = (x ^ mask_key) * mask_mul
+        hashed = (hashed ^ hashed >> 64) & index
+        hashed = array('Q', hashed.to_bytes(size, 'little'))[::2]
+        # the pattern of every section, a block's mask being them side by side
+        masks = b''.join(map(self._table.__getitem__,
+            array('H', hashed.tobytes())))
+        return starts, masks
+
+    def _insert(self, numbers):
+        """ Tests & sets the masks of a batch of numbers in their blocks
+
+        Returns:
+            [bool]: per number whether it wasn't seen before (nor earlier in
+                the batch)
+        """
+        starts, masks = self._locate(numbers)
+        buf = self._map
+        # every block tested & set at once, as one big int
+        old = b''.join(chain.from_iterable(map(_BLOCK.unpack_from,
+            repeat(buf), starts)))
+        new = (int.from_bytes(old, 'little')
+                | int.from_bytes(masks, 'little')).to_bytes(len(old), 'little')
+        split = _BLOCKS if len(starts) == CHUNK_SIZE else struct.Struct(
+                '{}s'.format(BLOCK_BYTES) * len(starts))
+        new = split.unpack(new)
+        fresh = list(map(ne, new, split.unpack(old)))
+        # numbers sharing a block would overwrite each other's bits, so only
+        # the first of every block gets written at once, the others after it
+        first = {}
+        later = list(compress(count(), map(ne,
+            map(first.setdefault, starts, count()), count())))
+        written = fresh
+        if later:
+            written = fresh.copy()
+            for i in later:
+                written[i] = False
+        deque(map(_BLOCK.pack_into, repeat(buf), compress(starts, written),
+            compress(new, written)), 0)
+        for i in later:
+            block = int.from_bytes(_BLOCK.unpack_from(buf, starts[i])[0],
+                    'little')
+            mask = int.from_bytes(masks[BLOCK_BYTES * i:BLOCK_BYTES * (i + 1)],
+                    'little')
+            fresh[i] = block & mask != mask
+            if fresh[i]:
+                _BLOCK.pack_into(buf, starts[i],
+                        (block | mask).to_bytes(BLOCK_BYTES, 'little'))
+        return fresh
+
+    def __contains__(self, item):
+        starts, masks = self._locate(self._numbers([item]))
+        block = int.from_bytes(_BLOCK.unpack_from(self._map, starts[0])[0],
+                'little')
+        mask = int.from_bytes(masks, 'little')
+        return block & mask == mask
+
+    def add(self, item):
+        """ Adds an item, returning True if it wasn't seen before
+        """
+        return bool(self.add_new([item]))
+
+    def add_new(self, items, key=None):
+        """ Adds a batch of items, keeping those that weren't seen before
+        (nor earlier in the batch)
+
+        Args:
+            items (iterable): the items, str, bytes or anything str() works
+                on, ie. int
+            key (callable): turns an item into what gets remembered of it,
+                ie. ' '.join for lists of words [default = the item]
+
+        Returns:
+            list: the fresh items, in order
+        """
+        items = items if isinstance(items, list) else list(items)
+        numbers = self._numbers(items if key is None else list(map(key, items)))
+        fresh = []
+        for start in range(0, len(items), CHUNK_SIZE):
+            fresh.extend(compress(items[start:start + CHUNK_SIZE],
+                self._insert(numbers[start:start + CHUNK_SIZE])))
+        self.hits += len(items) - len(fresh)
+        self.count += len(fresh)
+        return fresh
+
+    def unique(self, items, generate, key=None):
+        """ Yields every item not seen before, adding it, then makes up for
+        every dropped one with fresh items of generate()
+
+        Args:
+            items (iterable): the generated items
+            generate (callable): generate(n) returns 'n' more items
+            key (callable): see add_new()
+
+        Yields:
+            the fresh items, as many as 'items' had
+        """
+        items = iter(items)
+        missing = 0
+        while True:
+            chunk = list(islice(items, CHUNK_SIZE))
+            if not chunk:
+                break
+            fresh = self.add_new(chunk, key)
+            missing += len(chunk) - len(fresh)
+            yield from fresh
+        stalls = 0
+        while missing:
+            fresh = self.add_new(list(generate(missing)), key)
+            missing -= len(fresh)
+            stalls = 0 if fresh else stalls + 1
+            if stalls >= MAX_STALLS:
+                raise ValueError("every new value is already in the Bloom " +
+                        "filter, the range of values is used up or the filter is full")
+            yield from fresh
+
+    def fill_ratio(self):
+        """ Returns the share of the filter's bits that are set
+        """
+        ones = 0
+        step = 1 << 20
+        for start in range(_HEADER.size, len(self._map), step):
+            ones += bin(int.from_bytes(self._map[start:start + step], 'little')).count('1')
+        return ones / (self.blocks * BLOCK_BITS)
+
+    def print_stats(self, file=sys.stderr):
+        """ Prints the size, fill ratio & hits of the filter
+        """
+        file.write("{}: {} values, {:.1%} full, {:.2g} false positive rate, "
+                "{} regenerated\n".format(self.path, self.count,
+                    self.fill_ratio(), self.error_rate(), self.hits))
+
+    def error_rate(self):
+        """ Returns the expected false positive rate at the current count
+        """
+        return blocked_error_rate(self.count / self.blocks, self.hashes) \
+                if self.count else 0.0
+
+    def flush(self):
+        """ Stores the count & writes the filter back to its file
+        """
+        struct.pack_into('<Q', self._map, 20, self.count)
+        self._map.flush()
+
+    def close(self):
+        """ Flushes & releases the memory map & the lock of the filter
+        """
+        if not self._map.closed:
+            self.flush()
+            self._release()
+
+    def _release(self):
+        """ Closes the memory map & the file, which drops the lock
+        """
+        self._map.close()
+        self._file.close()
+
+    def __len__(self):
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+""" Single command line entry point for every tool of this repository
+
+    Only this module gets imported upfront, the tool asked for is imported
+    and run as if it was started directly, so every tool keeps its own
+    options and startup stays as cheap as running the tool's script.
+
+    With --stdin-batch, a single process answers many requests instead:
+    every line of stdin is a request of the server.py JSON lines protocol,
+    answered by one JSON line on stdout (flushed right away, so the batch
+    process can also be driven line by line from another program).
+
+    Installed, it is the 'py-rng' console script, from a checkout it is
+    'python cli.py'.
+
+    Usage:
+        py-rng rng -n 5 -c 100
+        py-rng wl -i wordlist.txt -b 10
+        py-rng --stdin-batch < requests.jsonl
+        python cli.py rng -n 5
+"""
+
+################################################################################
+## Imports
+################################################################################
+
+import sys
+from sys import exit
+
+
+
+################################################################################
+## Module Constants
+################################################################################
+
+# command name -> the module run for it
+TOOLS = {
+    'rng': 'rng',
+    'wl': 'wl',
+    'clean': 'wlclean',
+    'gen': 'wlgen',
+    'score': 'score',
+    'eval': 'evaluations',
+    'bench': 'bench',
+    'serve': 'server',
+    'loadtest': 'loadtest',
+}
+
+USAGE = """usage: py-rng TOOL [options]
+       py-rng --stdin-batch
+
+tools:
+  rng        random numbers (rng.py)
+  wl         random words & passphrases (wl.py)
+  clean      wordlist cleaning (wlclean.py)
+  gen        wordlist generation from corpora (wlgen.py)
+  score      passphrase entropy & crack time scoring (score.py)
+  eval       statistical randomness tests (evaluations.py)
+  bench      timing evaluation (bench.py)
+  serve      the local randomness service (server.py)
+  loadtest   load testing of the service (loadtest.py)
+
+  --stdin-batch  answers server.py JSON requests, one per line of stdin
+  -h, --help     shows this message, 'py-rng TOOL -h' shows a tool's options
+"""
+
+
+
+################################################################################
+## Module Functions
+################################################################################
+
+def run_tool(name, argv):
+    """ Runs a tool of TOOLS with the given arguments, as its __main__
+
+    Args:
+        name (str): a command name of TOOLS
+        argv ([str]): the arguments after the command name
+    """
+    import runpy
+    sys.argv = [name] + list(argv)
+    runpy.run_module(TOOLS[name], run_name='__main__', alter_sys=True)
+
+def stdin_batch(lines=None, out=None):
+    """ Answers a request of the server.py protocol for every line read
+
+    Args:
+        lines (iterable of bytes): the request lines [default = stdin]
+        out (file): a binary file the responses get written to
+            [default = stdout]
+
+    Returns:
+        int: the amount of requests answered
+    """
+    import entropy
+    import os
+    import server
+    lines = sys.stdin.buffer if lines is None else lines
+    out = sys.stdout.buffer if out is None else out
+    # stdin's user can read any of their files anyway, so serve them all
+    service = server.RandomService(entropy.shared_pool(),
+            wordlist_dir=os.path.abspath(os.sep))
+    for line in lines:
+        if line.strip():
+            out.write(service.handle(line))
+            out.flush()
+    return service.requests
+
+def main(argv=None):
+    """ The console entry point, see USAGE
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] in ('-h', '--help'):
+        sys.stdout.write(USAGE)
+        exit(0 if argv else 1)
+    if argv[0] == '--stdin-batch':
+        try:
+            stdin_batch()
+        except BrokenPipeError:
+            # the reading end closed early, silence the exit flush
+            import os
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        except KeyboardInterrupt:
+            pass
+        exit(0)
+    if argv[0] not in TOOLS:
+        print("[ERROR]: Unknown tool '{}', one of: {}".format(argv[0],
+            ", ".join(TOOLS)))
+        exit(1)
+    run_tool(argv[0], argv[1:])
+
+
+
+################################################################################
+## Main Execution
+################################################################################
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+#!/usr/bin/env python
+""" A seekable, counter-based deterministic random bit generator (DRBG)
+
+    Benchmarks & test runs drawing from the OS can never be replayed, so
+    this generator derives every byte from an explicit seed instead. The
+    seed gets hashed into a 256 bit key (BLAKE2b), and block 'i' of stream
+    's' is the first BLOCK_SIZE bytes SHAKE-128 outputs for key || s || i.
+    As each block only depends on its own counter, any byte offset can be
+    reached without generating what comes before it, and different streams
+    of the same seed are independent substreams: parallel workers can each
+    take a stream (or a range of blocks) of one seed without coordinating.
+
+    Blocks are generated whole & buffered, so small requests are served
+    from memory instead of costing one OS call each, and large requests
+    come out at the speed of the SHAKE-128 implementation of hashlib.
+
+    An instance is itself a 'randbytes' callable (see entropy.py), so it can
+    be handed to rng.RandomNumbers, wl.read_random_words and the like.
+
+    It is meant for reproducible output, ie. benchmarks, tests & sharded
+    jobs, whose secrecy comes down to keeping the seed secret.
+
+    Usage:
+        source = CounterDRBG("my seed")
+        rng.RandomNumbers(count=10, randbytes=source)
+        CounterDRBG("my seed", stream=3).seek(1 << 30)
+"""
+
+################################################################################
+## Imports
+################################################################################
+
+import hashlib
+
+
+
+################################################################################
+## Module Constants
+################################################################################
+
+# the amount of bytes every counter block holds
+BLOCK_SIZE = 1 << 16
+
+# counters & stream ids are packed as unsigned 64 bit integers
+MAX_BLOCKS = 1 << 64
+MAX_STREAMS = 1 << 64
+
+_PERSON = b'pyrng.drbg'
+
+
+
+################################################################################
+## Module Functions
+################################################################################
+
+def seed_key(seed):
+    """ Derives the 256 bit key of a seed
+
+    Args:
+        seed (int, str or bytes): the seed, an int seeds the same as its
+            decimal string, ie. 42 and '42'
+
+    Returns:
+        bytes: the 32 byte key
+    """
+    if isinstance(seed, int):
+        seed = str(seed)
+    if isinstance(seed, str):
+        seed = seed.encode('utf-8')
+    if not isinstance(seed, (bytes, bytearray)):
+        raise TypeError("a seed must be an int, str or bytes, not {}".format(
+            type(seed).__name__))
+    return hashlib.blake2b(seed, digest_size=32, person=_PERSON).digest()
+
+
+
+################################################################################
+## Module Classes
+################################################################################
+
+class CounterDRBG(object):
+    """ A seekable stream of deterministic random bytes, see the module
+    docstring
+
+    Attributes:
+        seed: the seed the stream was derived from
+        stream (int): the id of the substream of the seed
+    """
+    def __init__(self, seed, stream=0):
+        """
+        Args:
+            seed (int, str or bytes): the seed of the generator
+            stream (int): the id of the substream, 0 up to MAX_STREAMS - 1
+        """
+        if not 0 <= stream < MAX_STREAMS:
+            raise ValueError("stream ids go from 0 up to 2**64 - 1")
+        self.seed = seed
+        self.stream = stream
+        self._prefix = seed_key(seed) + stream.to_bytes(8, 'little')
+        self._position = 0
+        self._base = 0
+        self._buffer = b''
+
+    def block(self, i):
+        """ Returns the bytes of counter block 'i', without moving the stream
+        """
+        if not 0 <= i < MAX_BLOCKS:
+            raise ValueError("block counters go from 0 up to 2**64 - 1")
+        return hashlib.shake_128(self._prefix + i.to_bytes(8, 'little')).digest(
+                BLOCK_SIZE)
+
+    def _load(self, i):
+        """ Makes block 'i' the buffered block
+        """
+        if self._base != i * BLOCK_SIZE or not self._buffer:
+            self._buffer = self.block(i)
+            self._base = i * BLOCK_SIZE
+
+    def randbytes(self, n):
+        """ Returns the next 'n' bytes of the stream
+        """
+        start = self._position - self._base
+        end = start + n
+        if 0 <= start <= end <= len(self._buffer):
+            # served from the buffered block, the hot path of small requests
+            self._position += n
+            return self._buffer[start:end]
+        return self._randbytes_spanning(n)
+
+    def _randbytes_spanning(self, n):
+        """ randbytes() for requests outside of the buffered block
+        """
+        if n < 0:
+            raise ValueError("can't generate a negative amount of bytes")
+        block, start = divmod(self._position, BLOCK_SIZE)
+        self._load(block)
+        end = start + n
+        self._position += n
+        if end <= BLOCK_SIZE:
+            return self._buffer[start:end]
+        parts = [self._buffer[start:]]
+        end -= BLOCK_SIZE
+        while end > BLOCK_SIZE:
+            block += 1
+            parts.append(self.block(block))
+            end -= BLOCK_SIZE
+        self._load(block + 1)
+        parts.append(self._buffer[:end])
+        return b''.join(parts)
+
+    __call__ = randbytes
+
+    def tell(self):
+        """ Returns the byte offset the next randbytes() call starts at
+        """
+        return self._position
+
+    def seek(self, offset):
+        """ Moves the stream to a byte offset, in constant time
+        """
+        if not 0 <= offset < MAX_BLOCKS * BLOCK_SIZE:
+            raise ValueError("offsets go from 0 up to 2**64 blocks")
+        self._position = offset
+
+    def jump(self, blocks=1):
+        """ Moves the stream 'blocks' whole blocks ahead (or back), ie. to
+        hand out disjoint ranges of one stream
+        """
+        self.seek(self._position + blocks * BLOCK_SIZE)
+
+    def substream(self, stream):
+        """ Returns a new generator on another stream of the same seed
+        """
+        return CounterDRBG(self.seed, stream)
+
+    def __repr__(self):
+        return "CounterDRBG(stream={}, offset={})".format(self.stream,
+                self._position)
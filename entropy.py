@@ -0,0 +1,333 @@
+#!/usr/bin/env python
+""" Bulk entropy helpers shared by rng.py and wl.py.
+
+    Instead of asking the OS for a handful of bytes per value (which is what
+    secrets.randbelow ends up doing), these helpers read one large buffer of
+    randomness, view it as an array of fixed width unsigned integers and
+    reduce every element into the requested range with rejection sampling,
+    so the output stays unbiased.
+
+    Terminology:
+        - 'bound' is the exclusive upper limit of a value drawn from [0, bound)
+        - 'width' is the number of bytes used to draw a single value
+        - 'randbytes' is any callable taking a byte count and returning that
+          many random bytes, ie. os.urandom or EntropyPool.randbytes
+
+    For long running callers making many small requests, an EntropyPool keeps
+    a large buffer of OS randomness that a background thread refills before
+    it runs dry, so the hot path hands out bytes without a syscall.
+"""
+
+################################################################################
+## Imports
+################################################################################
+
+from array import array
+import instrument
+import os
+import threading
+import weakref
+
+
+
+################################################################################
+## Module Constants
+################################################################################
+
+# memoryview.cast() codes for unsigned integers of a given byte width
+UNSIGNED_CODES = {1: 'B', 2: 'H', 4: 'I', 8: 'Q'}
+
+# amount of values generated per entropy read when filling large requests
+BATCH_SIZE = 1 << 16
+
+
+
+################################################################################
+## Module Functions
+################################################################################
+
+def value_width(bound):
+    """ Returns the byte width used to draw values below 'bound'
+
+    Args:
+        bound (int): the exclusive upper limit of the values to draw
+
+    Returns:
+        int: 1, 2, 4 or 8 for bounds that fit a native integer,
+            otherwise the smallest amount of bytes holding bound - 1
+    """
+    nbytes = max(1, ((bound - 1).bit_length() + 7) // 8)
+    for width in sorted(UNSIGNED_CODES):
+        if nbytes <= width:
+            return width
+    return nbytes
+
+def _randbelow_native(bound, count, offset, randbytes, typecode=None):
+    """ Bulk rejection sampling for bounds that fit a native integer width
+    """
+    width = value_width(bound)
+    code = UNSIGNED_CODES[width]
+    span = 1 << (8 * width)
+    # drawn values at or above limit would bias the modulo, so reject them
+    limit = span - span % bound
+    numbers = [] if typecode is None else array(typecode)
+    table = None
+    if width == 1 and typecode is not None and numbers.itemsize == 1:
+        # byte sized numbers out of byte draws: one bytes.translate() call
+        # maps every draw to the byte of its number & deletes the rejected
+        table = bytes((v % bound + offset) & 0xFF for v in range(256))
+        rejected = bytes(range(limit, 256))
+    add = numbers.extend if typecode is None else numbers.fromlist
+    while len(numbers) < count:
+        need = min(count - len(numbers), BATCH_SIZE)
+        # over-draw by the expected rejection rate so one read usually does it
+        draw = need + (need * (span - limit)) // limit + 1
+        with instrument.stage('entropy.read'):
+            buf = randbytes(draw * width)
+        filled = len(numbers)
+        with instrument.stage('rng.reduce'):
+            if table is not None:
+                numbers.frombytes(buf.translate(table, rejected))
+            elif limit == span:
+                add([v % bound + offset for v in memoryview(buf).cast(code)])
+            else:
+                add([v % bound + offset for v in memoryview(buf).cast(code)
+                    if v < limit])
+        if instrument.enabled:
+            instrument.count('entropy.bytes', draw * width)
+            instrument.count('rng.rejections', draw - (len(numbers) - filled))
+    del numbers[count:]
+    return numbers
+
+def _randbelow_wide(bound, count, offset, randbytes):
+    """ Bulk rejection sampling for bounds wider than 64 bits
+    """
+    width = value_width(bound)
+    mask = (1 << (bound - 1).bit_length()) - 1
+    numbers = []
+    while len(numbers) < count:
+        need = min(count - len(numbers), BATCH_SIZE)
+        # masking keeps the rejection rate below one half, so draw double
+        with instrument.stage('entropy.read'):
+            buf = randbytes(2 * need * width)
+        filled = len(numbers)
+        with instrument.stage('rng.reduce'):
+            values = (int.from_bytes(buf[i:i + width], 'little') & mask
+                    for i in range(0, len(buf), width))
+            numbers.extend([v + offset for v in values if v < bound])
+        if instrument.enabled:
+            instrument.count('entropy.bytes', len(buf))
+            instrument.count('rng.rejections', 2 * need - (len(numbers) - filled))
+    del numbers[count:]
+    return numbers
+
+def randbelow_bulk(bound, count, offset=0, randbytes=os.urandom, typecode=None):
+    """ Generates 'count' unbiased random integers in [offset, offset + bound)
+
+    Args:
+        bound (int): the exclusive upper limit of the drawn values before
+            'offset' is added, must be at least 1
+        count (int): the amount of random integers to generate
+        offset (int): a value added to every drawn integer
+        randbytes (callable): the source of random bytes [default = os.urandom]
+        typecode (str): generates an array of this typecode instead of a
+            list, which must hold every value (see rngio.typecode()), byte
+            sized ones get generated without a Python level loop
+
+    Returns:
+        [int]: a list (or array) of 'count' random integers
+    """
+    if bound < 1:
+        raise ValueError("randbelow_bulk() needs a bound of at least 1")
+    if count <= 0:
+        return [] if typecode is None else array(typecode)
+    if bound == 1:
+        numbers = [offset] * count
+    elif value_width(bound) in UNSIGNED_CODES:
+        return _randbelow_native(bound, count, offset, randbytes, typecode)
+    else:
+        numbers = _randbelow_wide(bound, count, offset, randbytes)
+    return numbers if typecode is None else array(typecode, numbers)
+
+
+
+################################################################################
+## Module Classes
+################################################################################
+
+class EntropyPool(object):
+    """ A thread-safe buffer of OS randomness with background prefetch
+
+    Bytes are handed out of the active buffer and wiped from it as they are
+    consumed. Once half of it is used up a background thread fills a spare
+    buffer, which gets swapped in when the active one runs dry, so reads only
+    hit the OS directly if the prefetch fell behind (counted in 'misses').
+    Pools reset themselves in forked children, so a parent and its children
+    never hand out the same bytes.
+
+    Attributes:
+        size (int): the byte size of each of the two buffers
+        refills (int): the amount of buffers swapped in so far
+        misses (int): the amount of refills that had to read synchronously
+    """
+    def __init__(self, size=1 << 20, randbytes=os.urandom):
+        self.size = size
+        self.refills = 0
+        self.misses = 0
+        self._source = randbytes
+        self._zeros = memoryview(bytes(size))
+        self._lock = threading.Lock()
+        self._wanted = threading.Event()
+        self._closed = False
+        self._start()
+        _pools.add(self)
+
+    def _start(self):
+        """ Fills the active buffer & starts the prefetch thread
+        """
+        self._buf = bytearray(self._source(self.size))
+        self._pos = 0
+        self._spare = None
+        self._wanted.set()
+        self._thread = threading.Thread(target=self._prefetch,
+                name='entropy-pool', daemon=True)
+        self._thread.start()
+
+    def _prefetch(self):
+        """ Background thread: fills a spare buffer whenever one is wanted
+        """
+        while True:
+            self._wanted.wait()
+            if self._closed:
+                return
+            spare = bytearray(self._source(self.size))
+            with self._lock:
+                if self._closed:
+                    return
+                if self._spare is None:
+                    self._spare = spare
+                self._wanted.clear()
+
+    def _swap(self):
+        """ Swaps the spare buffer in for the exhausted one, lock held
+        """
+        if self._spare is None:
+            self.misses += 1
+            if instrument.enabled:
+                instrument.count('pool.misses')
+            with instrument.stage('pool.sync_read'):
+                self._buf = bytearray(self._source(self.size))
+        else:
+            self._buf, self._spare = self._spare, None
+        self._pos = 0
+        self.refills += 1
+        if instrument.enabled:
+            instrument.count('pool.refills')
+        self._wanted.set()
+
+    def randbytes(self, n):
+        """ Returns 'n' random bytes out of the pool
+
+        Args:
+            n (int): the amount of bytes wanted, reads larger than the pool
+                buffer go straight to the OS as they gain nothing from it
+
+        Returns:
+            bytes: 'n' random bytes
+        """
+        if self._closed:
+            raise ValueError("randbytes() on a closed EntropyPool")
+        if n > self.size:
+            return self._source(n)
+        with self._lock:
+            # close() may have won the race for the lock
+            if self._closed:
+                raise ValueError("randbytes() on a closed EntropyPool")
+            start = self._pos
+            end = start + n
+            if end > self.size:
+                return self._randbytes_spanning(n)
+            out = bytes(self._buf[start:end])
+            # wipe the consumed bytes so they can't be handed out again
+            self._buf[start:end] = self._zeros[:n]
+            self._pos = end
+            if self._spare is None and 2 * end >= self.size:
+                self._wanted.set()
+        return out
+
+    def _randbytes_spanning(self, n):
+        """ randbytes() for reads running past the active buffer, lock held
+        """
+        out = bytearray(n)
+        filled = 0
+        while filled < n:
+            if self._pos == self.size:
+                self._swap()
+            take = min(self.size - self._pos, n - filled)
+            end = self._pos + take
+            out[filled:filled + take] = self._buf[self._pos:end]
+            self._buf[self._pos:end] = self._zeros[:take]
+            self._pos = end
+            filled += take
+        return bytes(out)
+
+    def randbelow(self, bound):
+        """ Returns a single unbiased random integer in [0, bound)
+        """
+        return randbelow_bulk(bound, 1, randbytes=self.randbytes)[0]
+
+    def randbelow_bulk(self, bound, count, offset=0):
+        """ randbelow_bulk() drawing its bytes from this pool
+        """
+        return randbelow_bulk(bound, count, offset, randbytes=self.randbytes)
+
+    def close(self):
+        """ Stops the prefetch thread & wipes both buffers
+        """
+        with self._lock:
+            self._closed = True
+            self._buf[:] = self._zeros[:len(self._buf)]
+            if self._spare is not None:
+                self._spare[:] = self._zeros[:len(self._spare)]
+                self._spare = None
+        self._wanted.set()
+
+    def _after_fork(self):
+        """ Drops the buffers inherited from the parent & restarts prefetch
+        """
+        if self._closed:
+            return
+        self._lock = threading.Lock()
+        self._wanted = threading.Event()
+        self._buf[:] = self._zeros[:len(self._buf)]
+        self._start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# every live pool, so forked children can reset them
+_pools = weakref.WeakSet()
+_shared = None
+_shared_lock = threading.Lock()
+
+def _reset_pools_after_fork():
+    global _shared_lock
+    _shared_lock = threading.Lock()
+    for pool in list(_pools):
+        pool._after_fork()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_pools_after_fork)
+
+def shared_pool():
+    """ Returns the process wide EntropyPool, creating it on first use
+    """
+    global _shared
+    with _shared_lock:
+        if _shared is None or _shared._closed:
+            _shared = EntropyPool()
+        return _shared
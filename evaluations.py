@@ -0,0 +1,525 @@
+#!/usr/bin/env python
+""" Statistical randomness tests for the output of rng.py or raw byte files.
+
+    The tests follow NIST SP 800-22 and run chunk by chunk over samples of
+    any size. Each chunk gets turned into one big integer, so counting ones,
+    runs and overlapping bit patterns are a handful of big integer bit
+    operations & popcounts per chunk instead of Python loops per bit.
+
+    Tests:
+        - monobit: the proportion of ones & zeros
+        - block-frequency: the proportion of ones within M bit blocks
+        - runs: the amount of uninterrupted runs of identical bits
+        - serial: the frequency of every overlapping m bit pattern
+        - approximate-entropy: pattern frequencies of lengths m & m + 1
+        - chi-square: the uniformity of byte values (or of numbers)
+
+    Every test reports a p-value, and passes when it is at least ALPHA.
+
+    Usage:
+        python evaluations.py random.bin
+        python evaluations.py --numbers -n 1000000 -f 0 -c 255
+"""
+
+################################################################################
+## Imports
+################################################################################
+
+import json
+from math import erfc, exp, lgamma, log, sqrt
+import optparse
+import os
+from sys import exit
+from time import perf_counter
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+
+################################################################################
+## Module Constants
+################################################################################
+
+# the significance level every p-value is compared against
+ALPHA = 0.01
+
+# the amount of bytes read from a file per chunk
+CHUNK_SIZE = 1 << 22
+
+# int.bit_count() arrived in Python 3.10, bin() counts the same before it
+popcount = getattr(int, 'bit_count', None) or (lambda x: bin(x).count("1"))
+
+
+
+################################################################################
+## Module Functions
+################################################################################
+
+def igamc(a, x):
+    """ The regularized upper incomplete gamma function Q(a, x)
+    """
+    if x <= 0:
+        return 1.0
+    if a > 1e7:
+        # the series & continued fraction stop converging in floats long
+        # before a gets this large, where the Wilson-Hilferty normal
+        # approximation of the chi-square distribution is very close
+        k = 2 * a
+        z = ((x / a) ** (1 / 3) - (1 - 2 / (9 * k))) / sqrt(2 / (9 * k))
+        return 0.5 * erfc(z / sqrt(2))
+    if x < a + 1:
+        # series expansion of P(a, x), then Q = 1 - P
+        term = total = 1.0 / a
+        n = a
+        while abs(term) > abs(total) * 1e-15:
+            n += 1
+            term *= x / n
+            total += term
+        return 1.0 - total * exp(-x + a * log(x) - lgamma(a))
+    # continued fraction of Q(a, x), by the modified Lentz method
+    tiny = 1e-300
+    b = x + 1 - a
+    c = 1 / tiny
+    # b rounds to 0 for huge a & x close together, ie. a = x = 10^23
+    d = 1 / (tiny if abs(b) < tiny else b)
+    h = d
+    i = 0
+    while True:
+        i += 1
+        an = -i * (i - a)
+        b += 2
+        d = an * d + b
+        d = tiny if abs(d) < tiny else d
+        c = b + an / c
+        c = tiny if abs(c) < tiny else c
+        d = 1 / d
+        delta = d * c
+        h *= delta
+        if abs(delta - 1) < 1e-15:
+            break
+    return exp(-x + a * log(x) - lgamma(a)) * h
+
+def pattern_counts(x, length, m):
+    """ Counts every overlapping m bit pattern within a bit string
+
+    Args:
+        x (int): the bit string, its first bit being the most significant
+        length (int): the amount of bits in x, including leading zeros
+        m (int): the pattern length
+
+    Returns:
+        [int]: the count of each of the 2^m patterns, indexed by the pattern
+            read as a binary number
+    """
+    if length < m:
+        return [0] * (1 << m)
+    # bit p of every indicator marks the window starting length - m - p
+    indicators = [(1 << (length - m + 1)) - 1]
+    for j in range(m):
+        bits = x >> (m - 1 - j)
+        level = []
+        for indicator in indicators:
+            ones = indicator & bits
+            level.append(indicator ^ ones)
+            level.append(ones)
+        indicators = level
+    return [popcount(indicator) for indicator in indicators]
+
+def marginal_counts(counts):
+    """ Turns cyclic m bit pattern counts into cyclic m - 1 bit pattern counts
+    """
+    return [counts[i] + counts[i + 1] for i in range(0, len(counts), 2)]
+
+def byte_counts(chunk):
+    """ Counts the occurences of every byte value in a chunk of bytes
+    """
+    if np is not None:
+        return np.bincount(np.frombuffer(chunk, dtype=np.uint8),
+                minlength=256).tolist()
+    # one C level scan per value beats hashing every byte into a Counter
+    return list(map(chunk.count, range(256)))
+
+def chi_square_uniform(counts):
+    """ The chi-square statistic & p-value of counts against a uniform spread
+
+    Args:
+        counts ([int]): the observed count of every possible value
+
+    Returns:
+        (float, float): the chi-square statistic and its p-value
+    """
+    total = sum(counts)
+    expected = total / len(counts)
+    statistic = sum((c - expected)**2 for c in counts) / expected
+    return statistic, igamc((len(counts) - 1) / 2, statistic / 2)
+
+def result(test, statistic, p_value, **extra):
+    """ Builds the report of a single test
+    """
+    report = {"test": test, "statistic": statistic, "p_value": p_value,
+            "passed": p_value >= ALPHA}
+    report.update(extra)
+    return report
+
+def block_bits_for(total_bits):
+    """ Picks a block-frequency block size for a sample of known length,
+    following the NIST recommendation of M >= 20, M > 0.01n & N < 100
+    """
+    return max(128, -(-total_bits // 99 // 8) * 8)
+
+
+
+################################################################################
+## Module Classes
+################################################################################
+
+class BitStreamTests(object):
+    """ Accumulates every bit level test over a stream of chunks
+
+    Attributes:
+        n (int): the amount of bits seen
+        block_bits (int): the block size M of the block-frequency test
+        serial_m (int): the pattern length of the serial test
+        apen_m (int): the pattern length of the approximate entropy test
+        byte_counts ([int]): the byte value histogram of whole byte chunks,
+            which is the slowest part of the tests without NumPy, so it can
+            be turned off with chi_square=False
+    """
+    def __init__(self, block_bits=1024, serial_m=4, apen_m=3, chi_square=True):
+        self.block_bits = block_bits
+        self.serial_m = serial_m
+        self.apen_m = apen_m
+        # the longest pattern any test needs, every shorter one is derived
+        self.m = max(serial_m, apen_m + 1)
+        if self.m > 8:
+            raise ValueError("pattern lengths above 8 bits aren't supported")
+        self.n = 0
+        self.ones = 0
+        self.transitions = 0
+        self.last_bit = 0
+        self.block_ones = []
+        self._block_fill = 0
+        self._block_count = 0
+        self._head = 0
+        self._tail = 0
+        self._tail_len = 0
+        self.counts = [0] * (1 << self.m)
+        self.byte_counts = [0] * 256
+        self.chi_square_bytes = chi_square
+
+    def update(self, chunk):
+        """ Adds a chunk of bytes to every test
+        """
+        if not chunk:
+            return self
+        if self.chi_square_bytes:
+            self._update_bytes(chunk)
+        if self.block_bits % 8 == 0 and self._block_fill % 8 == 0:
+            self._update_blocks_bytes(chunk)
+            return self._update_bits(int.from_bytes(chunk, 'big'), 8 * len(chunk))
+        return self.update_bits(int.from_bytes(chunk, 'big'), 8 * len(chunk))
+
+    def _update_bytes(self, chunk):
+        """ Byte value histogram of a chunk, for the chi-square test
+        """
+        for value, count in enumerate(byte_counts(chunk)):
+            self.byte_counts[value] += count
+
+    def update_bits(self, x, length):
+        """ Adds a bit string (first bit most significant) to the bit tests
+        """
+        self._update_blocks_int(x, length)
+        return self._update_bits(x, length)
+
+    def _update_bits(self, x, length):
+        """ Monobit, runs & pattern counts of one chunk of bits
+        """
+        if length == 0:
+            return self
+        self.ones += popcount(x)
+        if self.n:
+            self.transitions += self.last_bit != (x >> (length - 1))
+        self.transitions += popcount((x ^ (x >> 1)) & ((1 << (length - 1)) - 1))
+        self.last_bit = x & 1
+        k = self.m - 1
+        if self.n < k:
+            # remember the first bits, the cyclic patterns wrap around to them
+            take = min(k - self.n, length)
+            self._head = (self._head << take) | (x >> (length - take))
+        joined = (self._tail << length) | x
+        counts = pattern_counts(joined, self._tail_len + length, self.m)
+        self.counts = [a + b for a, b in zip(self.counts, counts)]
+        # keep the last bits, so windows spanning two chunks get counted once
+        self._tail_len = min(k, self._tail_len + length)
+        self._tail = joined & ((1 << self._tail_len) - 1)
+        self.n += length
+        return self
+
+    def _update_blocks_bytes(self, chunk):
+        """ Block frequency ones counts of a chunk of whole bytes
+        """
+        view = memoryview(chunk)
+        size = self.block_bits // 8
+        start = 0
+        if self._block_fill:
+            start = min(len(view), size - self._block_fill // 8)
+            self._block_count += popcount(int.from_bytes(view[:start], 'big'))
+            self._block_fill += 8 * start
+            if self._block_fill == self.block_bits:
+                self.block_ones.append(self._block_count)
+                self._block_fill = self._block_count = 0
+        end = start + (len(view) - start) // size * size
+        self.block_ones.extend(popcount(int.from_bytes(view[i:i + size], 'big'))
+                for i in range(start, end, size))
+        if end < len(view):
+            self._block_count = popcount(int.from_bytes(view[end:], 'big'))
+            self._block_fill = 8 * (len(view) - end)
+
+    def _update_blocks_int(self, x, length):
+        """ Block frequency ones counts of a chunk of bits of any length
+        """
+        remaining = length
+        while remaining:
+            take = min(self.block_bits - self._block_fill, remaining)
+            remaining -= take
+            self._block_count += popcount((x >> remaining) & ((1 << take) - 1))
+            self._block_fill += take
+            if self._block_fill == self.block_bits:
+                self.block_ones.append(self._block_count)
+                self._block_fill = self._block_count = 0
+
+    def _cyclic_counts(self):
+        """ The pattern counts of the sample wrapped around onto itself
+        """
+        k = self.m - 1
+        wrap = (self._tail << k) | self._head
+        extra = pattern_counts(wrap, self._tail_len + min(k, self.n), self.m)
+        counts = [a + b for a, b in zip(self.counts, extra)]
+        cyclic = {self.m: counts}
+        for m in range(self.m - 1, -1, -1):
+            counts = marginal_counts(counts)
+            cyclic[m] = counts
+        return cyclic
+
+    def monobit(self):
+        s = abs(2 * self.ones - self.n) / sqrt(self.n)
+        return result("monobit", s, erfc(s / sqrt(2)))
+
+    def block_frequency(self):
+        blocks = len(self.block_ones)
+        if not blocks:
+            return result("block-frequency", 0.0, 0.0, note="sample shorter than a block")
+        m = self.block_bits
+        statistic = 4 * m * sum((ones / m - 0.5)**2 for ones in self.block_ones)
+        return result("block-frequency", statistic, igamc(blocks / 2, statistic / 2),
+                blocks=blocks, block_bits=m)
+
+    def runs(self):
+        n = self.n
+        pi = self.ones / n
+        if abs(pi - 0.5) >= 2 / sqrt(n):
+            return result("runs", 0.0, 0.0, note="monobit prerequisite failed")
+        runs = self.transitions + 1
+        statistic = abs(runs - 2 * n * pi * (1 - pi)) / (2 * sqrt(2 * n) * pi * (1 - pi))
+        return result("runs", runs, erfc(statistic))
+
+    def serial(self, cyclic=None):
+        cyclic = cyclic or self._cyclic_counts()
+        m, n = self.serial_m, self.n
+        psi = lambda k: (2**k / n) * sum(c * c for c in cyclic[k]) - n if k > 0 else 0.0
+        del1 = psi(m) - psi(m - 1)
+        del2 = psi(m) - 2 * psi(m - 1) + psi(m - 2)
+        p1 = igamc(2**(m - 2), del1 / 2)
+        p2 = igamc(2**(m - 3), del2 / 2)
+        return result("serial", del1, min(p1, p2), p_values=[p1, p2], m=m)
+
+    def approximate_entropy(self, cyclic=None):
+        cyclic = cyclic or self._cyclic_counts()
+        m, n = self.apen_m, self.n
+        phi = lambda k: sum(c / n * log(c / n) for c in cyclic[k] if c) if k > 0 else 0.0
+        apen = phi(m) - phi(m + 1)
+        statistic = 2 * n * (log(2) - apen)
+        return result("approximate-entropy", statistic,
+                igamc(2**(m - 1), statistic / 2), apen=apen, m=m)
+
+    def chi_square(self):
+        statistic, p_value = chi_square_uniform(self.byte_counts)
+        return result("chi-square", statistic, p_value, bins=256)
+
+    def results(self):
+        """ Returns the report of every test over everything seen so far
+        """
+        if not self.n:
+            raise ValueError("no bits were given to test")
+        cyclic = self._cyclic_counts()
+        reports = [self.monobit(), self.block_frequency(), self.runs(),
+                self.serial(cyclic), self.approximate_entropy(cyclic)]
+        if sum(self.byte_counts):
+            reports.append(self.chi_square())
+        return reports
+
+
+
+################################################################################
+## Evaluation Functions
+################################################################################
+
+def evaluate_chunks(chunks, total_bytes=None, **options):
+    """ Runs every test over an iterable of byte chunks
+
+    Args:
+        chunks (iterable of bytes): the sample, in order
+        total_bytes (int): the sample size if known upfront, used to pick
+            the block-frequency block size
+        options: passed on to BitStreamTests
+
+    Returns:
+        dict: the 'results' of every test, plus 'bytes', 'seconds' & 'mb_s'
+    """
+    if total_bytes and 'block_bits' not in options:
+        options['block_bits'] = block_bits_for(8 * total_bytes)
+    tests = BitStreamTests(**options)
+    start = perf_counter()
+    for chunk in chunks:
+        tests.update(chunk)
+    reports = tests.results()
+    seconds = perf_counter() - start
+    size = tests.n // 8
+    return {"results": reports, "bytes": size, "seconds": seconds,
+            "mb_s": size / seconds / 1e6 if seconds else float('inf')}
+
+def read_chunks(file_path, chunk_size=CHUNK_SIZE):
+    """ Yields the contents of a file as chunks of bytes
+    """
+    with open(file_path, 'rb') as file:
+        while True:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+def evaluate_file(file_path, chunk_size=CHUNK_SIZE, **options):
+    """ Runs every test over a raw byte file, chunk by chunk
+    """
+    return evaluate_chunks(read_chunks(file_path, chunk_size),
+            os.path.getsize(file_path), **options)
+
+def pack_numbers(numbers, min, max):
+    """ Packs numbers of a power of two sized range into their raw bits
+
+    Returns:
+        (int, int): the bits as an int (first number most significant) and
+            the amount of bits, or None when the range isn't a power of two
+    """
+    size = max - min + 1
+    bits = size.bit_length() - 1
+    if size & (size - 1) or bits == 0:
+        return None
+    fmt = '{{:0{}b}}'.format(bits).format
+    return int(''.join(map(fmt, (v - min for v in numbers))) or '0', 2), bits * len(numbers)
+
+def evaluate_numbers(chunks, min, max, **options):
+    """ Runs the tests over chunks of numbers, ie. from rng.stream_numbers()
+
+    The chi-square test runs over the numbers themselves. The bit level
+    tests only run when the range holds a power of two of values, as only
+    then every bit of the numbers is uniformly random.
+
+    Returns:
+        dict: as evaluate_chunks(), with 'numbers' instead of 'bytes'
+    """
+    import rngstats
+    stats = rngstats.StreamStats(min=min, max=max)
+    tests = None
+    start = perf_counter()
+    for chunk in chunks:
+        stats.update(chunk)
+        packed = pack_numbers(chunk, min, max)
+        if packed is not None:
+            tests = tests or BitStreamTests(**options)
+            tests.update_bits(*packed)
+    reports = tests.results() if tests else []
+    bins = max - min + 1
+    if bins * rngstats.MIN_EXPECTED <= stats.n:
+        uniformity = stats.uniformity()
+        reports.append(result("chi-square", uniformity["chi_square"],
+            uniformity["p_value"], bins=bins))
+    seconds = perf_counter() - start
+    return {"results": reports, "numbers": stats.n, "seconds": seconds,
+            "numbers_s": stats.n / seconds if seconds else float('inf')}
+
+def format_report(report):
+    """ Formats the result of an evaluation for the terminal
+    """
+    lines = ["{:<22}{:>16}{:>12}  {}".format("test", "statistic", "p-value", "result")]
+    for test in report["results"]:
+        lines.append("{:<22}{:>16.4f}{:>12.6f}  {}".format(test["test"],
+            test["statistic"], test["p_value"], "PASS" if test["passed"] else "FAIL"))
+    if "bytes" in report:
+        lines.append("{:,} bytes in {:.3f}s ({:.2f} MB/s)".format(
+            report["bytes"], report["seconds"], report["mb_s"]))
+    else:
+        lines.append("{:,} numbers in {:.3f}s ({:,.0f} numbers/s)".format(
+            report["numbers"], report["seconds"], report["numbers_s"]))
+    return "\n".join(lines)
+
+
+
+################################################################################
+## Main Execution
+################################################################################
+
+if __name__ == '__main__':
+    parser = optparse.OptionParser(usage="%prog [options] [FILE]")
+    help_strings = {
+        "numbers": "tests freshly generated numbers from rng.py instead of a file",
+        "count": "sets the amount of random numbers to test [default = 1000000]",
+        "min": "sets the minimum value (inclusive) of random numbers [default = 0]",
+        "max": "sets the maximum value (inclusive) of random numbers [default = 255]",
+        "engine": "sets how numbers get generated [default = bulk]",
+        "block": "sets the block-frequency block size in bits " +
+        "[default = picked from the sample size]",
+        "json": "prints the report as JSON",
+        "no_chi_square": "skips the byte chi-square test of files, which " +
+        "is the slowest test when NumPy isn't installed",
+        }
+
+    parser.add_option('--numbers',
+            dest='numbers', help=help_strings["numbers"], action="store_true", default=False)
+    parser.add_option('--count', '--number', '-n',
+            dest='count', help=help_strings["count"], type=int, default=1000000)
+    parser.add_option('-f', '--min',
+            dest='min', help=help_strings["min"], type=int, default=0)
+    parser.add_option('-c', '--max',
+            dest='max', help=help_strings["max"], type=int, default=255)
+    parser.add_option('-e', '--engine',
+            dest='engine', help=help_strings["engine"], type="string", default="bulk")
+    parser.add_option('-M', '--block-bits',
+            dest='block_bits', help=help_strings["block"], type=int, default=None)
+    parser.add_option('--json',
+            dest='json', help=help_strings["json"], action="store_true", default=False)
+    parser.add_option('--no-chi-square',
+            dest='chi_square', help=help_strings["no_chi_square"],
+            action="store_false", default=True)
+
+    (opts, args) = parser.parse_args()
+    options = {"block_bits": opts.block_bits} if opts.block_bits else {}
+    if not opts.chi_square:
+        options["chi_square"] = False
+
+    if opts.numbers:
+        import rng
+        if not opts.block_bits:
+            bits = (opts.max - opts.min + 1).bit_length() - 1
+            options["block_bits"] = block_bits_for(opts.count * bits)
+        report = evaluate_numbers(rng.stream_numbers(opts.count, opts.min,
+            opts.max, engine=opts.engine), opts.min, opts.max, **options)
+    elif len(args) == 1 and os.path.isfile(args[0]):
+        report = evaluate_file(args[0], **options)
+    else:
+        print("[ERROR]: Give a path to a file of random bytes, or --numbers")
+        exit(1)
+
+    print(json.dumps(report) if opts.json else format_report(report))
@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+""" Opt-in instrumentation of the hot paths of rng.py and wl.py
+
+    Stages (entropy reads, rejection sampling, wordlist reading & cleaning,
+    output formatting...) are timed with per-stage timers, and events (bytes
+    of entropy used, rejected draws, words cleaned, cache hits...) are
+    tallied in counters. Everything is off by default: instrumented call
+    sites check the module level 'enabled' flag before doing any work, so
+    the cost when off is a single attribute lookup.
+
+    Turning it on:
+        - set the RNG_PROFILE environment variable to 'json' or 'prometheus'
+          (any other non-empty value but '0' means json), and a report is
+          written to stderr when the interpreter exits
+        - pass --profile json|prometheus to rng.py or wl.py
+        - call instrument.enable() from code, then dump() when wanted
+"""
+
+################################################################################
+## Imports
+################################################################################
+
+import atexit
+import os
+import sys
+import threading
+from time import perf_counter
+
+
+
+################################################################################
+## Module Constants
+################################################################################
+
+FORMATS = ('json', 'prometheus')
+
+# the prefix of every metric name in the prometheus text format
+PREFIX = 'pyrng'
+
+
+
+################################################################################
+## Module State
+################################################################################
+
+enabled = False
+counters = {}
+# stage name -> [calls, total seconds]
+timers = {}
+_lock = threading.Lock()
+
+
+
+################################################################################
+## Module Classes
+################################################################################
+
+class _Stage(object):
+    """ Context manager timing one run of a stage into 'timers'
+    """
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        add_time(self.name, perf_counter() - self.start)
+
+
+class _NullStage(object):
+    """ Context manager doing nothing, handed out while disabled
+    """
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+_NULL_STAGE = _NullStage()
+
+
+
+################################################################################
+## Module Functions
+################################################################################
+
+def enable():
+    """ Turns instrumentation on
+    """
+    global enabled
+    enabled = True
+
+def disable():
+    """ Turns instrumentation off, keeping what was recorded
+    """
+    global enabled
+    enabled = False
+
+def reset():
+    """ Drops every recorded counter & timer
+    """
+    with _lock:
+        counters.clear()
+        timers.clear()
+
+def count(name, n=1):
+    """ Adds 'n' to the counter 'name'
+    """
+    with _lock:
+        counters[name] = counters.get(name, 0) + n
+
+def add_time(name, seconds):
+    """ Records one run of the stage 'name' that took 'seconds'
+    """
+    with _lock:
+        timer = timers.get(name)
+        if timer is None:
+            timers[name] = [1, seconds]
+        else:
+            timer[0] += 1
+            timer[1] += seconds
+
+def stage(name):
+    """ Returns a context manager timing a stage, a no-op while disabled
+
+        with instrument.stage('wl.clean'):
+            ...
+    """
+    if enabled:
+        return _Stage(name)
+    return _NULL_STAGE
+
+def snapshot():
+    """ Returns every counter & timer as a JSON friendly dict
+    """
+    with _lock:
+        return {"counters": dict(counters),
+                "timers": {name: {"calls": calls, "seconds": seconds}
+                    for name, (calls, seconds) in timers.items()}}
+
+def to_json():
+    """ Formats the recorded counters & timers as JSON
+    """
+    import json
+    return json.dumps(snapshot(), indent=2, sort_keys=True)
+
+def _escape(label):
+    return label.replace('\\', '\\\\').replace('"', '\\"')
+
+def to_prometheus():
+    """ Formats the recorded counters & timers in the prometheus text format
+    """
+    data = snapshot()
+    lines = [
+        "# HELP {}_events_total Events counted on the hot paths.".format(PREFIX),
+        "# TYPE {}_events_total counter".format(PREFIX)]
+    for name, value in sorted(data["counters"].items()):
+        lines.append('{}_events_total{{name="{}"}} {}'.format(
+            PREFIX, _escape(name), value))
+    lines += [
+        "# HELP {}_stage_seconds_total Time spent in each stage.".format(PREFIX),
+        "# TYPE {}_stage_seconds_total counter".format(PREFIX)]
+    for name, timer in sorted(data["timers"].items()):
+        lines.append('{}_stage_seconds_total{{stage="{}"}} {!r}'.format(
+            PREFIX, _escape(name), timer["seconds"]))
+    lines += [
+        "# HELP {}_stage_calls_total Runs of each stage.".format(PREFIX),
+        "# TYPE {}_stage_calls_total counter".format(PREFIX)]
+    for name, timer in sorted(data["timers"].items()):
+        lines.append('{}_stage_calls_total{{stage="{}"}} {}'.format(
+            PREFIX, _escape(name), timer["calls"]))
+    return "\n".join(lines) + "\n"
+
+def dump(file=None, format='json'):
+    """ Writes the recorded counters & timers to a file [default = stderr]
+    """
+    if format not in FORMATS:
+        raise ValueError("unknown profile format '{}'".format(format))
+    file = file or sys.stderr
+    file.write(to_prometheus() if format == 'prometheus' else to_json() + "\n")
+    file.flush()
+
+def enable_from_env(environ=os.environ):
+    """ Turns instrumentation on when RNG_PROFILE asks for it, dumping the
+    report to stderr at exit
+    """
+    value = environ.get('RNG_PROFILE', '')
+    if value and value != '0':
+        enable()
+        atexit.register(dump, None, value if value in FORMATS else 'json')
+
+enable_from_env()
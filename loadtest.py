@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+""" Load-test client for server.py
+
+    Opens a number of concurrent connections to a running server, sends the
+    same request down each of them over and over, and reports the latency
+    percentiles and overall requests per second.
+
+    Usage:
+        python loadtest.py --unix /tmp/rng.sock -c 16 -r 1000
+        python loadtest.py --port 7777 --request '{"op": "passphrase",
+            "wordlist": "words.txt"}'
+"""
+
+################################################################################
+## Imports
+################################################################################
+
+import asyncio
+import json
+import optparse
+from time import perf_counter
+
+
+
+################################################################################
+## Module Functions
+################################################################################
+
+async def _open(unix, host, port):
+    if unix:
+        return await asyncio.open_unix_connection(unix)
+    return await asyncio.open_connection(host, port)
+
+async def _client(request, requests, latencies, errors, unix, host, port):
+    """ Sends 'requests' requests down one connection, one at a time
+    """
+    reader, writer = await _open(unix, host, port)
+    try:
+        for null in range(requests):
+            start = perf_counter()
+            writer.write(request)
+            await writer.drain()
+            response = await reader.readline()
+            latencies.append(perf_counter() - start)
+            if not response or b'"error"' in response:
+                errors.append(response)
+    finally:
+        writer.close()
+
+def percentile(ordered, fraction):
+    """ Returns the nearest-rank percentile of an already sorted list
+    """
+    if not ordered:
+        return float('nan')
+    rank = max(0, min(len(ordered) - 1, int(round(fraction * len(ordered))) - 1))
+    return ordered[rank]
+
+async def run(request, clients=8, requests=500, unix=None, host='127.0.0.1',
+        port=7777):
+    """ Runs a load test against a server
+
+    Args:
+        request (dict): the request every client keeps sending
+        clients (int): the number of concurrent connections
+        requests (int): the number of requests per connection
+        unix (str): the Unix socket path of the server, instead of TCP
+        host (str): the TCP address of the server
+        port (int): the TCP port of the server
+
+    Returns:
+        dict: request count, errors, seconds, rps and p50/p90/p99/max latency
+            in milliseconds
+    """
+    line = (json.dumps(request) + "\n").encode()
+    latencies, errors = [], []
+    start = perf_counter()
+    await asyncio.gather(*(
+        _client(line, requests, latencies, errors, unix, host, port)
+        for null in range(clients)))
+    seconds = perf_counter() - start
+    latencies.sort()
+    report = {"requests": len(latencies), "errors": len(errors),
+            "seconds": seconds, "rps": len(latencies) / seconds}
+    for name, fraction in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99), ("max", 1.0)):
+        report[name + "_ms"] = percentile(latencies, fraction) * 1000
+    return report
+
+def format_report(report):
+    """ Formats the result of run() for the terminal
+    """
+    return "\n".join([
+        "requests: {} ({} errors) in {:.3f}s".format(
+            report["requests"], report["errors"], report["seconds"]),
+        "throughput: {:,.0f} req/s".format(report["rps"]),
+        "latency: p50 {:.3f}ms  p90 {:.3f}ms  p99 {:.3f}ms  max {:.3f}ms".format(
+            report["p50_ms"], report["p90_ms"], report["p99_ms"], report["max_ms"]),
+        ])
+
+
+
+################################################################################
+## Main Execution
+################################################################################
+
+if __name__ == '__main__':
+    parser = optparse.OptionParser()
+    help_strings = {
+        "unix": "connects to the Unix socket at the given path instead of TCP",
+        "host": "sets the TCP address of the server [default = 127.0.0.1]",
+        "port": "sets the TCP port of the server [default = 7777]",
+        "clients": "sets the number of concurrent connections [default = 8]",
+        "requests": "sets the number of requests per connection [default = 500]",
+        "request": "sets the JSON request to send " +
+        "[default = {\"op\": \"numbers\", \"count\": 5, \"min\": 1, \"max\": 10}]",
+        "json": "prints the report as JSON",
+        }
+
+    parser.add_option('-u', '--unix',
+            dest='unix', help=help_strings["unix"], type="string", default=None)
+    parser.add_option('--host',
+            dest='host', help=help_strings["host"], type="string", default="127.0.0.1")
+    parser.add_option('-p', '--port',
+            dest='port', help=help_strings["port"], type=int, default=7777)
+    parser.add_option('-c', '--clients',
+            dest='clients', help=help_strings["clients"], type=int, default=8)
+    parser.add_option('-r', '--requests',
+            dest='requests', help=help_strings["requests"], type=int, default=500)
+    parser.add_option('--request',
+            dest='request', help=help_strings["request"], type="string",
+            default='{"op": "numbers", "count": 5, "min": 1, "max": 10}')
+    parser.add_option('--json',
+            dest='json', help=help_strings["json"], action="store_true", default=False)
+
+    (opts, args) = parser.parse_args()
+
+    report = asyncio.run(run(json.loads(opts.request), opts.clients,
+        opts.requests, opts.unix, opts.host, opts.port))
+    print(json.dumps(report) if opts.json else format_report(report))
@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+""" Multi-core generation of random numbers & passphrases for rng.py and wl.py
+
+    Large jobs get split into fixed size shards which worker processes
+    generate independently, each drawing its own entropy from the OS. The
+    shards are handed back in the order they were submitted, so the merged
+    output is stable however the workers get scheduled, and only a bounded
+    window of shards is in flight at once to keep memory use flat.
+
+    Seeded jobs draw shard 'i' from stream 'i' of a drbg.CounterDRBG of the
+    seed instead, so workers never overlap or coordinate, and the output of
+    a seed is the same for any number of workers (as long as the shard size
+    stays the same).
+"""
+
+################################################################################
+## Imports
+################################################################################
+
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import os
+import rng
+import rngio
+import wl
+
+
+
+################################################################################
+## Module Constants
+################################################################################
+
+# amount of numbers generated by one worker task
+NUMBER_SHARD_SIZE = 1 << 20
+
+# amount of passphrases generated by one worker task
+PASSPHRASE_SHARD_SIZE = 1 << 15
+
+
+
+################################################################################
+## Module Functions
+################################################################################
+
+def resolve_jobs(jobs):
+    """ Turns a --jobs value into a worker count, 0 or less meaning every core
+    """
+    if jobs is None or jobs < 1:
+        return os.cpu_count() or 1
+    return jobs
+
+def _shard_source(seed, stream):
+    """ The randbytes source of a shard, os.urandom for unseeded jobs
+    """
+    if seed is None:
+        return None
+    import drbg
+    return drbg.CounterDRBG(seed, stream)
+
+def _number_shard(size, min, max, engine, seed=None, stream=0):
+    """ Worker task: generates one shard of numbers, packed as an array when
+    the range fits one so it crosses the process boundary as raw bytes
+    """
+    numbers = rng.get_engine(engine, _shard_source(seed, stream))(
+            max - min + 1, size, min)
+    try:
+        return array(rngio.typecode(min, max), numbers)
+    except ValueError:
+        return numbers
+
+def _passphrase_shard(words, size, count, pattern, seed=None, stream=0,
+        unique=False, weights=None):
+    """ Worker task: generates one shard of passphrases as lists of words
+    """
+    return list(wl.generate_passphrases(words, size, count, separator=None,
+        pattern=pattern, randbytes=_shard_source(seed, stream) or os.urandom,
+        unique=unique, weights=weights))
+
+def _run_ordered(task, shards, jobs):
+    """ Runs 'task' over every shard's arguments in a pool of 'jobs' processes
+
+    Yields:
+        the result of every shard, in the order of 'shards'
+    """
+    jobs = resolve_jobs(jobs)
+    if jobs == 1:
+        # a pool of one only adds pickling, run the shards right here
+        for args in shards:
+            yield task(*args)
+        return
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        pending = deque()
+        for args in shards:
+            pending.append(pool.submit(task, *args))
+            # keep a couple of shards queued per worker, no more
+            if len(pending) >= 2 * jobs:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def _split(total, shard_size):
+    """ Yields the sizes of the shards splitting 'total' items
+    """
+    while total > 0:
+        size = shard_size if total > shard_size else total
+        yield size
+        total -= size
+
+def parallel_numbers(count, min=0, max=10, engine='bulk', jobs=0,
+        shard_size=NUMBER_SHARD_SIZE, seed=None):
+    """ Generates 'count' random numbers across a pool of worker processes
+
+    Args:
+        count (int): the total amount of random numbers to generate
+        min (int): the minimum value of the numbers (inclusive)
+        max (int): the maximum value of the numbers (inclusive)
+        engine (str): how the numbers get generated, one of rng.ENGINES
+        jobs (int): the number of worker processes, 0 for every core
+        shard_size (int): the amount of numbers per worker task
+        seed (int, str or bytes): draws the numbers from a drbg.CounterDRBG
+            of this seed, one stream per shard, for reproducible output
+            [default = None (os.urandom)]
+
+    Yields:
+        array or [int]: the shards of numbers, in a stable order
+    """
+    shards = ((size, min, max, engine, seed, i)
+            for i, size in enumerate(_split(count, shard_size)))
+    yield from _run_ordered(_number_shard, shards, jobs)
+
+def parallel_passphrases(words, batch, count=5, pattern='[^a-zA-Z]', jobs=0,
+        shard_size=PASSPHRASE_SHARD_SIZE, seed=None, unique=False,
+        weights=None):
+    """ Generates 'batch' passphrases across a pool of worker processes, each
+    worker loading (and caching) the wordlist once
+
+    Args:
+        words (object): any of the valid data types of wl.read_words(), a
+            file path is by far the cheapest to hand to the workers
+        batch (int): the number of passphrases to generate
+        count (int): the number of random words in every passphrase
+        pattern (str): a string representing a regex pattern of valid chars
+        jobs (int): the number of worker processes, 0 for every core
+        shard_size (int): the amount of passphrases per worker task
+        seed (int, str or bytes): draws the words from a drbg.CounterDRBG
+            of this seed, one stream per shard, for reproducible output
+            [default = None (os.urandom)]
+        unique (bool): keeps words from repeating within a passphrase
+        weights (sampling.AliasTable): picks words by weight, see
+            wl.read_random_words()
+
+    Yields:
+        [str]: every passphrase as its list of words, in a stable order
+    """
+    shards = ((words, size, count, pattern, seed, i, unique, weights)
+            for i, size in enumerate(_split(batch, shard_size)))
+    for shard in _run_ordered(_passphrase_shard, shards, jobs):
+        yield from shard
@@ -6,18 +6,106 @@
 
 #! 
 
-# TODO: delete unnecessary modules and find a cleaner way to do system stuff
-from collections import Counter
-from functools import reduce
-from math import log10
-#import numpy as np # TODO: change self.numbers into a numpy array
-import optparse
+# Modules only some runs need (secrets, rngstats, parallel, optparse...)
+# get imported where they're used, so printing a few numbers starts fast
+import entropy
+import instrument
+from array import array
 import os
-import secrets
-from statistics import mean, median, pstdev, pvariance, stdev, variance
+import rngio
 import sys
 #import subprocess
 
+def randbelow_secrets(bound, count, offset=0):
+    """ Generates 'count' random integers with one secrets.randbelow call each
+    """
+    import secrets
+    with instrument.stage('rng.secrets'):
+        return [secrets.randbelow(bound) + offset for null in range(count)]
+
+# the available ways of generating numbers, see RandomNumbers(engine=...)
+#   secrets: one secrets.randbelow call per number
+#   bulk: large os.urandom buffers turned into numbers by rejection sampling
+ENGINES = {
+    'secrets': randbelow_secrets,
+    'bulk': entropy.randbelow_bulk,
+}
+
+def get_engine(engine, randbytes=None):
+    """ Looks up an engine of ENGINES, bound to a byte source if given
+
+    Args:
+        engine (str): the name of an engine in ENGINES
+        randbytes (callable): a source of random bytes for the 'bulk' engine,
+            ie. entropy.EntropyPool.randbytes [default = os.urandom]
+
+    Returns:
+        callable: a function of (bound, count, offset) returning a list
+    """
+    if engine not in ENGINES:
+        raise ValueError("unknown engine '{}'".format(engine))
+    if randbytes is None:
+        return ENGINES[engine]
+    if engine != 'bulk':
+        raise ValueError("only the bulk engine draws from a randbytes source")
+    return lambda bound, count, offset=0: entropy.randbelow_bulk(
+            bound, count, offset, randbytes=randbytes)
+
+def stream_numbers(count, min=0, max=10, engine='bulk',
+        chunk_size=entropy.BATCH_SIZE, jobs=1, randbytes=None, seed=None,
+        seen=None, typecode=None):
+    """ Generates 'count' random numbers as a series of lists (chunks) of at
+    most 'chunk_size' numbers, so memory use stays flat however large the
+    count gets
+
+    Args:
+        count (int): the total amount of random numbers to generate
+        min (int): the minimum value of the numbers (inclusive)
+        max (int): the maximum value of the numbers (inclusive)
+        engine (str): how the numbers get generated, one of ENGINES
+        chunk_size (int): the largest amount of numbers yielded at once
+        jobs (int): the number of worker processes splitting the work, see
+            parallel.parallel_numbers(), 0 for every core [default = 1]
+        randbytes (callable): a source of random bytes for the bulk engine,
+            workers started with jobs != 1 always use their own os.urandom
+        seed (int, str or bytes): makes the numbers reproducible, drawn in
+            shards of parallel.NUMBER_SHARD_SIZE from the streams of a
+            drbg.CounterDRBG of the seed, the same for any 'jobs'
+        seen (bloom.BloomFilter): drops the numbers it has seen before,
+            across runs, and adds the rest, regenerating every dropped one
+        typecode (str): has the bulk engine generate chunks straight into
+            arrays of this typecode (see entropy.randbelow_bulk()), which
+            skips a conversion for callers storing arrays
+
+    Yields:
+        [int]: the next chunk of random numbers, a list or an array
+    """
+    generate = get_engine(engine, randbytes)
+    if seed is not None and randbytes is not None:
+        raise ValueError("give either a seed or a randbytes source, not both")
+    if seen is not None:
+        import bloom
+        top_up = get_engine(engine, bloom.top_up_source(seed, randbytes))
+        for chunk in stream_numbers(count, min, max, engine, chunk_size, jobs,
+                randbytes, seed):
+            yield list(seen.unique(chunk,
+                lambda n: top_up(max - min + 1, n, min)))
+        return
+    if jobs != 1 or seed is not None:
+        import parallel
+        yield from parallel.parallel_numbers(count, min, max, engine, jobs,
+                seed=seed)
+        return
+    if typecode is not None and engine == 'bulk':
+        source = randbytes or os.urandom
+        generate = lambda bound, size, offset: entropy.randbelow_bulk(
+                bound, size, offset, source, typecode)
+    remaining = count
+    while remaining > 0:
+        size = chunk_size if remaining > chunk_size else remaining
+        yield generate(max - min + 1, size, min)
+        remaining -= size
+
 def lazy_property(fn):
     '''Decorator that makes a property lazy-evaluated.
     '''
@@ -35,36 +123,121 @@ class RandomNumbers(object):
 	cryptographically safe random numbers
 
 	Atrributes:
-            numbers: a list of random numbers with the same attributes
+            numbers: an array of the random numbers, of the smallest
+                typecode fitting min & max (see rngio.typecode()), or a list
+                for ranges wider than 64 bits
+            typecode: the array typecode of numbers, None for a list
             count: the length of the above array
             min: the minimum value of the numbers (inclusive)
             max: the maximum value of the numbers (inclusive)
+            engine: how the numbers get generated, one of ENGINES
+            jobs: the number of worker processes generating the numbers
+            randbytes: an optional source of random bytes for the bulk engine,
+                ie. entropy.shared_pool().randbytes or a drbg.CounterDRBG
+            seed: an optional seed making the numbers reproducible, see
+                stream_numbers()
+            seen: an optional bloom.BloomFilter keeping numbers issued by
+                earlier runs out, see stream_numbers()
             TODO: interval: (TBA) the interval between each possible number
                 - Validate min, max, count
     """
-    def __init__(self, count=1, min=0, max=10):
+    def __init__(self, count=1, min=0, max=10, engine='bulk', jobs=1,
+            randbytes=None, seed=None, seen=None):
+        # fail on a bad engine or randbytes before allocating anything
+        get_engine(engine, randbytes)
         self.count  = count
         self.min    = min
         self.max    = max
         self.range  = max - min
-        rnd         = lambda: secrets.randbelow(self.range + 1) + self.min
-        self.numbers  = [rnd() for null in range(self.count)]
+        self.engine = engine
+        self.jobs   = jobs
+        self.seed   = seed
+        try:
+            self.typecode = rngio.typecode(min, max)
+            self.numbers = array(self.typecode)
+        except ValueError:
+            self.typecode = None
+            self.numbers = []
+        if engine == 'bulk' and jobs == 1 and seed is None and seen is None \
+                and self.typecode is not None \
+                and self.range + 1 == 1 << (8 * self.numbers.itemsize):
+            # every bit pattern of the typecode is a valid number, so the
+            # random bytes are the numbers as they are
+            self._fill_raw(randbytes or os.urandom)
+        else:
+            for chunk in stream_numbers(count, min, max, engine, jobs=jobs,
+                    randbytes=randbytes, seed=seed, seen=seen,
+                    typecode=self.typecode):
+                self.numbers.extend(chunk)
+
+    def _fill_raw(self, randbytes):
+        """ Fills numbers straight from random bytes, a chunk at a time
+        """
+        remaining = self.count
+        while remaining > 0:
+            size = min(remaining, 16 * entropy.BATCH_SIZE)
+            with instrument.stage('entropy.read'):
+                self.numbers.frombytes(randbytes(size * self.numbers.itemsize))
+            if instrument.enabled:
+                instrument.count('entropy.bytes', size * self.numbers.itemsize)
+            remaining -= size
+
+    def __len__(self):
+        return len(self.numbers)
+
+    def __getitem__(self, i):
+        return self.numbers[i]
+
+    def __iter__(self):
+        return iter(self.numbers)
+
+    def view(self):
+        """ a zero-copy memoryview of the numbers, in native byte order,
+        ie. for file.write() or numpy.frombuffer()
+        """
+        if self.typecode is None:
+            raise ValueError("numbers wider than 64 bits aren't held in a buffer")
+        return memoryview(self.numbers)
+
+    def to_numpy(self):
+        """ the numbers as a NumPy array sharing their memory (needs numpy)
+        """
+        import numpy
+        return numpy.frombuffer(self.view(), dtype=self.typecode)
 
     def __str__(self):
         """ return the numbers only, in a space delimited string
         """
-        string = ""
-        for x in self.numbers:
-            string += str(x) + " "
-        return string
+        if not self.numbers:
+            return ""
+        with instrument.stage('rng.format'):
+            return " ".join(map(str, self.numbers)) + " "
+
+    def write(self, file, format='text'):
+        """ writes the numbers to a binary file in one of rngio.FORMATS
+        """
+        writer = rngio.NumberWriter(file, format, self.min, self.max, self.count)
+        writer.write(self.numbers)
+        writer.close()
+
+    @lazy_property
+    def stats(self):
+        """ a rngstats.StreamStats accumulator over all the numbers
+        """
+        import rngstats
+        return rngstats.StreamStats(self.numbers, min=self.min, max=self.max)
 
     @lazy_property
     def avg(self):
-        return mean(self.numbers)
+        return self.stats.mean
 
     @lazy_property
     def pvar(self):
-        return pvariance(self.numbers)
+        return self.stats.pvariance
+
+    @lazy_property
+    def var(self):
+        return self.stats.variance
 
     @lazy_property
     def std_dev(self):
@@ -72,49 +245,25 @@ class RandomNumbers(object):
 
     @lazy_property
     def pstd_dev(self):
-        return pstdev(self.numbers)
+        return self.stats.pstdev
 
     @lazy_property
     def med(self):
-        return median(self.numbers)
+        return self.stats.median
 
-    def print_frequency(self, ispercent=True):
+    def print_frequency(self, ispercent=True, order='value'):
         """ prints an output showing the frequencies of each number
         """
-        #count the occurences
-        freqs = Counter(self.numbers)
-        # convert into a percentage
-        if ispercent:
-            freqs = [(i, freqs[i] / len(self.numbers) * 100.0) for i in freqs]
-
-        out_str = "Frequencies of Numbers:\n"
-        out_str += "-----------------------\n"
-        for x in freqs:
-            if x[0] > 0: chars = 1 + int(log10(x[0]))
-            elif x[0] < 0: chars = 2 + int(log10(abs(x[0])))
-            else: chars = 1
-            out_str += "  "
-            out_str += str(x[0]) + ":"
-            padding = 8 - chars
-            for i in range(0, padding):
-                out_str += " "
-            out_str += "{0:.2f}".format(x[1])
-            out_str += "\n"
-        print(out_str)
+        self.stats.print_frequency(ispercent, order)
 
     def print_stats(self):
-        # TODO: % diff from uniform dev
-        print("mean: {:.2f}".format(self.avg))
-        print("pvariance: {:.2f}".format(self.pvar))
-        print("p-std-dev: {:.2f}".format(self.pvar**0.5))
-        print("uniform-dev: {:.2f}".format(self.range/(12**0.5)))
-        print("median: {}".format(self.med))
-        self.print_frequency()
-
+        self.stats.print_stats()
 
 
 if __name__ == '__main__':
     # main execution
+    import atexit
+    import optparse
     
     # FIRST check that the host OS has a 
     #   cryptographically secure method to generate random numbers
@@ -132,7 +281,27 @@ if __name__ == '__main__':
         "min": "sets the minimum value (inclusive) of random numbers [default = 1]",
         "max": "sets the maximum value (inclusive) of random numbers [default = 10]",
         "count": "sets the amount of random numbers to generate [default = 1]",
-        "stats": "print out the stats of the given random numbers"
+        "stats": "print out the stats of the given random numbers",
+        "engine": "sets how numbers get generated, one of: " +
+            ", ".join(ENGINES) + " [default = bulk]",
+        "stream": "write numbers out as they are generated instead of " +
+            "storing them, keeping memory use flat for any count",
+        "format": "sets the output format, one of: " +
+            ", ".join(rngio.FORMATS) + " [default = text]",
+        "output": "sets the file to write numbers to [default = - (stdout)]",
+        "jobs": "sets the number of worker processes generating numbers, " +
+            "0 for every core [default = 1]",
+        "profile": "times every stage & counts hot path events, writing " +
+            "a report to stderr in the given format: json or prometheus",
+        "seed": "draws the numbers from a deterministic generator of the " +
+            "given seed (see drbg.py), so runs can be replayed, with any --jobs",
+        "bloom": "never outputs a number twice across runs: keeps every " +
+            "number issued in a persistent Bloom filter at the given path " +
+            "(see bloom.py) and regenerates the ones it has seen",
+        "bloom_capacity": "sets the amount of numbers a new --bloom filter " +
+            "is sized for [default = 1000000]",
+        "bloom_error": "sets the false positive rate of a new --bloom " +
+            "filter at its capacity [default = 1e-06]",
         }
 
     parser.add_option('-f', '--min',
@@ -143,14 +312,89 @@ if __name__ == '__main__':
             dest='count', help=help_strings["count"], type=int, default=1)
     parser.add_option('-s', '--stats',
             dest='stats', help=help_strings["stats"], action="store_true", default=False)
+    parser.add_option('-e', '--engine',
+            dest='engine', help=help_strings["engine"], type="choice",
+            choices=list(ENGINES), default="bulk")
+    parser.add_option('--stream',
+            dest='stream', help=help_strings["stream"], action="store_true", default=False)
+    parser.add_option('-F', '--format',
+            dest='format', help=help_strings["format"], type="choice",
+            choices=list(rngio.FORMATS), default="text")
+    parser.add_option('-o', '--output',
+            dest='output', help=help_strings["output"], type="string", default="-")
+    parser.add_option('-j', '--jobs',
+            dest='jobs', help=help_strings["jobs"], type=int, default=1)
+    parser.add_option('--profile',
+            dest='profile', help=help_strings["profile"], type="choice",
+            choices=list(instrument.FORMATS), default=None)
+    parser.add_option('--seed',
+            dest='seed', help=help_strings["seed"], type="string", default=None)
+    parser.add_option('--bloom',
+            dest='bloom', help=help_strings["bloom"], type="string", default=None)
+    parser.add_option('--bloom-capacity',
+            dest='bloom_capacity', help=help_strings["bloom_capacity"],
+            type=int, default=10**6)
+    parser.add_option('--bloom-error',
+            dest='bloom_error', help=help_strings["bloom_error"], type=float,
+            default=1e-6)
 
     (opts, args) = parser.parse_args()
-    numbers = RandomNumbers(count=opts.count, min=opts.min, max=opts.max)
 
-    if opts.stats:
-        numbers.print_stats()
-    else:
-        print(numbers)
+    if opts.profile:
+        instrument.enable()
+        atexit.register(instrument.dump, None, opts.profile)
+
+    seen = None
+    if opts.bloom is not None:
+        import bloom
+        if opts.stats:
+            print("[ERROR]: --bloom only applies to numbers written out, not --stats")
+            sys.exit(1)
+        try:
+            seen = bloom.open_filter(opts.bloom, opts.bloom_capacity,
+                    opts.bloom_error)
+        except (OSError, ValueError) as err:
+            print("[ERROR]: {}".format(err))
+            sys.exit(1)
+        # runs last to first, so the stats come before the close
+        atexit.register(seen.close)
+        atexit.register(seen.print_stats)
+
+    try:
+        if opts.stats and opts.stream:
+            import rngstats
+            # accumulate chunk by chunk without ever storing the numbers
+            stats = rngstats.StreamStats(min=opts.min, max=opts.max)
+            for chunk in stream_numbers(opts.count, opts.min, opts.max,
+                    engine=opts.engine, jobs=opts.jobs, seed=opts.seed):
+                stats.update(chunk)
+            stats.print_stats()
+        elif opts.stats:
+            numbers = RandomNumbers(count=opts.count, min=opts.min,
+                    max=opts.max, engine=opts.engine, jobs=opts.jobs,
+                    seed=opts.seed)
+            numbers.print_stats()
+        else:
+            with rngio.open_output(opts.output, opts.format) as out:
+                writer = rngio.NumberWriter(out, opts.format, opts.min,
+                        opts.max, opts.count)
+                if opts.stream:
+                    writer.write_chunks(stream_numbers(opts.count, opts.min,
+                        opts.max, engine=opts.engine, jobs=opts.jobs,
+                        seed=opts.seed, seen=seen))
+                else:
+                    numbers = RandomNumbers(count=opts.count, min=opts.min,
+                            max=opts.max, engine=opts.engine, jobs=opts.jobs,
+                            seed=opts.seed, seen=seen)
+                    writer.write(numbers.numbers)
+                    writer.close()
+    except ValueError as err:
+        print("[ERROR]: {}".format(err))
+        sys.exit(1)
+    except BrokenPipeError:
+        # the reading end (ie. head) closed early, which is fine,
+        # point stdout at devnull so the exit flush doesn't raise again
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
 
     
 
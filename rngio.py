@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+""" Output layer for rng.py that writes random numbers straight to a file or
+    stdout in bulk, one chunk of numbers at a time.
+
+    Formats:
+        - text: space delimited numbers, the same as str(RandomNumbers)
+        - lines: one number per line
+        - csv: comma delimited numbers
+        - hex: space delimited, fixed width, big-endian hex of each number
+        - bin: raw little-endian integers, sized to fit min & max
+        - npy: a NumPy .npy file holding a 1-D array of the numbers
+
+    The binary formats never convert numbers to text, which makes them the
+    cheapest way of feeding numbers into other programs.
+"""
+
+################################################################################
+## Imports
+################################################################################
+
+from array import array
+import instrument
+import sys
+
+
+
+################################################################################
+## Module Constants
+################################################################################
+
+FORMATS = ('text', 'lines', 'csv', 'hex', 'bin', 'npy')
+BINARY_FORMATS = ('hex', 'bin', 'npy')
+
+# array typecodes, from which one of each matching byte width gets picked
+_UNSIGNED_TYPECODES = 'BHILQ'
+_SIGNED_TYPECODES = 'bhilq'
+
+# text formats: (delimiter between numbers, trailer written after the last)
+_TEXT_DELIMITERS = {
+    'text': (" ", " \n"),
+    'lines': ("\n", "\n"),
+    'csv': (",", "\n"),
+}
+
+
+
+################################################################################
+## Module Functions
+################################################################################
+
+def typecode(min, max):
+    """ Picks the smallest array typecode able to hold every value in a range
+
+    Args:
+        min (int): the minimum value (inclusive) to hold
+        max (int): the maximum value (inclusive) to hold
+
+    Returns:
+        str: an array module typecode, signed only when min is negative
+
+    Raises:
+        ValueError: when the range doesn't fit a 64 bit integer
+    """
+    codes = _SIGNED_TYPECODES if min < 0 else _UNSIGNED_TYPECODES
+    for code in codes:
+        bits = 8 * array(code).itemsize
+        if min < 0:
+            low, high = -(1 << (bits - 1)), (1 << (bits - 1)) - 1
+        else:
+            low, high = 0, (1 << bits) - 1
+        if low <= min and max <= high:
+            return code
+    raise ValueError("range [{}, {}] doesn't fit a 64 bit integer".format(min, max))
+
+def to_array(numbers, code):
+    """ Packs numbers into an array of 'code', in little-endian byte order
+    """
+    packed = numbers if isinstance(numbers, array) and numbers.typecode == code \
+            else array(code, numbers)
+    if sys.byteorder == 'big':
+        packed = array(code, packed)
+        packed.byteswap()
+    return packed
+
+def npy_header(code, count):
+    """ Builds a version 1.0 .npy header for a 1-D array of 'count' numbers
+    """
+    kind = 'i' if code in _SIGNED_TYPECODES else 'u'
+    descr = "<{}{}".format(kind, array(code).itemsize)
+    header = "{{'descr': '{}', 'fortran_order': False, 'shape': ({},), }}".format(
+            descr, count)
+    # magic (6) + version (2) + header length (2) + header must align to 64
+    padding = 63 - (10 + len(header)) % 64
+    header += " " * padding + "\n"
+    return b"\x93NUMPY\x01\x00" + len(header).to_bytes(2, 'little') + header.encode('latin1')
+
+def open_output(path=None, format='text'):
+    """ Opens the destination of a NumberWriter as a binary file
+
+    Args:
+        path (str): a path to write to, None or '-' means stdout
+        format (str): one of FORMATS, only used for validation
+
+    Returns:
+        file: a binary writable file object for the caller to close, ie.
+            in a with statement, stdout's leaves stdout itself open
+    """
+    if format not in FORMATS:
+        raise ValueError("unknown format '{}'".format(format))
+    if path is None or path == '-':
+        # whatever was printed so far must come out before the numbers
+        sys.stdout.flush()
+        return open(sys.stdout.fileno(), 'wb', closefd=False)
+    return open(path, 'wb')
+
+
+
+################################################################################
+## Module Classes
+################################################################################
+
+class NumberWriter(object):
+    """ Writes chunks of random numbers to a binary file in one of FORMATS
+
+    Attributes:
+        file: the binary file object written to
+        format: one of FORMATS
+        min: the minimum value (inclusive) of the written numbers
+        max: the maximum value (inclusive) of the written numbers
+        count: the total amount of numbers, needed upfront for 'npy'
+        written: the amount of numbers written so far
+    """
+    def __init__(self, file, format='text', min=0, max=10, count=None):
+        if format not in FORMATS:
+            raise ValueError("unknown format '{}'".format(format))
+        self.file = file
+        self.format = format
+        self.min = min
+        self.max = max
+        self.count = count
+        self.written = 0
+        self.code = typecode(min, max) if format in BINARY_FORMATS else None
+        if format == 'npy':
+            if count is None:
+                raise ValueError("the npy format needs the count upfront")
+            self.file.write(npy_header(self.code, count))
+
+    def write(self, numbers):
+        """ Writes a chunk of numbers in a single call to the file
+        """
+        if instrument.enabled:
+            instrument.count('output.numbers', len(numbers))
+            with instrument.stage('output.' + self.format):
+                return self._write(numbers)
+        return self._write(numbers)
+
+    def _write(self, numbers):
+        """ write() without the instrumentation
+        """
+        if self.format in _TEXT_DELIMITERS:
+            delimiter = _TEXT_DELIMITERS[self.format][0]
+            text = delimiter.join(map(str, numbers))
+            if self.written and text:
+                text = delimiter + text
+            self.file.write(text.encode('ascii'))
+            self.written += len(numbers)
+            return
+        packed = to_array(numbers, self.code)
+        if self.format == 'hex':
+            # hex reads most naturally big-endian, so swap each value back,
+            # on a copy as to_array() may hand back the caller's own array
+            if packed is numbers:
+                packed = array(self.code, packed)
+            packed.byteswap()
+            text = packed.tobytes().hex(' ', packed.itemsize)
+            if self.written and text:
+                text = ' ' + text
+            self.file.write(text.encode('ascii'))
+        else:
+            self.file.write(memoryview(packed).cast('B'))
+        self.written += len(packed)
+
+    def write_chunks(self, chunks):
+        """ Writes every chunk of an iterable of chunks, then closes the writer
+        """
+        for chunk in chunks:
+            self.write(chunk)
+        self.close()
+
+    def close(self):
+        """ Writes the format trailer (if any) & flushes the file
+        """
+        if self.format in _TEXT_DELIMITERS:
+            if self.written:
+                self.file.write(_TEXT_DELIMITERS[self.format][1].encode('ascii'))
+            else:
+                self.file.write(b"\n")
+        elif self.format == 'hex':
+            self.file.write(b"\n")
+        elif self.format == 'npy' and self.written != self.count:
+            raise ValueError("npy header promised {} numbers, wrote {}".format(
+                self.count, self.written))
+        self.file.flush()
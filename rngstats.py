@@ -0,0 +1,347 @@
+#!/usr/bin/env python
+""" Streaming statistics for random numbers produced by rng.py
+
+    A StreamStats accumulator counts every number into a histogram in one
+    pass, then derives the mean, variance, min, max & exact median from the
+    histogram alone. Because the range of the numbers is bounded, the
+    histogram stays small however many numbers get fed in, so chunks from
+    rng.stream_numbers() can be accumulated without ever storing them, and
+    accumulators of separate chunks (or processes) can be merged.
+
+    The histogram is a dense array of one counter per possible value when
+    the range is known and small enough (see DENSE_LIMIT), and a sparse
+    Counter of the values seen otherwise.
+"""
+
+################################################################################
+## Imports
+################################################################################
+
+from array import array
+from collections import Counter
+from fractions import Fraction
+from statistics import StatisticsError
+import sys
+
+
+
+################################################################################
+## Module Constants
+################################################################################
+
+# ranges holding up to this many values get a dense histogram
+DENSE_LIMIT = 1 << 20
+
+FREQUENCY_ORDERS = ('value', 'frequency')
+
+# the chi-square approximation only holds once every value is expected to
+# be counted at least this many times, below it uniformity() has no p-value
+MIN_EXPECTED = 5
+
+
+
+################################################################################
+## Module Classes
+################################################################################
+
+class Histogram(object):
+    """ Counts of integers over a bounded range, dense or sparse
+
+    Chunks are tallied by Counter (which counts in C) and, for a dense
+    histogram, scattered into an array of one counter per value of the
+    range, so the per-number cost never touches Python level indexing.
+
+    Attributes:
+        min: the minimum possible value (inclusive), if known
+        max: the maximum possible value (inclusive), if known
+        dense: True when the counts are held in an array over [min, max]
+        n: the amount of numbers counted
+    """
+    def __init__(self, min=None, max=None):
+        self.min = min
+        self.max = max
+        self.dense = min is not None and max is not None \
+                and max - min + 1 <= DENSE_LIMIT
+        self.n = 0
+        self._items = None
+        if self.dense:
+            self._counts = array('Q', bytes(8 * (max - min + 1)))
+        else:
+            self._counts = Counter()
+
+    @property
+    def bins(self):
+        """ the amount of possible values, None for an unknown range """
+        if self.min is None or self.max is None:
+            return None
+        return self.max - self.min + 1
+
+    def update(self, numbers):
+        """ Counts a chunk of numbers
+        """
+        self._add(Counter(numbers))
+
+    def merge(self, other):
+        """ Adds the counts of another histogram to this one
+        """
+        self._add(dict(other.items()))
+
+    def _add(self, counts):
+        """ Adds a mapping of value -> frequency to the histogram
+        """
+        self._items = None
+        if not self.dense:
+            self._counts.update(counts)
+            self.n += sum(counts.values())
+            return
+        low, high, dense = self.min, self.max, self._counts
+        for value, freq in counts.items():
+            if not low <= value <= high:
+                raise ValueError("{} is outside of the histogram range [{}, {}]"
+                        .format(value, low, high))
+            dense[value - low] += freq
+            self.n += freq
+
+    def __getitem__(self, value):
+        if self.dense:
+            if not self.min <= value <= self.max:
+                return 0
+            return self._counts[value - self.min]
+        return self._counts[value]
+
+    def items(self):
+        """ Returns the (value, frequency) of every value seen, by value
+        """
+        if self._items is None:
+            if self.dense:
+                low = self.min
+                self._items = [(i + low, freq)
+                        for i, freq in enumerate(self._counts) if freq]
+            else:
+                self._items = sorted(self._counts.items())
+        return list(self._items)
+
+    def uniformity(self):
+        """ Measures the counts against a uniform spread over [min, max]
+
+        Both measures come out of a single pass over the counts: the
+        chi-square statistic is sum(o^2) / e - n, as the observed (o) and
+        expected (e) counts both sum to n, and values never seen count as
+        a deviation of e.
+
+        Returns:
+            dict: the 'chi_square' statistic, its degrees of freedom 'df' &
+                'p_value', and the largest deviation from the expected count
+                of any value, absolute ('max_deviation') & relative to the
+                expected count ('max_deviation_ratio'). Every value but 'df'
+                & 'expected' is None when fewer than MIN_EXPECTED numbers
+                are 'expected' per value, as too few for any of them to mean
+                anything (ie. 3 numbers over a range of 10^23 values)
+
+        Raises:
+            ValueError: when the range isn't known or nothing was counted
+        """
+        bins = self.bins
+        if bins is None or not self.n:
+            raise ValueError("uniformity() needs a known range & some numbers")
+        expected = self.n / bins
+        if expected < MIN_EXPECTED:
+            return {"chi_square": None, "df": bins - 1, "p_value": None,
+                    "max_deviation": None, "max_deviation_ratio": None,
+                    "expected": expected}
+        squares = 0
+        deviation = 0.0
+        seen = 0
+        for value, freq in self.items():
+            squares += freq * freq
+            deviation = max(deviation, abs(freq - expected))
+            seen += 1
+        if seen < bins:
+            deviation = max(deviation, expected)
+        statistic = squares / expected - self.n
+        from evaluations import igamc
+        return {"chi_square": statistic, "df": bins - 1,
+                "p_value": igamc((bins - 1) / 2, statistic / 2) if bins > 1 else 1.0,
+                "max_deviation": deviation,
+                "max_deviation_ratio": deviation / expected,
+                "expected": expected}
+
+    def table(self, ispercent=True, order='value'):
+        """ Formats a frequency table of every value seen, one per line
+
+        Args:
+            ispercent (bool): shows frequencies as a percentage of all numbers
+            order (str): one of FREQUENCY_ORDERS, ascending values or
+                descending frequencies [default = value]
+
+        Returns:
+            str: the whole table as one block
+        """
+        if order not in FREQUENCY_ORDERS:
+            raise ValueError("unknown frequency order '{}'".format(order))
+        items = self.items()
+        if not items:
+            return ""
+        # the widest value is at one end of the range, the +1 is for the ':'
+        width = max(len(str(items[0][0])), len(str(items[-1][0]))) + 1
+        if order == 'frequency':
+            # a stable sort, so values of equal frequency stay in order
+            items.sort(key=lambda item: -item[1])
+        if ispercent:
+            scale = 100.0 / self.n
+            line = "  {{:<{}}}{{:>8.2f}}".format(width).format
+            return "\n".join([line(str(v) + ":", f * scale) for v, f in items])
+        line = "  {{:<{}}}{{:>8}}".format(width).format
+        return "\n".join([line(str(v) + ":", f) for v, f in items])
+
+
+class StreamStats(object):
+    """ A mergeable, single pass accumulator of statistics over integers
+
+    Attributes:
+        counts: a Histogram of every number seen
+        min: the minimum possible value (inclusive), if known
+        max: the maximum possible value (inclusive), if known
+    """
+    def __init__(self, numbers=(), min=None, max=None):
+        self.counts = Histogram(min, max)
+        self.min = min
+        self.max = max
+        self.update(numbers)
+
+    def update(self, numbers):
+        """ Adds a chunk of numbers to the accumulator in one pass
+        """
+        self.counts.update(numbers)
+        # every derived statistic is stale now
+        self._moments = None
+        return self
+
+    def merge(self, other):
+        """ Adds the histogram of another accumulator to this one
+        """
+        self.counts.merge(other.counts)
+        self._moments = None
+        return self
+
+    def __iadd__(self, other):
+        return self.merge(other)
+
+    def __add__(self, other):
+        merged = StreamStats(min=self.min, max=self.max)
+        return merged.merge(self).merge(other)
+
+    def _sums(self):
+        """ Returns the exact (n, sum, sum of squares) of the histogram
+        """
+        if self._moments is None:
+            n = total = squares = 0
+            for value, freq in self.counts.items():
+                n += freq
+                total += value * freq
+                squares += value * value * freq
+            self._moments = (n, total, squares)
+        return self._moments
+
+    @property
+    def n(self):
+        return self._sums()[0]
+
+    @property
+    def mean(self):
+        n, total, squares = self._sums()
+        if n < 1:
+            raise StatisticsError("mean requires at least one data point")
+        return float(Fraction(total, n))
+
+    @property
+    def pvariance(self):
+        n, total, squares = self._sums()
+        if n < 1:
+            raise StatisticsError("pvariance requires at least one data point")
+        return float(Fraction(n * squares - total * total, n * n))
+
+    @property
+    def variance(self):
+        n, total, squares = self._sums()
+        if n < 2:
+            raise StatisticsError("variance requires at least two data points")
+        return float(Fraction(n * squares - total * total, n * (n - 1)))
+
+    @property
+    def pstdev(self):
+        return self.pvariance**0.5
+
+    @property
+    def stdev(self):
+        return self.variance**0.5
+
+    @property
+    def low(self):
+        """ the smallest number seen """
+        if not self.n:
+            raise StatisticsError("low requires at least one data point")
+        return self.counts.items()[0][0]
+
+    @property
+    def high(self):
+        """ the largest number seen """
+        if not self.n:
+            raise StatisticsError("high requires at least one data point")
+        return self.counts.items()[-1][0]
+
+    def kth(self, k):
+        """ Returns the k-th smallest (0-indexed) number seen
+        """
+        seen = 0
+        for value, freq in self.counts.items():
+            seen += freq
+            if seen > k:
+                return value
+        raise IndexError("kth() index out of range")
+
+    @property
+    def median(self):
+        """ the exact median, the mean of the middle two for even counts """
+        n = self.n
+        if not n:
+            raise StatisticsError("no median for empty data")
+        if n % 2:
+            return self.kth(n // 2)
+        low, high = self.kth(n // 2 - 1), self.kth(n // 2)
+        return low if low == high else (low + high) / 2
+
+    def uniformity(self):
+        """ the chi-square & max deviation of the numbers against a uniform
+        spread over [min, max], see Histogram.uniformity() """
+        return self.counts.uniformity()
+
+    def print_frequency(self, ispercent=True, order='value'):
+        """ prints a table of the frequency of each number, sorted by value
+        or by descending frequency (see FREQUENCY_ORDERS)
+        """
+        sys.stdout.write("Frequencies of Numbers:\n"
+                "-----------------------\n" +
+                self.counts.table(ispercent, order) + "\n\n")
+
+    def print_stats(self):
+        # TODO: % diff from uniform dev
+        print("mean: {:.2f}".format(self.mean))
+        print("pvariance: {:.2f}".format(self.pvariance))
+        print("p-std-dev: {:.2f}".format(self.pstdev))
+        if self.min is not None and self.max is not None:
+            print("uniform-dev: {:.2f}".format((self.max - self.min)/(12**0.5)))
+        print("min: {}".format(self.low))
+        print("max: {}".format(self.high))
+        print("median: {}".format(self.median))
+        if self.counts.bins is not None:
+            uniformity = self.uniformity()
+        if self.counts.bins is not None and uniformity["p_value"] is None:
+            print("chi-square: skipped ({:.3g} numbers expected per value, "
+                    "fewer than {})".format(uniformity["expected"], MIN_EXPECTED))
+        elif self.counts.bins is not None:
+            print("chi-square: {:.2f} (df {}, p-value {:.4f})".format(
+                uniformity["chi_square"], uniformity["df"], uniformity["p_value"]))
+            print("max-deviation: {:.2f} ({:.2%} of expected)".format(
+                uniformity["max_deviation"], uniformity["max_deviation_ratio"]))
+        self.print_frequency()
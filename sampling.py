@@ -0,0 +1,370 @@
+#!/usr/bin/env python
+""" Unique & weighted sampling of word indices for wl.py
+
+    Plain picks (see wl.read_random_words()) draw every index independently
+    and uniformly, so a passphrase may repeat a word. Two more modes:
+
+        - unique: no index repeats within a pick. A partial Fisher-Yates
+          shuffle of a virtual range(size), keeping only the swapped slots
+          in a dict, so a pick costs O(count) time & memory, not O(size).
+        - weighted: index i comes up with probability weight[i] / total,
+          drawn in O(1) each from a Vose alias table built once per list.
+
+    Every mode knows the exact entropy in bits of what it yields, see
+    entropy_bits().
+
+    Streams of words of unknown length (stdin, pipes, compressed lists) get
+    sampled in a single pass by reservoir_sample(), with Li's Algorithm L:
+    the amount of words to skip until the next one kept is drawn directly,
+    and skipped with itertools.islice, so memory only grows with the amount
+    of words picked and little Python code runs per word of the stream.
+
+    Alias tables of wordlist files come from a per-word weight column, the
+    last whitespace separated field of every line by default, ie.
+
+        abacus  120
+        abbey   87.5
+
+    and are cached per file (see load_alias_table()), rebuilt only when the
+    file changes.
+"""
+
+################################################################################
+## Imports
+################################################################################
+
+from array import array
+import entropy
+from functools import lru_cache
+from heapq import heapify, heapreplace
+import instrument
+from itertools import islice
+from math import exp, floor, fsum, log, log1p, log2
+import os
+import sys
+
+
+
+################################################################################
+## Module Constants
+################################################################################
+
+SAMPLING_MODES = ('uniform', 'unique', 'weighted')
+
+# the range of the 64 bit words every draw starts from
+_SPAN = 1 << 64
+
+# the float every 53 bit coin flip of an alias table draw gets scaled by
+_COIN_SCALE = 2.0 ** -53
+
+# marks the end of a stream in reservoir_sample()
+_END = object()
+
+
+
+################################################################################
+## Module Functions
+################################################################################
+
+def randbelow_each(bounds, randbytes=os.urandom):
+    """ Draws one uniform integer below each bound, all from a single buffer
+    of 64 bit words, rejecting (and redrawing) the few that would bias the
+    modulo
+
+    Args:
+        bounds ([int]): the exclusive upper limits, each from 1 up to 2**64
+        randbytes (callable): the source of random bytes
+
+    Returns:
+        [int]: a value from [0, bound) per bound, in order
+    """
+    with instrument.stage('entropy.read'):
+        words = memoryview(randbytes(8 * len(bounds))).cast('Q')
+    values = []
+    for bound, word in zip(bounds, words):
+        limit = _SPAN - _SPAN % bound
+        while word >= limit:
+            word = int.from_bytes(randbytes(8), 'little')
+        values.append(word % bound)
+    return values
+
+def _pick_unique(size, draws):
+    """ A partial Fisher-Yates shuffle of range(size) with the given draws,
+    draws[i] being uniform below size - i
+    """
+    swapped = {}
+    picks = []
+    for i, draw in enumerate(draws):
+        j = i + draw
+        picks.append(swapped.get(j, j))
+        swapped[j] = swapped.get(i, i)
+    return picks
+
+def sample_unique(size, count, randbytes=os.urandom):
+    """ Picks 'count' distinct indices of range(size), in a uniformly random
+    order, in O(count) time & memory
+
+    Args:
+        size (int): the amount of indices to pick from
+        count (int): the amount of indices to pick, at most 'size'
+        randbytes (callable): the source of random bytes
+
+    Returns:
+        [int]: the picked indices
+    """
+    return sample_unique_batch(size, count, 1, randbytes)[0]
+
+def sample_unique_batch(size, count, batch, randbytes=os.urandom):
+    """ Makes 'batch' picks of sample_unique(), drawing them all from a
+    single buffer
+
+    Returns:
+        [[int]]: the picked indices of every pick
+    """
+    if not 0 <= count <= size:
+        raise ValueError("can't pick {} distinct words out of {}".format(count, size))
+    if count == 0:
+        return [[] for null in range(batch)]
+    draws = randbelow_each(list(range(size, size - count, -1)) * batch, randbytes)
+    return [_pick_unique(size, draws[i:i + count])
+            for i in range(0, count * batch, count)]
+
+def draw_indices(size, count, batch=1, unique=False, table=None,
+        randbytes=os.urandom):
+    """ Draws the indices of 'batch' picks of 'count' indices each
+
+    Args:
+        size (int): the amount of indices to pick from
+        count (int): the amount of indices in every pick
+        batch (int): the amount of picks
+        unique (bool): keeps indices from repeating within a pick
+        table (AliasTable): weighs the indices, None for uniform picks
+        randbytes (callable): the source of random bytes
+
+    Returns:
+        [int]: the indices of every pick, back to back
+    """
+    if table is not None:
+        if unique:
+            raise ValueError("weighted picks can't be unique")
+        if len(table) != size:
+            raise ValueError("the weights cover {} words, the wordlist has {}"
+                    .format(len(table), size))
+        return table.draw(count * batch, randbytes)
+    if unique:
+        return [i for pick in sample_unique_batch(size, count, batch, randbytes)
+                for i in pick]
+    return entropy.randbelow_bulk(size, count * batch, randbytes=randbytes)
+
+def alias_table(weights):
+    """ Returns 'weights' as an AliasTable, building one unless it is one
+    """
+    if isinstance(weights, AliasTable):
+        return weights
+    return AliasTable(weights)
+
+def read_weights(file_path, column=-1, pattern='[^a-zA-Z]'):
+    """ Reads the weight column of a wordlist file
+
+    Args:
+        file_path (str): the path of a plain wordlist file
+        column (int): the whitespace separated field holding the weight of
+            each line's word [default = -1 (the last one)]
+        pattern (str): the regex pattern of characters wl.py cleans out of
+            every line, lines left without a word have no weight
+
+    Returns:
+        array: the weight of every word, in the order of wl.read_words(),
+            the weights of a word's repeats added up
+    """
+    import wlclean
+    regex = wlclean.compile_pattern(pattern)
+    weights = {}
+    with open(file_path, encoding='utf-8', errors='replace') as file:
+        for number, line in enumerate(file, 1):
+            word = regex.sub('', line)
+            if not word:
+                continue
+            fields = line.split()
+            try:
+                weights[word] = weights.get(word, 0.0) + float(fields[column])
+            except (IndexError, ValueError):
+                raise ValueError("line {} of {} has no weight in column {}".format(
+                    number, file_path, column))
+    return array('d', weights.values())
+
+def load_alias_table(file_path, column=-1, pattern='[^a-zA-Z]'):
+    """ Returns the alias table of a wordlist file's weight column, built
+    on the first call & cached until the file changes
+
+    Args:
+        file_path (str): the path of a plain wordlist file
+        column (int): the field holding the weights, see read_weights()
+        pattern (str): the regex pattern the words get cleaned with
+
+    Returns:
+        AliasTable: the table, its indices matching the words of the file
+    """
+    real_path = os.path.realpath(file_path)
+    stat = os.stat(real_path)
+    return _cached_alias_table(real_path, column, pattern, stat.st_ino,
+            stat.st_size, stat.st_mtime_ns)
+
+@lru_cache(maxsize=8)
+def _cached_alias_table(real_path, column, pattern, ino, size, mtime_ns):
+    """ load_alias_table() keyed on the file identity, so changed files miss
+    """
+    return AliasTable(read_weights(real_path, column, pattern))
+
+def _random_unit(randbytes):
+    """ Returns a uniform float of the open interval (0, 1)
+    """
+    return ((int.from_bytes(randbytes(8), 'little') >> 11) + 0.5) * _COIN_SCALE
+
+def _skip(items, count):
+    """ Drops 'count' items of an iterator & returns the next, or _END
+    """
+    return next(islice(items, min(count, sys.maxsize - 1), None), _END)
+
+def reservoir_sample(items, count, unique=False, randbytes=os.urandom):
+    """ Picks 'count' uniformly random items of an iterable of unknown
+    length in a single pass, keeping only the picks in memory
+
+    Plain picks are 'count' independent reservoirs of one item each, so
+    items can repeat like independent uniform draws. Unique picks are one
+    reservoir of 'count' items, shuffled at the end. Either way only the
+    skip lengths of Algorithm L get drawn, not a number per item.
+
+    Args:
+        items (iterable): the items, ie. the words of a stream
+        count (int): the amount of items to pick
+        unique (bool): picks distinct items (by position)
+        randbytes (callable): the source of random bytes
+
+    Returns:
+        list: the picked items, in a uniformly random order
+    """
+    items = iter(items)
+    if count < 1:
+        return []
+    if unique:
+        reservoir = list(islice(items, count))
+        if len(reservoir) < count:
+            raise ValueError("can't pick {} distinct words out of {}".format(
+                count, len(reservoir)))
+        weight = exp(log(_random_unit(randbytes)) / count)
+        while True:
+            item = _skip(items, floor(log(_random_unit(randbytes)) / log1p(-weight)))
+            if item is _END:
+                break
+            reservoir[entropy.randbelow_bulk(count, 1, randbytes=randbytes)[0]] = item
+            weight *= exp(log(_random_unit(randbytes)) / count)
+        return [reservoir[i] for i in sample_unique(count, count, randbytes)]
+    first = next(items, _END)
+    if first is _END:
+        raise ValueError("can't pick words out of an empty stream")
+    picks = [first] * count
+    # per reservoir: the position of the next item it keeps, itself & its W
+    heap = []
+    for slot in range(count):
+        weight = _random_unit(randbytes)
+        heap.append((1 + floor(log(_random_unit(randbytes)) / log1p(-weight)),
+            slot, weight))
+    heapify(heap)
+    position = 0
+    while True:
+        upcoming = heap[0][0]
+        item = _skip(items, upcoming - position - 1)
+        if item is _END:
+            break
+        position = upcoming
+        while heap[0][0] == position:
+            null, slot, weight = heap[0]
+            picks[slot] = item
+            weight *= _random_unit(randbytes)
+            heapreplace(heap, (position + 1 +
+                floor(log(_random_unit(randbytes)) / log1p(-weight)), slot, weight))
+    return picks
+
+def entropy_bits(size, count, unique=False, table=None):
+    """ Returns the exact entropy in bits of a pick of 'count' indices
+
+    Args:
+        size (int): the amount of indices picked from
+        count (int): the amount of indices picked
+        unique (bool): whether picks are distinct, see sample_unique()
+        table (AliasTable): the weights of weighted picks
+
+    Returns:
+        float: count * log2(size) for uniform picks, log2(size! /
+            (size - count)!) for unique ones & count times the Shannon
+            entropy of the weights for weighted ones
+    """
+    if table is not None:
+        if unique:
+            raise ValueError("weighted picks can't be unique")
+        return count * table.entropy
+    if unique:
+        return fsum(log2(size - i) for i in range(count))
+    return count * log2(size) if size else 0.0
+
+
+
+################################################################################
+## Module Classes
+################################################################################
+
+class AliasTable(object):
+    """ O(1) weighted draws of indices with Vose's alias method
+
+    Each column i holds the probability of keeping i and the index it
+    falls back to otherwise, so a draw is one uniform column & one coin.
+
+    Attributes:
+        prob (array): the probability of keeping each column's own index
+        alias (array): the index every column falls back to
+        entropy (float): the Shannon entropy of one draw, in bits
+    """
+    def __init__(self, weights):
+        """
+        Args:
+            weights ([float]): the non-negative weight of every index, at
+                least one of them positive
+        """
+        size = len(weights)
+        total = fsum(weights)
+        if size == 0 or total <= 0 or min(weights) < 0:
+            raise ValueError("weights must be non-negative with a positive total")
+        self.entropy = -fsum(w / total * log2(w / total) for w in weights if w > 0)
+        scaled = [w * size / total for w in weights]
+        self.prob = array('d', bytes(8 * size))
+        self.alias = array('I' if size < 1 << 32 else 'Q', range(size))
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            less = small.pop()
+            more = large.pop()
+            self.prob[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] = (scaled[more] + scaled[less]) - 1.0
+            (small if scaled[more] < 1.0 else large).append(more)
+        # whatever is left only misses 1.0 by rounding
+        for i in large + small:
+            self.prob[i] = 1.0
+
+    def __len__(self):
+        return len(self.prob)
+
+    def draw(self, count, randbytes=os.urandom):
+        """ Draws 'count' weighted indices
+
+        Returns:
+            [int]: the drawn indices
+        """
+        columns = entropy.randbelow_bulk(len(self.prob), count, randbytes=randbytes)
+        with instrument.stage('entropy.read'):
+            coins = memoryview(randbytes(8 * count)).cast('Q')
+        prob = self.prob
+        alias = self.alias
+        return [column if (coin >> 11) * _COIN_SCALE < prob[column]
+                else alias[column] for column, coin in zip(columns, coins)]
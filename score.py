@@ -0,0 +1,344 @@
+#!/usr/bin/env python
+""" Batch entropy & crack time scoring of passphrases and passwords
+
+    Every candidate gets split into runs of letters and single other
+    characters. Letter runs are segmented into wordlist words at the lowest
+    total cost in bits, falling back to brute forcing letters the wordlist
+    doesn't cover, and every other character costs the bits of brute forcing
+    its character class. The cost of a word comes from its log-probability:
+    log2(len(words)) for each word of a randomly picked passphrase, or a
+    Zipf estimate from its rank for wordlists sorted by frequency (ie. made
+    by wlgen.py), which suits human picked passwords better. Separators
+    between words (SEPARATORS) cost the bits of picking one of them once
+    and nothing when repeated, and reusing any other non-letter seen
+    earlier in the candidate costs REPEAT_BITS rather than its whole class.
+    Segmentations are memoized per letter run, so words repeated across a
+    batch of generated passphrases are only ever segmented once.
+
+    The bits of a candidate give the time to crack it at a hash rate, taken
+    as the time to try half of 2^bits guesses, like the analysis notebook.
+
+    Usage:
+        python wl.py -i wordlist.txt -b 100000 | python score.py -w wordlist.txt
+        python score.py -w ranked.txt --ranked --markup test_markup.yml -r fast
+"""
+
+################################################################################
+## Imports
+################################################################################
+
+from functools import lru_cache
+import json
+from math import comb, log2
+import optparse
+import os
+import re
+import sys
+from sys import exit
+from time import perf_counter
+
+
+
+################################################################################
+## Module Constants
+################################################################################
+
+# hashes per second of some typical attackers, the notebook uses 'gpu'
+HASH_RATES = {
+    'online': 1e2,          # a throttled login form
+    'slow': 1e4,            # an offline attack on bcrypt/scrypt hashes
+    'fast': 1e10,           # an offline attack on unsalted fast hashes
+    'gpu': 350e9,           # the notebook's ~5000 USD consumer GPU rig
+}
+DEFAULT_RATES = ('online', 'slow', 'fast', 'gpu')
+
+# brute force bits of one character of each class
+LOWER_BITS = log2(26)
+UPPER_BITS = log2(26)
+DIGIT_BITS = log2(10)
+SYMBOL_BITS = log2(33)
+
+# the usual separators between the words of a passphrase, the first one
+# costs the bits of picking one of them, repeating it costs nothing
+SEPARATORS = ' -_.'
+SEPARATOR_BITS = log2(len(SEPARATORS))
+
+# bits of any other non-letter that repeats one used before it
+REPEAT_BITS = 1.0
+
+_RUNS = re.compile('[a-zA-Z]+|[^a-zA-Z]')
+
+# (seconds, unit) from the largest unit down, for format_duration()
+_UNITS = ((100 * 365.25 * 86400, 'centuries'), (365.25 * 86400, 'years'),
+        (30 * 86400, 'months'), (86400, 'days'), (3600, 'hours'),
+        (60, 'minutes'), (1, 'seconds'))
+
+
+
+################################################################################
+## Module Functions
+################################################################################
+
+def char_bits(char):
+    """ Returns the bits of brute forcing a single character by its class
+    """
+    if 'a' <= char <= 'z':
+        return LOWER_BITS
+    if 'A' <= char <= 'Z':
+        return UPPER_BITS
+    if '0' <= char <= '9':
+        return DIGIT_BITS
+    return SYMBOL_BITS
+
+def case_bits(word):
+    """ Returns the extra bits of guessing the capitalization of a word,
+    with all lowercase being free & one capital up front or all caps 1 bit
+    """
+    if word.islower():
+        return 0.0
+    if word.isupper() or (word[0].isupper() and word[1:].islower()):
+        return 1.0
+    uppers = sum(1 for c in word if c.isupper())
+    lowers = len(word) - uppers
+    return log2(sum(comb(len(word), k) for k in range(1, min(uppers, lowers) + 1)))
+
+def crack_seconds(bits, rate):
+    """ Returns the seconds it takes to try half of 2^bits guesses at 'rate'
+    hashes per second
+    """
+    return 2.0**bits / 2 / rate
+
+def parse_rate(rate):
+    """ Returns the hashes per second of a HASH_RATES name or a number
+    """
+    if rate in HASH_RATES:
+        return HASH_RATES[rate]
+    try:
+        value = float(rate)
+    except ValueError:
+        raise ValueError("unknown hash rate '{}', use a number or one of: {}"
+                .format(rate, ", ".join(HASH_RATES)))
+    if value <= 0:
+        raise ValueError("hash rates must be positive")
+    return value
+
+def format_duration(seconds):
+    """ Formats a duration in seconds in its largest whole unit
+    """
+    if seconds < 1:
+        return "instant"
+    for size, unit in _UNITS:
+        if seconds >= size:
+            amount = seconds / size
+            return "{:.3g} {}".format(amount, unit) if amount < 1e6 \
+                    else "{:.2e} {}".format(amount, unit)
+
+def read_candidates(file):
+    """ Yields every line of a text file without its line ending
+    """
+    for line in file:
+        line = line.rstrip('\r\n')
+        if line:
+            yield line
+
+def read_candidate_files(file_paths):
+    """ Yields the lines of every candidate file, one file open at a time
+    """
+    for file_path in file_paths:
+        with open(file_path, encoding='utf-8') as file:
+            yield from read_candidates(file)
+
+def read_markup(file_path):
+    """ Yields the passwords of a YAML password file like test_markup.yml,
+    every value of a key with 'password' in its name, without a YAML parser
+    """
+    pattern = re.compile(r'^\s*[\w-]*password[\w-]*\s*:\s*(.+?)\s*$')
+    with open(file_path) as file:
+        for line in file:
+            match = pattern.match(line)
+            if match:
+                yield match.group(1).strip('\'"')
+
+
+
+################################################################################
+## Module Classes
+################################################################################
+
+class PassphraseScorer(object):
+    """ Scores the entropy & crack times of candidates against a wordlist
+
+    Attributes:
+        word_bits (dict): the cost in bits of every lowercase wordlist word
+        longest (int): the length of the longest wordlist word
+        rates (dict): name -> hashes per second the crack times are given at
+    """
+    def __init__(self, words, ranked=False, rates=DEFAULT_RATES, cache_size=1 << 16):
+        """
+        Args:
+            words ([str]): the wordlist, most frequent first if 'ranked'
+            ranked (bool): costs words by a Zipf estimate from their rank,
+                otherwise every word costs log2(len(words))
+            rates ([str]): names from HASH_RATES or hashes per second
+            cache_size (int): the most letter runs kept segmented
+        """
+        self.word_bits = {}
+        if ranked:
+            # p(rank r) = 1 / (r * H(n)) under Zipf's law
+            harmonic = sum(1 / r for r in range(1, len(words) + 1))
+            for rank, word in enumerate(words, 1):
+                self.word_bits.setdefault(word.lower(), log2(rank * harmonic))
+        else:
+            bits = log2(len(words)) if words else 0.0
+            for word in words:
+                self.word_bits[word.lower()] = bits
+        self.word_bits.pop('', None)
+        self.longest = max(map(len, self.word_bits), default=0)
+        self.rates = {str(rate): parse_rate(rate) for rate in rates}
+        self.run_bits = lru_cache(maxsize=cache_size)(self._run_bits)
+
+    def _run_bits(self, run):
+        """ Segments a run of letters into words at the lowest cost in bits
+
+        Returns:
+            (float, int): the bits of the cheapest segmentation, and how many
+                wordlist words it's made of
+        """
+        lower = run.lower()
+        word_bits = self.word_bits
+        longest = self.longest
+        # best[i] = (bits, words) of the cheapest segmentation of run[:i]
+        best = [(0.0, 0)]
+        for i in range(1, len(run) + 1):
+            bits, words = best[i - 1]
+            choice = (bits + char_bits(run[i - 1]), words)
+            for j in range(max(0, i - longest), i):
+                cost = word_bits.get(lower[j:i])
+                if cost is not None:
+                    bits, words = best[j]
+                    bits += cost + case_bits(run[j:i])
+                    if bits < choice[0]:
+                        choice = (bits, words + 1)
+            best.append(choice)
+        return best[-1]
+
+    def bits(self, candidate):
+        """ Returns the estimated entropy of a candidate in bits, and the
+        amount of wordlist words found in it
+        """
+        total = 0.0
+        words = 0
+        used = set()
+        for run in _RUNS.findall(candidate):
+            if len(run) == 1 and not run.isalpha():
+                if run in used:
+                    total += 0.0 if run in SEPARATORS else REPEAT_BITS
+                else:
+                    total += SEPARATOR_BITS if run in SEPARATORS else char_bits(run)
+                    used.add(run)
+            else:
+                bits, found = self.run_bits(run)
+                total += bits
+                words += found
+        return total, words
+
+    def score(self, candidate):
+        """ Scores a single candidate
+
+        Returns:
+            dict: the 'candidate', its 'bits' of entropy, the amount of
+                wordlist 'words' in it and its 'crack_seconds' at each rate
+        """
+        bits, words = self.bits(candidate)
+        return {"candidate": candidate, "bits": bits, "words": words,
+                "crack_seconds": {name: crack_seconds(bits, rate)
+                    for name, rate in self.rates.items()}}
+
+    def score_batch(self, candidates):
+        """ Lazily scores an iterable of candidates, see score()
+        """
+        score = self.score
+        for candidate in candidates:
+            yield score(candidate)
+
+    def format(self, result):
+        """ Formats a score() result as a single tab separated line
+        """
+        times = "\t".join(format_duration(seconds)
+                for seconds in result["crack_seconds"].values())
+        return "{:.1f}\t{}\t{}".format(result["bits"], times, result["candidate"])
+
+    def header(self):
+        """ The header line of format()
+        """
+        return "bits\t" + "\t".join(self.rates) + "\tcandidate"
+
+
+
+################################################################################
+## Main Execution
+################################################################################
+
+if __name__ == '__main__':
+    parser = optparse.OptionParser(usage="%prog [options] [FILE...]")
+    help_strings = {
+        "wordlist": "specifies the path to the wordlist words are scored " +
+        "against [default = ./wordlist.txt]",
+        "ranked": "treats the wordlist as sorted by descending frequency " +
+        "(ie. from wlgen.py) instead of picked uniformly at random",
+        "rate": "adds a hash rate to give crack times at, a number of hashes " +
+        "per second or one of: " + ", ".join(HASH_RATES) +
+        " [default = all of them]",
+        "markup": "scores the passwords of a YAML password file, ie. " +
+        "test_markup.yml, instead of one candidate per line",
+        "json": "prints one JSON object per candidate",
+        }
+
+    parser.add_option('-w', '--wordlist',
+            dest='wordlist', help=help_strings["wordlist"], type="string",
+            default="./wordlist.txt")
+    parser.add_option('--ranked',
+            dest='ranked', help=help_strings["ranked"], action="store_true", default=False)
+    parser.add_option('-r', '--rate',
+            dest='rates', help=help_strings["rate"], action="append", default=None)
+    parser.add_option('--markup',
+            dest='markup', help=help_strings["markup"], type="string", default=None)
+    parser.add_option('--json',
+            dest='json', help=help_strings["json"], action="store_true", default=False)
+
+    (opts, args) = parser.parse_args()
+
+    if not os.path.isfile(opts.wordlist):
+        print("[ERROR]: The given wordlist path, doesn't lead to a file!")
+        exit(1)
+    import wl
+    try:
+        scorer = PassphraseScorer(wl.read_words(opts.wordlist), ranked=opts.ranked,
+                rates=opts.rates or DEFAULT_RATES)
+    except ValueError as err:
+        print("[ERROR]: {}".format(err))
+        exit(1)
+
+    if opts.markup:
+        candidates = read_markup(opts.markup)
+    elif args:
+        candidates = read_candidate_files(args)
+    else:
+        candidates = read_candidates(sys.stdin)
+
+    start = perf_counter()
+    scored = 0
+    out = sys.stdout
+    try:
+        if not opts.json:
+            out.write(scorer.header() + "\n")
+        for result in scorer.score_batch(candidates):
+            out.write((json.dumps(result) if opts.json else scorer.format(result)) + "\n")
+            scored += 1
+        out.flush()
+    except BrokenPipeError:
+        # the reading end closed early, silence the exit flush
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+    seconds = perf_counter() - start
+    sys.stderr.write("{:,} candidates in {:.3f}s ({:,.0f} candidates/s)\n".format(
+        scored, seconds, scored / seconds if seconds else float('inf')))
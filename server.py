@@ -0,0 +1,290 @@
+#!/usr/bin/env python
+""" Local asyncio service handing out random numbers & passphrases, so callers
+    stop paying interpreter startup for every rng.py or wl.py invocation.
+
+    The server listens on a Unix socket or a localhost TCP port and speaks a
+    JSON lines protocol: every request is one JSON object on its own line and
+    gets answered by one JSON object on its own line, in order.
+
+    Requests:
+        {"op": "numbers", "count": 5, "min": 1, "max": 10}
+            -> {"numbers": [3, 9, 1, 1, 7]}
+        {"op": "passphrase", "wordlist": "words.txt", "count": 5,
+         "batch": 1, "separator": " "}
+            -> {"passphrases": ["correct horse battery staple extra"]}
+        {"op": "ping"}
+            -> {"pong": true}
+
+    Any failing request is answered with {"error": "<message>"} and the
+    connection stays open. Wordlists stay resident in wl.wordlist_cache, and
+    entropy is read ahead of demand by an entropy.EntropyPool.
+
+    Clients can't read arbitrary files: only the wordlists loaded with
+    --wordlist, or sitting under --wordlist-dir, are served, always cleaned
+    with the server's own pattern. Numbers & passphrases get generated on
+    the event loop's default executor, so a large request doesn't hold up
+    the other connections.
+
+    Usage:
+        python server.py --unix /tmp/rng.sock --wordlist words.txt
+        python server.py --port 7777 --wordlist-dir /usr/share/dict
+"""
+
+################################################################################
+## Imports
+################################################################################
+
+import asyncio
+import entropy
+import json
+import optparse
+import os
+import re
+from sys import exit
+import wl
+
+
+
+################################################################################
+## Module Constants
+################################################################################
+
+# the most numbers (or passphrases) served by a single request, bounding the
+# memory of a response (requests run off the event loop, see BLOCKING_OPS)
+MAX_COUNT = 1 << 20
+
+# the widest range of numbers, in bits, so one number stays cheap to draw &
+# print (int to str conversions are capped at 4300 digits by default)
+MAX_RANGE_BITS = 1024
+
+# the most random bits a single request draws, bounding the memory of wide
+# numbers the way MAX_COUNT does for many narrow ones
+MAX_BITS = 64 * MAX_COUNT
+
+# the most words allowed in a single passphrase
+MAX_WORDS = 64
+
+# the ops answered on the event loop's default executor, not the loop itself
+BLOCKING_OPS = ('numbers', 'passphrase')
+
+# the errors of a bad request, answered with {"error": ...}
+REQUEST_ERRORS = (ValueError, TypeError, AttributeError, OSError, re.error)
+
+
+
+################################################################################
+## Module Classes
+################################################################################
+
+class RandomService(object):
+    """ Serves the JSON lines protocol over an asyncio stream connection
+
+    Attributes:
+        pool (entropy.EntropyPool): where every request draws entropy from
+        wordlists (set): the real paths of the wordlists served
+        wordlist_dir (str): the real path of a directory whose wordlists
+            are served too, None for none
+        pattern (str): the regex pattern of valid chars of every wordlist
+        requests (int): the number of requests served so far
+    """
+    def __init__(self, pool, wordlists=(), wordlist_dir=None,
+            pattern='[^a-zA-Z]'):
+        # a bad pattern fails here, not in the middle of a request
+        re.compile(pattern)
+        self.pool = pool
+        self.wordlists = {os.path.realpath(p) for p in wordlists}
+        self.wordlist_dir = None if wordlist_dir is None \
+                else os.path.realpath(wordlist_dir)
+        self.pattern = pattern
+        self.requests = 0
+
+    def wordlist(self, name):
+        """ Resolves the wordlist path of a request to one the server serves
+
+        Raises:
+            ValueError: the same for files missing & files not served, so
+                clients can't probe the file system
+        """
+        if not isinstance(name, str) or not name:
+            raise ValueError("passphrase requests need a wordlist path")
+        real = os.path.realpath(name)
+        allowed = real in self.wordlists or (self.wordlist_dir is not None
+                and os.path.commonpath([real, self.wordlist_dir])
+                == self.wordlist_dir)
+        if not allowed or not os.path.isfile(real):
+            raise ValueError("wordlist '{}' isn't served".format(name))
+        return real
+
+    def numbers(self, request):
+        count = _bounded(request.get("count", 1), MAX_COUNT, "count")
+        low = int(request.get("min", 0))
+        high = int(request.get("max", 10))
+        if high < low:
+            raise ValueError("max must not be smaller than min")
+        bits = (high - low).bit_length()
+        if bits > MAX_RANGE_BITS:
+            raise ValueError("max - min must fit {} bits".format(MAX_RANGE_BITS))
+        if count * max(bits, 1) > MAX_BITS:
+            raise ValueError("requests can draw at most {} bits, ask for fewer "
+                    "or narrower numbers".format(MAX_BITS))
+        return {"numbers": entropy.randbelow_bulk(high - low + 1, count, low,
+            randbytes=self.pool.randbytes)}
+
+    def passphrase(self, request):
+        if "pattern" in request:
+            raise ValueError("passphrase requests can't set a pattern")
+        file_path = self.wordlist(request.get("wordlist"))
+        count = _bounded(request.get("count", 5), MAX_WORDS, "count")
+        batch = _bounded(request.get("batch", 1), MAX_COUNT, "batch")
+        return {"passphrases": list(wl.generate_passphrases(
+            file_path, batch, count,
+            separator=request.get("separator", " "),
+            pattern=self.pattern, randbytes=self.pool.randbytes))}
+
+    def respond(self, request):
+        """ Answers a decoded request with a response object
+        """
+        if not isinstance(request, dict):
+            raise ValueError("requests must be JSON objects")
+        op = request.get("op")
+        if op == "numbers":
+            return self.numbers(request)
+        elif op == "passphrase":
+            return self.passphrase(request)
+        elif op == "ping":
+            return {"pong": True}
+        return {"error": "unknown op '{}'".format(op)}
+
+    def handle(self, line):
+        """ Answers a single request line with a JSON response line
+        """
+        self.requests += 1
+        try:
+            response = self.respond(json.loads(line))
+        except REQUEST_ERRORS as err:
+            response = _error(err)
+        return (json.dumps(response) + "\n").encode()
+
+    async def handle_async(self, line):
+        """ handle() running the BLOCKING_OPS on the loop's default executor
+        """
+        self.requests += 1
+        try:
+            request = json.loads(line)
+            if isinstance(request, dict) and request.get("op") in BLOCKING_OPS:
+                response = await asyncio.get_running_loop().run_in_executor(
+                        None, self.respond, request)
+            else:
+                response = self.respond(request)
+        except REQUEST_ERRORS as err:
+            response = _error(err)
+        return (json.dumps(response) + "\n").encode()
+
+    async def serve_client(self, reader, writer):
+        """ asyncio.start_server() callback answering one connection's lines
+        """
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                writer.write(await self.handle_async(line))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+
+################################################################################
+## Module Functions
+################################################################################
+
+def _error(err):
+    """ The response to a request failing with 'err'
+    """
+    return {"error": str(err) or type(err).__name__}
+
+def _bounded(value, limit, name):
+    """ Validates a count from a request as an int in [1, limit]
+    """
+    value = int(value)
+    if not 1 <= value <= limit:
+        raise ValueError("{} must be between 1 and {}".format(name, limit))
+    return value
+
+async def serve(unix=None, host='127.0.0.1', port=7777, wordlists=(),
+        wordlist_dir=None):
+    """ Runs the service until cancelled
+
+    Args:
+        unix (str): a Unix socket path to listen on, instead of TCP
+        host (str): the TCP address to listen on [default = 127.0.0.1]
+        port (int): the TCP port to listen on [default = 7777]
+        wordlists ([str]): wordlist paths to load into the cache upfront,
+            and serve
+        wordlist_dir (str): a directory whose wordlists get served too,
+            loaded on first use [default = None (only 'wordlists')]
+    """
+    for path in wordlists:
+        wl.read_words(path)
+    pool = entropy.shared_pool()
+    service = RandomService(pool, wordlists, wordlist_dir)
+    if unix:
+        server = await asyncio.start_unix_server(service.serve_client, path=unix)
+    else:
+        server = await asyncio.start_server(service.serve_client, host, port)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        if unix and os.path.exists(unix):
+            os.unlink(unix)
+
+
+
+################################################################################
+## Main Execution
+################################################################################
+
+if __name__ == '__main__':
+    parser = optparse.OptionParser()
+    help_strings = {
+        "unix": "listens on the Unix socket at the given path instead of TCP",
+        "host": "sets the TCP address to listen on [default = 127.0.0.1]",
+        "port": "sets the TCP port to listen on [default = 7777]",
+        "wordlist": "loads & serves the given wordlist, can be repeated",
+        "wordlist_dir": "serves every wordlist under the given directory " +
+        "as well, loaded on first use",
+        }
+
+    parser.add_option('-u', '--unix',
+            dest='unix', help=help_strings["unix"], type="string", default=None)
+    parser.add_option('--host',
+            dest='host', help=help_strings["host"], type="string", default="127.0.0.1")
+    parser.add_option('-p', '--port',
+            dest='port', help=help_strings["port"], type=int, default=7777)
+    parser.add_option('-w', '--wordlist',
+            dest='wordlists', help=help_strings["wordlist"], action="append",
+            default=[])
+    parser.add_option('--wordlist-dir',
+            dest='wordlist_dir', help=help_strings["wordlist_dir"],
+            type="string", default=None)
+
+    (opts, args) = parser.parse_args()
+
+    if opts.wordlist_dir is not None and not os.path.isdir(opts.wordlist_dir):
+        print("[ERROR]: --wordlist-dir '{}' isn't a directory".format(
+            opts.wordlist_dir))
+        exit(1)
+    for path in opts.wordlists:
+        if not os.path.isfile(path):
+            print("[ERROR]: --wordlist '{}' isn't a file".format(path))
+            exit(1)
+
+    try:
+        asyncio.run(serve(opts.unix, opts.host, opts.port, opts.wordlists,
+            opts.wordlist_dir))
+    except KeyboardInterrupt:
+        exit(0)
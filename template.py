@@ -0,0 +1,194 @@
+#!/usr/bin/env python
+""" Passphrase templates, compiled once into a plan for bulk generation
+
+    A template mixes literal text with tokens in braces, each drawing one
+    uniformly random item of its alphabet:
+
+        {word}  {Word}  {WORD}  a wordlist word, lowercase, capitalized or
+                                in capitals
+        {letter}  {LETTER}      a letter, lowercase or in capitals
+        {digit}                 a digit
+        {symbol}                an ASCII punctuation character
+
+    A count repeats a token, ie. {digit:2} is two digits, and {{ & }} are
+    literal braces. The passwords of test_markup.yml like
+    '40Euro4ATripOnTheLake' follow '{digit:2}{Word}{digit}{Word:4}'.
+
+    Compiling splits a template into columns: the literal text between
+    tokens, and one column per drawn item. A batch then draws the indices of
+    every column sharing an alphabet with a single bulk request (see
+    entropy.randbelow_bulk()), maps them onto their alphabet all at once and
+    joins the columns row by row, so no Python code runs per token.
+
+    Usage:
+        plan = Template('{Word}{Word}{digit:2}{symbol}', words)
+        plan.bits, list(plan.generate(10))
+"""
+
+################################################################################
+## Imports
+################################################################################
+
+import entropy
+from itertools import repeat
+from math import log2
+import os
+import re
+import string
+
+
+
+################################################################################
+## Module Constants
+################################################################################
+
+# token -> its alphabet, the word tokens draw from the wordlist instead
+ALPHABETS = {
+    'letter': string.ascii_lowercase,
+    'LETTER': string.ascii_uppercase,
+    'digit': string.digits,
+    'symbol': string.punctuation,
+}
+
+# word token -> how the words get cased
+WORD_CASES = {
+    'word': str.lower,
+    'Word': str.capitalize,
+    'WORD': str.upper,
+}
+
+_TOKENS = re.compile(r'\{\{|\}\}|\{(\w+)(?::(\d+))?\}|[{}]|[^{}]+')
+
+
+
+################################################################################
+## Module Functions
+################################################################################
+
+def parse_template(template):
+    """ Splits a template into its literal text & tokens
+
+    Args:
+        template (str): a template, see the module docstring
+
+    Returns:
+        [(str, str)]: ('literal', text) & ('token', name) pairs, in order,
+            tokens with a count repeated that many times
+    """
+    parts = []
+    for match in _TOKENS.finditer(template):
+        text = match.group(0)
+        name, count = match.group(1, 2)
+        if text in ('{{', '}}'):
+            parts.append(('literal', text[0]))
+        elif name is not None:
+            if name not in ALPHABETS and name not in WORD_CASES:
+                raise ValueError("unknown template token '{}', use one of: {}"
+                        .format(text, ", ".join(list(WORD_CASES) + list(ALPHABETS))))
+            parts.extend([('token', name)] * (1 if count is None else int(count)))
+        elif text in ('{', '}'):
+            raise ValueError("unbalanced '{}' in template '{}', use {} for a "
+                    "literal brace".format(text, template, text * 2))
+        else:
+            parts.append(('literal', text))
+    return parts
+
+
+
+################################################################################
+## Module Classes
+################################################################################
+
+class Template(object):
+    """ A compiled template, see the module docstring
+
+    Attributes:
+        template (str): the template it was compiled from
+        columns ([str]): per column its token name, or None for literals
+        bits (float): the entropy of one output in bits, the sum of
+            log2(alphabet size) over every drawn column, counting the
+            words of a word token once per distinct cased word
+    """
+    def __init__(self, template, words=None):
+        """
+        Args:
+            template (str): the template to compile
+            words ([str]): the wordlist the word tokens draw from
+        """
+        self.template = template
+        self.columns = []
+        self._literals = []
+        self._alphabets = {}
+        for kind, value in parse_template(template):
+            if kind == 'literal':
+                if self.columns and self.columns[-1] is None:
+                    # merge runs of literal text into one column
+                    self._literals[-1] += value
+                else:
+                    self.columns.append(None)
+                    self._literals.append(value)
+                continue
+            self.columns.append(value)
+            self._literals.append(None)
+            if value not in self._alphabets:
+                self._alphabets[value] = self._alphabet(value, words)
+        if not self.columns:
+            raise ValueError("the template is empty")
+        self.bits = sum(log2(len(self._alphabets[name]))
+                for name in self.columns if name is not None)
+
+    @staticmethod
+    def _alphabet(name, words):
+        """ Returns the sequence of distinct strings a token draws from
+        """
+        if name in ALPHABETS:
+            return ALPHABETS[name]
+        # casing merges words like 'Polish' & 'polish', which would otherwise
+        # come up twice as often as the rest & overstate the bits
+        words = list(dict.fromkeys(map(WORD_CASES[name],
+            (word for word in (words or ()) if word))))
+        if not words:
+            raise ValueError("the {{{}}} token needs a wordlist".format(name))
+        return words
+
+    def generate(self, batch, randbytes=os.urandom, chunk_size=4096):
+        """ Generates 'batch' outputs of the template
+
+        Args:
+            batch (int): the amount of outputs
+            randbytes (callable): the source of random bytes
+            chunk_size (int): the most outputs drawn per bulk request
+
+        Yields:
+            str: the next output
+        """
+        uses = {}
+        for name in self.columns:
+            if name is not None:
+                uses[name] = uses.get(name, 0) + 1
+        remaining = batch
+        while remaining > 0:
+            size = chunk_size if remaining > chunk_size else remaining
+            # one bulk draw per alphabet, sliced into that alphabet's columns
+            drawn = {name: entropy.randbelow_bulk(len(self._alphabets[name]),
+                size * count, randbytes=randbytes) for name, count in uses.items()}
+            taken = dict.fromkeys(uses, 0)
+            columns = []
+            for name, literal in zip(self.columns, self._literals):
+                if name is None:
+                    columns.append(repeat(literal, size))
+                    continue
+                start = taken[name]
+                taken[name] = start + size
+                columns.append(map(self._alphabets[name].__getitem__,
+                    drawn[name][start:start + size]))
+            yield from map(''.join, zip(*columns))
+            remaining -= size
+
+    def sample(self, randbytes=os.urandom):
+        """ Returns a single output of the template
+        """
+        return next(self.generate(1, randbytes))
+
+    def __repr__(self):
+        return "Template({!r})".format(self.template)
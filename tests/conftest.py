@@ -0,0 +1,52 @@
+""" Shared fixtures of the test suite
+
+    Tests run from the repository root (see pyproject.toml), with every
+    tool importable as a top level module, ie. 'import rng'.
+"""
+
+import os
+import random
+import subprocess
+import sys
+
+import pytest
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def make_randbytes():
+    """ Returns a factory of reproducible 'randbytes' callables (see
+    entropy.py), one stream per seed, so statistical checks can't flake
+    """
+    return lambda seed=1234: random.Random(seed).randbytes
+
+
+@pytest.fixture
+def randbytes(make_randbytes):
+    """ A reproducible source of random bytes
+    """
+    return make_randbytes()
+
+
+@pytest.fixture
+def run_tool():
+    """ Returns a function running a tool script of the repository with
+    arguments, returning its subprocess.CompletedProcess (text mode)
+    """
+    def run(script, *args, input=None, check=True):
+        return subprocess.run([sys.executable, os.path.join(ROOT, script)]
+                + [str(arg) for arg in args], input=input, capture_output=True,
+                text=True, check=check, cwd=ROOT)
+    return run
+
+
+@pytest.fixture
+def wordlist(tmp_path):
+    """ A small wordlist file of 26 distinct words, one per line
+    """
+    file_path = tmp_path / "words.txt"
+    file_path.write_text("".join("{}word\n".format(letter)
+        for letter in "abcdefghijklmnopqrstuvwxyz"))
+    return str(file_path)
@@ -0,0 +1,77 @@
+""" Tests of bench.py: the timing harnesses & the regression suite
+"""
+
+from contextlib import ExitStack
+import json
+
+import pytest
+
+import bench
+import rng
+
+
+def test_compare_engines():
+    results = bench.compare_engines([10, 1000], percall_limit=100)
+    assert [count for count, times in results] == [10, 1000]
+    assert set(results[0][1]) == set(rng.ENGINES)
+    # counts past the limit skip the per call engine
+    assert set(results[1][1]) == {'bulk'}
+    table = bench.format_comparison(results).splitlines()
+    assert len(table) == 3 and "skipped" in table[2]
+
+
+def suite(**results):
+    return {"meta": {}, "results": results}
+
+
+def test_compare_suite():
+    baseline = suite(fast={"seconds": 0.0001}, slow={"seconds": 0.1},
+            mem={"peak_bytes": 1000}, gone={"seconds": 1.0})
+    current = suite(fast={"seconds": 0.0005}, slow={"seconds": 0.2},
+            mem={"peak_bytes": 1200}, new={"seconds": 1.0})
+    rows = {row[0]: row for row in bench.compare_suite(current, baseline)}
+    # cases missing from either side aren't compared
+    assert set(rows) == {"fast", "slow", "mem"}
+    # tiny timings stay under the noise floor however much they grow
+    assert not rows["fast"][4]
+    assert rows["slow"] == ("slow", "seconds", 0.1, 0.2, True)
+    assert not rows["mem"][4]
+    assert bench.compare_suite(current, baseline, threshold=0.1)[2][4]
+
+
+def test_format_suite():
+    baseline = suite(slow={"seconds": 0.1})
+    current = suite(slow={"seconds": 0.2}, mem={"peak_bytes": 2048})
+    lines = bench.format_suite(current,
+            bench.compare_suite(current, baseline)).splitlines()
+    assert len(lines) == 3
+    assert "200.000ms" in lines[1] and "+100%" in lines[1] \
+            and "REGRESSION" in lines[1]
+    assert "2,048B" in lines[2]
+
+
+def test_suite_cases_are_named_uniquely(tmp_path):
+    with ExitStack() as stack:
+        cases = bench.suite_cases(str(tmp_path), stack, quick=True)
+    names = [name for name, metric, fn in cases]
+    assert len(names) == len(set(names))
+    assert {metric for name, metric, fn in cases} == {'seconds', 'peak_bytes'}
+    # the filters the cases kept open are closed, so unlocked again
+    with bench.bloom.open_filter(str(tmp_path / "added.wlbf")):
+        pass
+
+
+
+@pytest.mark.parametrize("quick", [True, False])
+def test_baseline_covers_the_suite(tmp_path, monkeypatch, quick):
+    # only the case names matter, don't write million word lists
+    monkeypatch.setattr(bench, 'write_wordlist', lambda *args: None)
+    monkeypatch.setattr(bench.wl, 'compile_wordlist', lambda *args: None)
+    monkeypatch.setattr(bench.rng, 'RandomNumbers',
+            lambda *args, **kwargs: type('Numbers', (), {'numbers': []}))
+    with open(bench.BASELINE_PATH) as file:
+        baseline = json.load(file)
+    with ExitStack() as stack:
+        cases = bench.suite_cases(str(tmp_path), stack, quick)
+    names = {name for name, metric, fn in cases}
+    assert names <= set(baseline["results"])
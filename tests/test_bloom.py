@@ -0,0 +1,164 @@
+""" Tests of bloom.py: persistent, locked Bloom filters
+"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+import bloom
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "seen.wlbf")
+
+
+@pytest.mark.parametrize("capacity, error_rate", [(1, 0.5), (1000, 1e-3),
+    (10 ** 6, 1e-6), (10 ** 9, 1e-9)])
+def test_filter_size_meets_the_error_rate(capacity, error_rate):
+    blocks, hashes = bloom.filter_size(capacity, error_rate)
+    assert bloom.blocked_error_rate(capacity / blocks, hashes) <= error_rate
+    # one block less would hold too many values per block
+    if blocks > 1:
+        assert bloom.blocked_error_rate(capacity / (blocks - 1), hashes) > error_rate
+
+
+def test_patterns_set_every_bit_once():
+    table = bloom._patterns(b"salt", 20)
+    assert len(table) == 1 << bloom._TABLE_BITS
+    assert {len(pattern) for pattern in table} == {bloom.SECTION_BYTES}
+    assert {bin(int.from_bytes(pattern, "little")).count("1")
+        for pattern in table} == {5}
+    assert bloom._patterns(b"salt", 20) == table != bloom._patterns(b"pepper", 20)
+
+
+def test_false_positive_rate(path):
+    with bloom.BloomFilter.create(path, 20000, 1e-3) as seen:
+        # a fresh value may look seen already, at well below the error rate
+        assert len(seen.add_new(range(20000))) > 19980
+        # no false negatives
+        assert all(i in seen for i in range(20000))
+        false_positives = sum(i in seen for i in range(10 ** 6, 10 ** 6 + 10 ** 5))
+        assert seen.error_rate() == pytest.approx(1e-3, rel=0.2)
+        # 100 expected, well above would mean a broken hash or sizing
+        assert false_positives < 300
+
+
+def test_add_new_drops_seen_items(path):
+    with bloom.BloomFilter.create(path, 1000) as seen:
+        assert seen.add_new(["a", "b", "a", b"c", 1]) == ["a", "b", b"c", 1]
+        assert seen.add_new(["b", "d", "1"]) == ["d"]
+        assert seen.add_new([["x", "y"], ["x", "y"]], key=" ".join) == [["x", "y"]]
+        assert "x y" in seen
+        assert len(seen) == 6 and seen.hits == 4
+        assert seen.add("e") is True and seen.add("e") is False
+
+
+def test_filters_persist(path):
+    with bloom.open_filter(path, 1000, 1e-4) as seen:
+        seen.add_new(range(500))
+        hashes, blocks = seen.hashes, seen.blocks
+    with bloom.open_filter(path, 50) as seen:
+        # an existing filter keeps its own size
+        assert (seen.hashes, seen.blocks, len(seen)) == (hashes, blocks, 500)
+        assert seen.add_new(range(400, 600)) == list(range(500, 600))
+    with bloom.BloomFilter(path) as seen:
+        assert len(seen) == 600 and all(i in seen for i in range(600))
+        assert 0 < seen.fill_ratio() < 1
+    assert os.listdir(os.path.dirname(path)) == ["seen.wlbf"]
+
+
+def test_create_refuses_to_replace_unless_asked(path):
+    bloom.BloomFilter.create(path, 100).close()
+    with pytest.raises(FileExistsError):
+        bloom.BloomFilter.create(path, 100, replace=False)
+    with bloom.BloomFilter.create(path, 100) as seen:
+        assert len(seen) == 0
+    assert os.listdir(os.path.dirname(path)) == ["seen.wlbf"]
+
+
+def test_create_follows_the_umask(path):
+    umask = os.umask(0o027)
+    try:
+        bloom.BloomFilter.create(path, 100).close()
+    finally:
+        os.umask(umask)
+    assert os.stat(path).st_mode & 0o777 == 0o640
+
+
+def test_failed_create_leaves_no_temporary_file(monkeypatch, path):
+    def fail(*args):
+        raise OSError("disk full")
+    monkeypatch.setattr(bloom.os, "replace", fail)
+    with pytest.raises(OSError):
+        bloom.BloomFilter.create(path, 100)
+    assert os.listdir(os.path.dirname(path)) == []
+
+
+@pytest.mark.skipif(bloom.fcntl is None, reason="needs fcntl locks")
+def test_open_filters_are_locked(path):
+    seen = bloom.open_filter(path, 100)
+    with pytest.raises(ValueError, match="already open"):
+        bloom.open_filter(path)
+    code = "import bloom; bloom.BloomFilter({!r})".format(path)
+    other = subprocess.run([sys.executable, "-c", code], capture_output=True,
+            text=True, cwd=os.path.dirname(os.path.dirname(os.path.abspath(
+                __file__))))
+    assert other.returncode == 1 and "already open" in other.stderr
+    seen.close()
+    with bloom.open_filter(path) as again:
+        assert again.blocks == seen.blocks
+
+
+def test_bad_files_are_refused_and_released(path):
+    with open(path, "wb") as file:
+        file.write(b"nope" * 32)
+    with pytest.raises(ValueError, match="not a version"):
+        bloom.BloomFilter(path)
+    with bloom.BloomFilter.create(path, 100) as seen:
+        seen.add("x")
+    with open(path, "r+b") as file:
+        file.truncate(os.path.getsize(path) - 1)
+    with pytest.raises(ValueError, match="truncated"):
+        bloom.BloomFilter(path)
+    # neither left the file locked
+    bloom.BloomFilter.create(path, 100).close()
+
+
+def test_unique_tops_up_dropped_items(path):
+    with bloom.BloomFilter.create(path, 1000) as seen:
+        seen.add_new(range(10))
+        fresh = iter(range(100, 200))
+        out = list(seen.unique([1, 20, 20, 2, 21],
+            lambda n: [next(fresh) for null in range(n)]))
+        assert out == [20, 21, 100, 101, 102]
+
+
+def test_unique_gives_up_on_a_used_up_range(path, monkeypatch):
+    monkeypatch.setattr(bloom, "MAX_STALLS", 4)
+    with bloom.BloomFilter.create(path, 1000) as seen:
+        seen.add_new(range(3))
+        with pytest.raises(ValueError, match="used up"):
+            list(seen.unique([0, 1, 2, 3], lambda n: [1] * n))
+
+
+def test_top_up_source():
+    assert bloom.top_up_source(None, os.urandom) is os.urandom
+    source = bloom.top_up_source(7)
+    assert source.stream == bloom.TOP_UP_STREAM and source(8) == \
+            bloom.top_up_source(7)(8)
+
+
+def test_cli_bloom(run_tool, path):
+    first = run_tool("rng.py", "-n", "30", "-f", "0", "-c", "99", "--bloom",
+            path).stdout.split()
+    second = run_tool("rng.py", "-n", "30", "-f", "0", "-c", "99", "--bloom",
+            path).stdout.split()
+    assert len(set(first + second)) == 60
+    small = path + ".small"
+    run_tool("rng.py", "-n", "4", "-f", "0", "-c", "3", "--bloom", small)
+    used_up = run_tool("rng.py", "-n", "1", "-f", "0", "-c", "3", "--bloom",
+            small, check=False)
+    assert used_up.returncode == 1 and "used up" in used_up.stdout
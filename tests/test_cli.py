@@ -0,0 +1,54 @@
+""" Tests of cli.py: the single entry point & its --stdin-batch mode
+"""
+
+import io
+import json
+import os
+
+import pytest
+
+import cli
+
+
+def test_stdin_batch(wordlist):
+    lines = [b'{"op": "ping"}\n', b'\n', b'{"op": "numbers", "count": 3}\n',
+            json.dumps({"op": "passphrase", "wordlist": wordlist,
+                "count": 2}).encode() + b'\n', b'oops\n']
+    out = io.BytesIO()
+    assert cli.stdin_batch(lines, out) == 4
+    responses = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert responses[0] == {"pong": True}
+    assert len(responses[1]["numbers"]) == 3
+    assert len(responses[2]["passphrases"][0].split()) == 2
+    assert "error" in responses[3]
+
+
+def test_stdin_batch_process(run_tool, wordlist):
+    requests = '{"op": "ping"}\n{"op": "passphrase", "wordlist": "%s"}\n' % wordlist
+    lines = run_tool("cli.py", "--stdin-batch", input=requests).stdout.splitlines()
+    assert json.loads(lines[0]) == {"pong": True}
+    assert len(json.loads(lines[1])["passphrases"]) == 1
+
+
+def test_runs_tools(run_tool):
+    assert len(run_tool("cli.py", "rng", "-n", "4", "-f", "1", "-c", "3")
+            .stdout.split()) == 4
+
+
+def test_usage_and_unknown_tools(run_tool):
+    assert "usage: py-rng TOOL" in run_tool("cli.py", "-h").stdout
+    assert run_tool("cli.py", check=False).returncode == 1
+    result = run_tool("cli.py", "nope", check=False)
+    assert result.returncode == 1 and "Unknown tool 'nope'" in result.stdout
+
+
+def test_package_ships_every_tool():
+    tomllib = pytest.importorskip("tomllib")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    with open(os.path.join(root, "pyproject.toml"), "rb") as file:
+        config = tomllib.load(file)
+    modules = set(config["tool"]["setuptools"]["py-modules"])
+    assert modules == {name[:-3] for name in os.listdir(root)
+            if name.endswith(".py")}
+    assert set(cli.TOOLS.values()) <= modules
+    assert config["project"]["scripts"] == {"py-rng": "cli:main"}
@@ -0,0 +1,90 @@
+""" Tests of drbg.py: the seekable counter based generator
+"""
+
+import random
+
+import pytest
+
+import drbg
+
+BLOCK = drbg.BLOCK_SIZE
+
+
+@pytest.fixture(scope="module")
+def stream():
+    """ The first 3.5 blocks of the stream of a seed, in a single read
+    """
+    return drbg.CounterDRBG("seed")(7 * BLOCK // 2)
+
+
+def test_reads_of_any_size_follow_the_stream(stream):
+    source = drbg.CounterDRBG("seed")
+    rand = random.Random(2)
+    parts = []
+    while source.tell() < len(stream):
+        n = min(rand.choice([0, 1, 7, 1000, BLOCK - 3, BLOCK, 2 * BLOCK + 5]),
+                len(stream) - source.tell())
+        parts.append(source(n))
+    assert b"".join(parts) == stream
+
+
+@pytest.mark.parametrize("offset, n", [(0, 10), (5, BLOCK), (BLOCK - 1, 2),
+    (BLOCK, BLOCK), (BLOCK + 17, 2 * BLOCK), (3 * BLOCK, BLOCK // 2)])
+def test_seek_matches_reading_through(stream, offset, n):
+    source = drbg.CounterDRBG("seed")
+    source(3 * BLOCK)
+    source.seek(offset)
+    assert source.randbytes(n) == stream[offset:offset + n]
+    assert source.tell() == offset + n
+
+
+def test_blocks_and_jumps(stream):
+    source = drbg.CounterDRBG("seed")
+    assert source.block(2) == stream[2 * BLOCK:3 * BLOCK]
+    assert source.tell() == 0
+    source(10)
+    source.jump(2)
+    assert source.tell() == 2 * BLOCK + 10
+    assert source(5) == stream[2 * BLOCK + 10:2 * BLOCK + 15]
+    # far away offsets cost no more than near ones
+    source.seek(1 << 50)
+    assert len(source(BLOCK + 1)) == BLOCK + 1
+
+
+def test_seeds_and_streams():
+    assert drbg.CounterDRBG(42)(64) == drbg.CounterDRBG("42")(64) \
+            == drbg.CounterDRBG(b"42")(64)
+    assert drbg.CounterDRBG(42)(64) != drbg.CounterDRBG(43)(64)
+    base = drbg.CounterDRBG("seed")
+    other = base.substream(1)
+    assert other.seed == "seed" and other.stream == 1
+    assert other(64) != drbg.CounterDRBG("seed")(64)
+    assert other(64) == drbg.CounterDRBG("seed", 1)(128)[64:]
+
+
+@pytest.mark.parametrize("call", [
+    lambda: drbg.CounterDRBG(1.5),
+    lambda: drbg.CounterDRBG(1, stream=-1),
+    lambda: drbg.CounterDRBG(1, stream=drbg.MAX_STREAMS),
+    lambda: drbg.CounterDRBG(1).seek(-1),
+    lambda: drbg.CounterDRBG(1).block(drbg.MAX_BLOCKS),
+    lambda: drbg.CounterDRBG(1).randbytes(-1),
+])
+def test_bad_arguments(call):
+    with pytest.raises((TypeError, ValueError)):
+        call()
+
+
+def test_seeded_numbers_are_reproducible():
+    import rng
+    first = rng.RandomNumbers(1000, 1, 6, randbytes=drbg.CounterDRBG(5))
+    second = rng.RandomNumbers(1000, 1, 6, randbytes=drbg.CounterDRBG(5))
+    assert first.numbers == second.numbers
+    seeded = rng.RandomNumbers(1000, 1, 6, seed=5)
+    assert seeded.numbers == rng.RandomNumbers(1000, 1, 6, seed=5, jobs=2).numbers
+
+
+def test_cli_seed(run_tool):
+    first = run_tool("rng.py", "-n", "20", "--seed", "abc").stdout
+    assert first == run_tool("rng.py", "-n", "20", "--seed", "abc").stdout
+    assert first != run_tool("rng.py", "-n", "20", "--seed", "abd").stdout
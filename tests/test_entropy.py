@@ -0,0 +1,124 @@
+""" Tests of entropy.py: bulk rejection sampling & the entropy pool
+"""
+
+from collections import Counter
+import itertools
+
+import pytest
+
+import entropy
+
+
+def byte_source(values):
+    """ A randbytes callable handing out the given byte values, in a cycle
+    """
+    cycle = itertools.cycle(values)
+    return lambda n: bytes(next(cycle) for null in range(n))
+
+
+@pytest.mark.parametrize("bound, width", [
+    (2, 1), (256, 1), (257, 2), (1 << 16, 2), ((1 << 16) + 1, 4),
+    (1 << 32, 4), ((1 << 32) + 1, 8), (1 << 64, 8), ((1 << 64) + 1, 9),
+    (1 << 80, 10),
+])
+def test_value_width(bound, width):
+    assert entropy.value_width(bound) == width
+
+
+@pytest.mark.parametrize("bound", [
+    1, 2, 3, 10, 200, 255, 256, 257, 1000, 65535, 65536, 65537,
+    (1 << 32) - 5, 1 << 32, (1 << 64) - 1, 1 << 64, (1 << 64) + 1, 3 ** 50,
+])
+def test_randbelow_bulk_bounds(bound, randbytes):
+    values = entropy.randbelow_bulk(bound, 2000, randbytes=randbytes)
+    assert len(values) == 2000
+    assert all(0 <= v < bound for v in values)
+
+
+def test_randbelow_bulk_offset(randbytes):
+    values = entropy.randbelow_bulk(10, 1000, -5, randbytes=randbytes)
+    assert min(values) == -5 and max(values) == 4
+
+
+def test_randbelow_bulk_edge_counts():
+    assert entropy.randbelow_bulk(10, 0) == []
+    assert entropy.randbelow_bulk(10, -3) == []
+    assert entropy.randbelow_bulk(1, 4, 7) == [7, 7, 7, 7]
+    with pytest.raises(ValueError):
+        entropy.randbelow_bulk(0, 1)
+
+
+def test_randbelow_bulk_rejects_biased_values():
+    # with a bound of 200, bytes 200 & up would bias the modulo
+    values = entropy.randbelow_bulk(200, 6,
+            randbytes=byte_source([250, 10, 199, 200, 255, 0, 42, 201]))
+    assert values == [10, 199, 0, 42, 10, 199]
+
+
+def test_randbelow_bulk_rejects_wide_values():
+    # 3 * 2**64 needs 66 bits of 9 byte draws, masked values at or above
+    # the bound get redrawn
+    values = entropy.randbelow_bulk(3 << 64, 50,
+            randbytes=byte_source([0xff] * 9 + [0x01] * 9))
+    assert values == [int.from_bytes(bytes([1] * 9), 'little') & ((1 << 66) - 1)] * 50
+
+
+def test_randbelow_bulk_is_uniform(randbytes):
+    counts = Counter(entropy.randbelow_bulk(6, 60000, randbytes=randbytes))
+    chi_square = sum((counts[v] - 10000) ** 2 / 10000 for v in range(6))
+    # 5 degrees of freedom, p = 0.001
+    assert chi_square < 20.5
+
+
+def test_randbelow_bulk_large_count(randbytes):
+    count = 3 * entropy.BATCH_SIZE + 17
+    assert len(entropy.randbelow_bulk(7, count, randbytes=randbytes)) == count
+
+
+def test_pool_hands_out_fresh_bytes(randbytes):
+    with entropy.EntropyPool(size=64, randbytes=randbytes) as pool:
+        reads = [pool.randbytes(n) for n in (10, 30, 40, 64, 1, 200)]
+    assert [len(read) for read in reads] == [10, 30, 40, 64, 1, 200]
+    # consumed bytes get wiped, so none of the reads may come back zeroed
+    assert all(read.count(0) < len(read) // 2 + 1 for read in reads[:4])
+    assert pool.refills >= 2
+
+
+def test_pool_bounded_draws(randbytes):
+    with entropy.EntropyPool(size=256, randbytes=randbytes) as pool:
+        values = pool.randbelow_bulk(10, 1000, 5)
+        assert min(values) == 5 and max(values) == 14
+        assert 0 <= pool.randbelow(3) < 3
+
+
+@pytest.mark.parametrize("n", [1, 64, 65, 1000])
+def test_closed_pool_refuses_every_read(n):
+    pool = entropy.EntropyPool(size=64)
+    pool.close()
+    with pytest.raises(ValueError):
+        pool.randbytes(n)
+
+
+def test_shared_pool_is_replaced_once_closed():
+    pool = entropy.shared_pool()
+    assert entropy.shared_pool() is pool
+    pool.close()
+    fresh = entropy.shared_pool()
+    assert fresh is not pool and len(fresh.randbytes(8)) == 8
+
+
+@pytest.mark.parametrize("bound, offset, typecode", [
+    (10, 1, 'B'), (200, 0, 'B'), (256, 0, 'B'), (128, -100, 'b'),
+    (10, 1, 'H'), (1000, -500, 'h'), (65535, 0, 'I'), (1 << 40, 0, 'Q'),
+    (1, 7, 'B'), (3 << 64, 0, None),
+])
+def test_randbelow_bulk_arrays_match_lists(make_randbytes, bound, offset, typecode):
+    listed = entropy.randbelow_bulk(bound, 3 * entropy.BATCH_SIZE // 2, offset,
+            randbytes=make_randbytes(9))
+    packed = entropy.randbelow_bulk(bound, 3 * entropy.BATCH_SIZE // 2, offset,
+            randbytes=make_randbytes(9), typecode=typecode)
+    if typecode is None:
+        assert packed == listed
+    else:
+        assert packed.typecode == typecode and packed.tolist() == listed
+    assert entropy.randbelow_bulk(bound, 0, typecode='B').tolist() == []
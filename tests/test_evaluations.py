@@ -0,0 +1,109 @@
+""" Tests of evaluations.py: the NIST SP 800-22 style randomness tests
+"""
+
+from math import erfc, exp, sqrt
+import random
+
+import pytest
+
+import evaluations
+
+
+@pytest.mark.parametrize("x", [0.1, 0.5, 1.0, 2.5, 10.0, 40.0])
+def test_igamc_closed_forms(x):
+    assert evaluations.igamc(1, x) == pytest.approx(exp(-x), rel=1e-9)
+    assert evaluations.igamc(0.5, x) == pytest.approx(erfc(sqrt(x)), rel=1e-9)
+    assert evaluations.igamc(3, 0) == 1.0
+
+
+def brute_force_counts(x, length, m):
+    bits = format(x, '0{}b'.format(length)) if length else ""
+    counts = [0] * (1 << m)
+    for i in range(length - m + 1):
+        counts[int(bits[i:i + m], 2)] += 1
+    return counts
+
+
+@pytest.mark.parametrize("m", [1, 2, 3, 5])
+def test_pattern_counts_match_brute_force(m):
+    rand = random.Random(m)
+    for length in (0, 1, m, 17, 64, 301):
+        x = rand.getrandbits(length) if length else 0
+        assert evaluations.pattern_counts(x, length, m) == \
+                brute_force_counts(x, length, m)
+
+
+def test_nist_examples():
+    # the worked examples of SP 800-22 sections 2.1.8 & 2.3.8
+    monobit = evaluations.BitStreamTests().update_bits(0b1011010101, 10).monobit()
+    assert monobit["p_value"] == pytest.approx(0.527089, abs=1e-6)
+    runs = evaluations.BitStreamTests().update_bits(0b1001101011, 10).runs()
+    assert runs["statistic"] == 7
+    assert runs["p_value"] == pytest.approx(0.147232, abs=1e-6)
+
+
+def test_chunking_doesnt_change_the_results(randbytes):
+    data = randbytes(5000)
+    whole = evaluations.BitStreamTests(block_bits=136).update(data).results()
+    chunked = evaluations.BitStreamTests(block_bits=136)
+    for start in range(0, len(data), 333):
+        chunked.update(data[start:start + 333])
+    assert chunked.results() == whole
+    bits = evaluations.BitStreamTests(block_bits=136, chi_square=False)
+    for start in range(0, len(data), 7):
+        bits.update_bits(int.from_bytes(data[start:start + 7], 'big'),
+                8 * len(data[start:start + 7]))
+    assert bits.results() == whole[:-1]
+
+
+def test_random_bytes_pass(make_randbytes):
+    report = evaluations.evaluate_chunks([make_randbytes(7)(1 << 16)] * 1,
+            total_bytes=1 << 16)
+    assert [r["test"] for r in report["results"]] == ["monobit",
+        "block-frequency", "runs", "serial", "approximate-entropy", "chi-square"]
+    assert all(r["passed"] for r in report["results"])
+
+
+def test_patterned_bytes_fail():
+    report = evaluations.evaluate_chunks([b"\x00\xff" * 4096])
+    failed = {r["test"] for r in report["results"] if not r["passed"]}
+    assert {"runs", "serial", "approximate-entropy", "chi-square"} <= failed
+    with pytest.raises(ValueError):
+        evaluations.evaluate_chunks([])
+
+
+def test_pack_numbers():
+    assert evaluations.pack_numbers([1, 0, 3, 2], 0, 3) == (0b01001110, 8)
+    assert evaluations.pack_numbers([5, 6], 5, 6) == (0b01, 2)
+    assert evaluations.pack_numbers([1, 2], 0, 9) is None
+
+
+def test_evaluate_numbers(randbytes):
+    import rng
+    chunks = rng.stream_numbers(20000, 0, 15, chunk_size=3000,
+            randbytes=randbytes)
+    report = evaluations.evaluate_numbers(chunks, 0, 15)
+    assert report["numbers"] == 20000
+    assert all(r["passed"] for r in report["results"])
+    # ranges that aren't a power of two only get the chi-square test
+    report = evaluations.evaluate_numbers([list(range(10)) * 100], 0, 9)
+    assert [r["test"] for r in report["results"]] == ["chi-square"]
+
+
+def test_cli(run_tool, tmp_path, randbytes):
+    sample = tmp_path / "sample.bin"
+    sample.write_bytes(randbytes(1 << 14))
+    output = run_tool("evaluations.py", sample).stdout
+    assert "monobit" in output and "16,384 bytes" in output
+    assert run_tool("evaluations.py", tmp_path / "missing", check=False).returncode == 1
+
+
+@pytest.mark.parametrize("a, x", [(5e22, 5e22 - 1), (5e22, 5e22 + 1e12),
+    (1e7 + 1, 1e7), (10.0, 11.0)])
+def test_igamc_huge_arguments(a, x):
+    assert 0 <= evaluations.igamc(a, x) <= 1
+
+
+def test_igamc_is_continuous_at_the_approximation():
+    assert evaluations.igamc(1e7, 1e7 + 3000) == pytest.approx(
+            evaluations.igamc(1e7 + 1, 1e7 + 3000), abs=1e-3)
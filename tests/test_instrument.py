@@ -0,0 +1,81 @@
+""" Tests of instrument.py: the opt-in counters & stage timers
+"""
+
+import io
+import json
+
+import pytest
+
+import entropy
+import instrument
+
+
+@pytest.fixture
+def profiling():
+    instrument.reset()
+    instrument.enable()
+    yield
+    instrument.disable()
+    instrument.reset()
+
+
+def test_disabled_by_default():
+    assert not instrument.enabled
+    assert instrument.stage('idle') is instrument._NULL_STAGE
+
+
+def test_counters_and_timers(profiling):
+    instrument.count('events')
+    instrument.count('events', 4)
+    for null in range(3):
+        with instrument.stage('work'):
+            pass
+    data = instrument.snapshot()
+    assert data["counters"] == {"events": 5}
+    assert data["timers"]["work"]["calls"] == 3
+    assert data["timers"]["work"]["seconds"] >= 0
+
+
+def test_hot_paths_report(profiling, make_randbytes):
+    # bytes 200 & up get rejected for a bound of 200
+    entropy.randbelow_bulk(200, 1000, randbytes=make_randbytes(3))
+    data = instrument.snapshot()
+    assert data["counters"]["entropy.bytes"] >= 1000
+    assert data["counters"]["entropy.bytes"] == 1000 + data["counters"]["rng.rejections"]
+    assert {"entropy.read", "rng.reduce"} <= set(data["timers"])
+
+
+def test_formats(profiling):
+    instrument.count('a "quoted" name')
+    with instrument.stage('stage'):
+        pass
+    assert json.loads(instrument.to_json())["counters"] == {'a "quoted" name': 1}
+    text = instrument.to_prometheus()
+    assert 'pyrng_events_total{name="a \\"quoted\\" name"} 1' in text
+    assert 'pyrng_stage_calls_total{stage="stage"} 1' in text
+    file = io.StringIO()
+    instrument.dump(file, 'prometheus')
+    assert file.getvalue() == text
+    with pytest.raises(ValueError):
+        instrument.dump(file, 'xml')
+
+
+def test_enable_from_env(monkeypatch):
+    registered = []
+    monkeypatch.setattr(instrument.atexit, 'register',
+            lambda *args: registered.append(args))
+    try:
+        instrument.enable_from_env({'RNG_PROFILE': '0'})
+        assert not instrument.enabled and not registered
+        instrument.enable_from_env({'RNG_PROFILE': 'prometheus'})
+        assert instrument.enabled and registered[-1][1:] == (None, 'prometheus')
+        instrument.enable_from_env({'RNG_PROFILE': 'yes'})
+        assert registered[-1][1:] == (None, 'json')
+    finally:
+        instrument.disable()
+
+
+def test_cli_profile(run_tool):
+    result = run_tool("rng.py", "-n", "100", "--profile", "json")
+    report = json.loads(result.stderr)
+    assert report["counters"]["entropy.bytes"] >= 100
@@ -0,0 +1,56 @@
+""" Tests of parallel.py: sharded generation across worker processes
+"""
+
+import pytest
+
+import parallel
+
+
+def test_resolve_jobs():
+    assert parallel.resolve_jobs(3) == 3
+    assert parallel.resolve_jobs(0) >= 1
+    assert parallel.resolve_jobs(None) == parallel.resolve_jobs(-1)
+
+
+@pytest.mark.parametrize("total, shard_size, sizes", [
+    (0, 4, []), (3, 4, [3]), (8, 4, [4, 4]), (10, 4, [4, 4, 2]),
+])
+def test_split(total, shard_size, sizes):
+    assert list(parallel._split(total, shard_size)) == sizes
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_parallel_numbers(jobs):
+    shards = list(parallel.parallel_numbers(1000, -3, 5, jobs=jobs,
+        shard_size=300))
+    assert [len(shard) for shard in shards] == [300, 300, 300, 100]
+    numbers = [n for shard in shards for n in shard]
+    assert min(numbers) == -3 and max(numbers) == 5
+
+
+def test_parallel_numbers_too_wide_for_an_array():
+    shards = list(parallel.parallel_numbers(10, 0, 1 << 70, jobs=1))
+    assert isinstance(shards[0], list) and len(shards[0]) == 10
+
+
+@pytest.mark.parametrize("jobs", [1, 2, 3])
+def test_seeded_numbers_match_for_any_jobs(jobs):
+    expected = list(parallel.parallel_numbers(500, 0, 99, jobs=1,
+        shard_size=128, seed="seed"))
+    assert list(parallel.parallel_numbers(500, 0, 99, jobs=jobs,
+        shard_size=128, seed="seed")) == expected
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_parallel_passphrases(wordlist, jobs):
+    passphrases = list(parallel.parallel_passphrases(wordlist, 50, count=4,
+        jobs=jobs, shard_size=16))
+    assert len(passphrases) == 50
+    assert all(len(words) == 4 for words in passphrases)
+
+
+def test_seeded_passphrases_match_for_any_jobs(wordlist):
+    first = list(parallel.parallel_passphrases(wordlist, 40, jobs=1,
+        shard_size=16, seed=7))
+    assert list(parallel.parallel_passphrases(wordlist, 40, jobs=2,
+        shard_size=16, seed=7)) == first
@@ -0,0 +1,88 @@
+""" Tests of rng.py: RandomNumbers, its engines & the command line
+"""
+
+import pytest
+
+import rng
+
+
+@pytest.mark.parametrize("engine", sorted(rng.ENGINES))
+def test_engines_cover_the_range(engine):
+    numbers = rng.RandomNumbers(count=2000, min=-3, max=3, engine=engine)
+    assert len(numbers) == 2000
+    assert set(numbers) == set(range(-3, 4))
+
+
+def test_unknown_engine():
+    with pytest.raises(ValueError):
+        rng.RandomNumbers(count=1, engine='nope')
+
+
+def test_get_engine_randbytes(randbytes):
+    generate = rng.get_engine('bulk', randbytes)
+    assert all(5 <= v < 15 for v in generate(10, 100, 5))
+    with pytest.raises(ValueError):
+        rng.get_engine('secrets', randbytes)
+
+
+def test_randbytes_source_is_used(make_randbytes):
+    randbytes = make_randbytes(7)
+    first = rng.RandomNumbers(count=50, max=1000, randbytes=randbytes)
+    again = rng.RandomNumbers(count=50, max=1000, randbytes=randbytes)
+    assert list(first) != list(again)
+    replay = rng.RandomNumbers(count=50, max=1000, randbytes=make_randbytes(7))
+    assert list(replay) == list(first)
+
+
+def test_cli_engine_choice(run_tool):
+    out = run_tool('rng.py', '-e', 'bulk', '-n', 20, '-f', 1, '-c', 3).stdout
+    assert {int(v) for v in out.split()} <= {1, 2, 3}
+    assert len(out.split()) == 20
+
+
+def test_stream_numbers_chunks():
+    chunks = list(rng.stream_numbers(10, 1, 6, chunk_size=4))
+    assert [len(chunk) for chunk in chunks] == [4, 4, 2]
+    assert all(1 <= v <= 6 for chunk in chunks for v in chunk)
+    assert list(rng.stream_numbers(0, 1, 6)) == []
+
+
+def test_stream_numbers_randbytes(make_randbytes):
+    streamed = list(rng.stream_numbers(100, 0, 99, chunk_size=7,
+        randbytes=make_randbytes(3)))
+    assert streamed == list(rng.stream_numbers(100, 0, 99, chunk_size=7,
+        randbytes=make_randbytes(3)))
+    assert sum(map(len, streamed)) == 100
+
+
+def test_cli_stream(run_tool):
+    out = run_tool('rng.py', '--stream', '-n', 100000, '-f', 5, '-c', 9).stdout
+    values = out.split()
+    assert len(values) == 100000
+    assert {int(v) for v in values} == {5, 6, 7, 8, 9}
+    stats = run_tool('rng.py', '--stream', '--stats', '-n', 1000).stdout
+    assert "min: 1" in stats and "max: 10" in stats
+
+
+@pytest.mark.parametrize("low, high, typecode", [
+    (1, 10, 'B'), (-100, 27, 'b'), (0, 300, 'H'), (0, 2**40, 'LQ'),
+    (0, 2**80, None),
+])
+def test_random_numbers_typecodes(low, high, typecode):
+    numbers = rng.RandomNumbers(70000, low, high)
+    # 'L' is 64 bits wide on most 64 bit platforms, 'Q' where it isn't
+    assert numbers.typecode == typecode if typecode is None \
+            else numbers.typecode in typecode
+    assert len(numbers) == 70000
+    assert min(numbers) >= low and max(numbers) <= high
+    if high - low < 1000:
+        assert min(numbers) == low and max(numbers) == high
+
+
+def test_stream_numbers_typecode(randbytes):
+    chunks = list(rng.stream_numbers(10, 1, 6, chunk_size=4,
+        randbytes=randbytes, typecode='B'))
+    assert [chunk.typecode for chunk in chunks] == ['B'] * 3
+    # other engines still hand out lists
+    chunks = list(rng.stream_numbers(5, 1, 6, engine='secrets', typecode='B'))
+    assert isinstance(chunks[0], list)
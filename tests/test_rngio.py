@@ -0,0 +1,96 @@
+""" Tests of rngio.py: typecodes, output formats & output files
+"""
+
+from array import array
+import ast
+import io
+import sys
+
+import pytest
+
+import rngio
+
+
+@pytest.mark.parametrize("low, high, code", [
+    (0, 255, 'B'), (1, 256, 'H'), (0, (1 << 32) - 1, 'I'), (0, 1 << 32, 'L'
+        if array('L').itemsize == 8 else 'Q'), (-1, 127, 'b'), (-129, 0, 'h'),
+])
+def test_typecode(low, high, code):
+    assert rngio.typecode(low, high) == code
+
+
+def test_typecode_too_wide():
+    with pytest.raises(ValueError):
+        rngio.typecode(0, 1 << 64)
+    with pytest.raises(ValueError):
+        rngio.typecode(-(1 << 63) - 1, 0)
+
+
+def write(numbers, format, low=0, high=300, count=None):
+    out = io.BytesIO()
+    writer = rngio.NumberWriter(out, format, low, high, count)
+    for chunk in numbers:
+        writer.write(chunk)
+    writer.close()
+    return out.getvalue()
+
+
+@pytest.mark.parametrize("format, expected", [
+    ('text', b"1 2 300 \n"),
+    ('lines', b"1\n2\n300\n"),
+    ('csv', b"1,2,300\n"),
+    ('hex', b"0001 0002 012c\n"),
+    ('bin', b"\x01\x00\x02\x00\x2c\x01"),
+])
+def test_formats_across_chunks(format, expected):
+    assert write([[1, 2], [], [300]], format) == expected
+
+
+def test_empty_text_output():
+    assert write([], 'text') == b"\n"
+
+
+def test_npy_output():
+    data = write([[1, 2], [3]], 'npy', -5, 5, count=3)
+    assert data[:8] == b"\x93NUMPY\x01\x00"
+    length = int.from_bytes(data[8:10], 'little')
+    assert (10 + length) % 64 == 0
+    header = ast.literal_eval(data[10:10 + length].decode('latin1'))
+    assert header == {'descr': '<i1', 'fortran_order': False, 'shape': (3,)}
+    assert data[10 + length:] == b"\x01\x02\x03"
+
+
+def test_npy_count_mismatch():
+    with pytest.raises(ValueError):
+        write([[1]], 'npy', count=2)
+    with pytest.raises(ValueError):
+        rngio.NumberWriter(io.BytesIO(), 'npy')
+
+
+def test_writer_leaves_callers_array_alone():
+    numbers = array('H', [1, 2])
+    write([numbers], 'hex')
+    assert list(numbers) == [1, 2]
+
+
+def test_open_output_file_gets_closed(tmp_path):
+    with rngio.open_output(str(tmp_path / "out.bin"), 'bin') as out:
+        out.write(b"abc")
+    assert out.closed
+    assert (tmp_path / "out.bin").read_bytes() == b"abc"
+
+
+def test_open_output_stdout_stays_open():
+    with rngio.open_output('-') as out:
+        assert out.fileno() == sys.stdout.fileno()
+    assert out.closed and not sys.stdout.closed
+    with pytest.raises(ValueError):
+        rngio.open_output('-', 'yaml')
+
+
+def test_cli_output_file(run_tool, tmp_path):
+    target = tmp_path / "numbers.bin"
+    run_tool('rng.py', '-n', 1000, '-f', 0, '-c', 255, '-F', 'bin', '-o', target)
+    assert len(target.read_bytes()) == 1000
+    run_tool('rng.py', '-n', 1000, '--stream', '-F', 'csv', '-o', target)
+    assert len(target.read_text().split(",")) == 1000
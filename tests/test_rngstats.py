@@ -0,0 +1,107 @@
+""" Tests of rngstats.py: the streaming statistics & the histograms
+"""
+
+import random
+import statistics
+
+import pytest
+
+import rngstats
+
+
+@pytest.fixture
+def numbers():
+    gen = random.Random(4)
+    return [gen.randint(-20, 50) for null in range(5001)]
+
+
+def test_matches_statistics_module(numbers):
+    stats = rngstats.StreamStats(numbers, min=-20, max=50)
+    assert stats.n == len(numbers)
+    assert stats.mean == pytest.approx(statistics.mean(numbers))
+    assert stats.pvariance == pytest.approx(statistics.pvariance(numbers))
+    assert stats.variance == pytest.approx(statistics.variance(numbers))
+    assert stats.median == statistics.median(numbers)
+    assert (stats.low, stats.high) == (min(numbers), max(numbers))
+    assert stats.kth(0) == min(numbers)
+    with pytest.raises(IndexError):
+        stats.kth(len(numbers))
+
+
+def test_even_median():
+    assert rngstats.StreamStats([1, 2, 3, 10]).median == 2.5
+    assert rngstats.StreamStats([4, 4, 1, 9]).median == 4
+
+
+def test_chunks_and_merges_agree(numbers):
+    whole = rngstats.StreamStats(numbers, min=-20, max=50)
+    chunked = rngstats.StreamStats(min=-20, max=50)
+    for i in range(0, len(numbers), 1000):
+        chunked.update(numbers[i:i + 1000])
+    halves = rngstats.StreamStats(numbers[:2000], min=-20, max=50) + \
+            rngstats.StreamStats(numbers[2000:], min=-20, max=50)
+    merged = rngstats.StreamStats(min=-20, max=50)
+    merged += halves
+    for stats in (chunked, halves, merged):
+        assert stats.counts.items() == whole.counts.items()
+        assert stats.mean == whole.mean and stats.median == whole.median
+
+
+def test_sparse_and_dense_agree(numbers):
+    dense = rngstats.StreamStats(numbers, min=-20, max=50)
+    sparse = rngstats.StreamStats(numbers)
+    assert dense.counts.dense and not sparse.counts.dense
+    assert dense.counts.items() == sparse.counts.items()
+    assert dense.variance == sparse.variance
+
+
+def test_print_stats(numbers, capsys):
+    rngstats.StreamStats(numbers, min=-20, max=50).print_stats()
+    out = capsys.readouterr().out
+    assert "median: {}".format(statistics.median(numbers)) in out
+    assert "Frequencies of Numbers:" in out
+
+
+@pytest.mark.parametrize("attribute", ["mean", "pvariance", "variance",
+    "median", "low", "high"])
+def test_empty_raises_statistics_error(attribute):
+    with pytest.raises(statistics.StatisticsError):
+        getattr(rngstats.StreamStats(min=0, max=9), attribute)
+
+
+def test_variance_of_one_number():
+    stats = rngstats.StreamStats([7])
+    assert stats.pvariance == 0
+    with pytest.raises(statistics.StatisticsError):
+        stats.variance
+
+
+def test_uniformity():
+    even = rngstats.StreamStats(list(range(10)) * 100, min=0, max=9).uniformity()
+    assert even["chi_square"] == 0 and even["p_value"] == pytest.approx(1.0)
+    assert even["df"] == 9 and even["max_deviation"] == 0
+    skewed = rngstats.StreamStats([0] * 500 + [1] * 100, min=0, max=9).uniformity()
+    assert skewed["p_value"] < 1e-6
+    assert skewed["max_deviation_ratio"] == pytest.approx((500 - 60) / 60)
+    with pytest.raises(ValueError):
+        rngstats.StreamStats([1, 2]).uniformity()
+
+
+def test_uniformity_needs_enough_numbers_per_value():
+    sparse = rngstats.StreamStats([3, 10**22, 5], min=0, max=10**23).uniformity()
+    assert sparse["p_value"] is None and sparse["chi_square"] is None
+    assert sparse["expected"] == pytest.approx(3e-23)
+    assert rngstats.StreamStats([1] * 49, min=0, max=9).uniformity()["p_value"] is None
+    assert rngstats.StreamStats([1] * 50, min=0, max=9).uniformity()["p_value"] is not None
+
+
+def test_print_stats_skips_the_chi_square(capsys):
+    rngstats.StreamStats([3, 10**22, 5], min=0, max=10**23).print_stats()
+    out = capsys.readouterr().out
+    assert "chi-square: skipped" in out and "max-deviation" not in out
+
+
+def test_cli_stats_of_a_huge_range(run_tool):
+    result = run_tool("rng.py", "-f", "0", "-c", "100000000000000000000000",
+            "-n", "3", "--stats")
+    assert "chi-square: skipped" in result.stdout
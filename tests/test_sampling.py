@@ -0,0 +1,137 @@
+""" Tests of sampling.py: unique, weighted & streamed picks of word indices
+"""
+
+from collections import Counter
+import itertools
+from math import log2
+
+import pytest
+
+import sampling
+
+
+def chi_square(counts, expected):
+    """ The chi-square statistic of observed counts against expected ones
+    """
+    return sum((counts[key] - value) ** 2 / value for key, value in expected.items())
+
+
+@pytest.mark.parametrize("bounds", [[1], [2, 3, 10], [1 << 64, 7, (1 << 63) + 1]])
+def test_randbelow_each_bounds(randbytes, bounds):
+    for null in range(200):
+        values = sampling.randbelow_each(bounds, randbytes)
+        assert all(0 <= v < bound for v, bound in zip(values, bounds))
+
+
+def test_sample_unique_is_uniform_over_arrangements(randbytes):
+    picks = Counter(tuple(sampling.sample_unique(5, 2, randbytes))
+            for null in range(20000))
+    # every ordered pair of distinct indices, equally likely
+    arrangements = list(itertools.permutations(range(5), 2))
+    assert set(picks) == set(arrangements)
+    expected = {pair: 20000 / len(arrangements) for pair in arrangements}
+    # 19 degrees of freedom, p = 0.001
+    assert chi_square(picks, expected) < 43.8
+
+
+def test_sample_unique_batch(randbytes):
+    picks = sampling.sample_unique_batch(10 ** 12, 50, 30, randbytes)
+    assert len(picks) == 30
+    assert all(len(set(pick)) == 50 for pick in picks)
+    assert sorted(sampling.sample_unique(8, 8, randbytes)) == list(range(8))
+    assert sampling.sample_unique_batch(3, 0, 2) == [[], []]
+    with pytest.raises(ValueError):
+        sampling.sample_unique(3, 4)
+
+
+def test_draw_indices_modes(randbytes):
+    uniform = sampling.draw_indices(6, 4, 5000, randbytes=randbytes)
+    assert len(uniform) == 20000
+    expected = {i: 20000 / 6 for i in range(6)}
+    assert chi_square(Counter(uniform), expected) < 20.5
+    unique = sampling.draw_indices(6, 6, 100, unique=True, randbytes=randbytes)
+    assert all(sorted(unique[i:i + 6]) == list(range(6)) for i in range(0, 600, 6))
+    table = sampling.AliasTable([1, 0, 3])
+    weighted = Counter(sampling.draw_indices(3, 4, 2500, table=table,
+        randbytes=randbytes))
+    assert weighted[1] == 0
+    assert chi_square(weighted, {0: 2500, 2: 7500}) < 10.8
+    with pytest.raises(ValueError):
+        sampling.draw_indices(3, 2, table=table, unique=True)
+    with pytest.raises(ValueError):
+        sampling.draw_indices(4, 2, table=table)
+
+
+def test_alias_table_matches_weights(randbytes):
+    weights = [5, 1, 0, 2.5, 1.5, 10]
+    table = sampling.AliasTable(weights)
+    counts = Counter(table.draw(100000, randbytes))
+    total = sum(weights)
+    assert counts[2] == 0
+    expected = {i: 100000 * w / total for i, w in enumerate(weights) if w}
+    # 4 degrees of freedom, p = 0.001
+    assert chi_square(counts, expected) < 18.5
+    assert table.entropy == pytest.approx(-sum(w / total * log2(w / total)
+        for w in weights if w))
+    assert sampling.alias_table(table) is table
+
+
+@pytest.mark.parametrize("weights", [[], [0, 0], [1, -1]])
+def test_alias_table_rejects_bad_weights(weights):
+    with pytest.raises(ValueError):
+        sampling.AliasTable(weights)
+
+
+def test_load_alias_table_follows_the_file(tmp_path):
+    file_path = tmp_path / "weighted.txt"
+    file_path.write_text("apple 3\n\nbanana 1\n")
+    table = sampling.load_alias_table(str(file_path))
+    # blank lines hold no word, so they get no weight either
+    assert len(table) == 2 and table.prob[1] < 1.0
+    assert sampling.load_alias_table(str(file_path)) is table
+    file_path.write_text("apple 3\nbanana 1\ncherry 2\nplum 2\n")
+    assert len(sampling.load_alias_table(str(file_path))) == 4
+    assert list(sampling.read_weights(str(file_path), 1)) == [3, 1, 2, 2]
+    file_path.write_text("apple\n")
+    with pytest.raises(ValueError):
+        sampling.read_weights(str(file_path), 1)
+
+
+def test_entropy_bits():
+    assert sampling.entropy_bits(7776, 6) == pytest.approx(6 * log2(7776))
+    assert sampling.entropy_bits(10, 3, unique=True) == pytest.approx(log2(720))
+    assert sampling.entropy_bits(0, 3) == 0.0
+    table = sampling.AliasTable([1, 1, 2])
+    assert sampling.entropy_bits(3, 2, table=table) == pytest.approx(3.0)
+    with pytest.raises(ValueError):
+        sampling.entropy_bits(3, 2, unique=True, table=table)
+
+
+def test_weights_of_repeated_words_add_up(randbytes, tmp_path):
+    file_path = tmp_path / "weighted.txt"
+    file_path.write_text("apple 1\nbanana 2\nApple 5\napple 3\n\n")
+    assert list(sampling.read_weights(str(file_path))) == [4, 2, 5]
+    table = sampling.load_alias_table(str(file_path))
+    assert table.entropy == pytest.approx(-sum(w / 11 * log2(w / 11)
+        for w in (4, 2, 5)))
+
+
+def test_cli_entropy(run_tool, wordlist, tmp_path):
+    result = run_tool("wl.py", "-i", wordlist, "-n", "4", "--entropy")
+    assert result.stderr.startswith("{:.2f} bits".format(4 * log2(26)))
+    result = run_tool("wl.py", "-i", wordlist, "-n", "4", "--entropy",
+            "--sampling", "unique")
+    assert result.stderr.startswith("{:.2f} bits".format(log2(26 * 25 * 24 * 23)))
+    padded = tmp_path / "padded.txt"
+    padded.write_text("apple\n\nbanana\napple\n1234\n")
+    # 2 distinct words, whatever the blank & repeated lines
+    result = run_tool("wl.py", "-i", padded, "-n", "4", "--entropy")
+    assert result.stderr.startswith("4.00 bits")
+    assert set(result.stdout.split()) <= {"apple", "banana"}
+    result = run_tool("wl.py", "-i", padded, "-n", "2", "--entropy",
+            "--sampling", "unique")
+    assert result.stderr.startswith("1.00 bits")
+    assert sorted(result.stdout.split()) == ["apple", "banana"]
+    result = run_tool("wl.py", "-i", padded, "-n", "3", "--sampling", "unique",
+            check=False)
+    assert result.returncode == 1 and "3 distinct words out of 2" in result.stdout
@@ -0,0 +1,94 @@
+""" Tests of score.py: passphrase entropy & crack time scoring
+"""
+
+from math import log2
+import random
+
+import pytest
+
+import score
+
+
+@pytest.fixture(scope="module")
+def words():
+    rand = random.Random(8)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    found = set()
+    while len(found) < 8000:
+        found.add("".join(rand.choices(letters, k=rand.randint(4, 8))))
+    return sorted(found)
+
+
+@pytest.mark.parametrize("separator", [" ", "-", "_", "."])
+def test_generated_passphrase_scores_close_to_its_entropy(words, separator):
+    scorer = score.PassphraseScorer(words)
+    picked = random.Random(1).sample(words, 5)
+    bits, found = scorer.bits(separator.join(picked))
+    assert found == 5
+    # the exact entropy, plus the one time cost of the separator
+    assert bits == pytest.approx(5 * log2(8000) + score.SEPARATOR_BITS)
+
+
+def test_other_symbols_cost_their_class(words):
+    scorer = score.PassphraseScorer(words)
+    word_bits = log2(len(words))
+    assert scorer.bits(words[0] + "!" + words[1])[0] == \
+            pytest.approx(2 * word_bits + score.SYMBOL_BITS)
+    assert scorer.bits(words[0] + "!" + words[1] + "!")[0] == \
+            pytest.approx(2 * word_bits + score.SYMBOL_BITS + score.REPEAT_BITS)
+    assert scorer.bits("42")[0] == pytest.approx(2 * score.DIGIT_BITS)
+
+
+def test_unknown_letters_get_brute_forced():
+    scorer = score.PassphraseScorer(["correct", "horse"])
+    assert scorer.bits("correcthorse") == (pytest.approx(2.0), 2)
+    assert scorer.bits("xq") == (pytest.approx(2 * score.LOWER_BITS), 0)
+    assert scorer.bits("Correct")[0] == pytest.approx(2.0)
+
+
+@pytest.mark.parametrize("word, bits", [("word", 0.0), ("Word", 1.0),
+    ("WORD", 1.0), ("wOrd", log2(4))])
+def test_case_bits(word, bits):
+    assert score.case_bits(word) == pytest.approx(bits)
+
+
+def test_ranked_words_cost_more_down_the_list():
+    scorer = score.PassphraseScorer(["the", "of", "zebra"], ranked=True)
+    costs = [scorer.word_bits[w] for w in ("the", "of", "zebra")]
+    assert costs == sorted(costs)
+    assert sum(2 ** -c for c in costs) == pytest.approx(1.0)
+
+
+def test_rates_and_durations():
+    assert score.parse_rate('gpu') == 350e9 and score.parse_rate('5') == 5.0
+    for rate in ('nope', '-1'):
+        with pytest.raises(ValueError):
+            score.parse_rate(rate)
+    assert score.crack_seconds(1, 1) == 1.0
+    assert score.format_duration(0.5) == "instant"
+    assert score.format_duration(7200) == "2 hours"
+
+
+def test_cli(run_tool, wordlist):
+    result = run_tool("score.py", "-w", wordlist, "-r", "1", "--json",
+            input="aword bword\n\nxyz\n")
+    lines = result.stdout.splitlines()
+    assert len(lines) == 2
+    assert '"words": 2' in lines[0] and '"words": 0' in lines[1]
+
+
+def test_candidate_files_get_closed(monkeypatch, tmp_path):
+    paths = []
+    for i, text in enumerate(["one\n\ntwo\r\n", "three"]):
+        paths.append(tmp_path / "candidates{}.txt".format(i))
+        paths[-1].write_text(text)
+    opened = []
+    real_open = open
+    def tracking_open(*args, **kwargs):
+        opened.append(real_open(*args, **kwargs))
+        return opened[-1]
+    monkeypatch.setattr("builtins.open", tracking_open)
+    lines = list(score.read_candidate_files(paths))
+    monkeypatch.undo()
+    assert lines == ["one", "two", "three"]
+    assert len(opened) == 2 and all(file.closed for file in opened)
@@ -0,0 +1,179 @@
+""" Tests of server.py: the JSON lines protocol, its error paths & the
+    asyncio service
+"""
+
+import asyncio
+import json
+import os
+import queue
+import threading
+import time
+
+import pytest
+
+import entropy
+import server
+
+
+@pytest.fixture
+def pool():
+    with entropy.EntropyPool(size=1 << 12) as pool:
+        yield pool
+
+
+@pytest.fixture
+def service(pool, wordlist):
+    return server.RandomService(pool, wordlists=[wordlist])
+
+
+def ask(service, request):
+    line = request if isinstance(request, (str, bytes)) else json.dumps(request)
+    return json.loads(service.handle(line))
+
+
+def test_numbers(service):
+    numbers = ask(service, {"op": "numbers", "count": 500, "min": -2, "max": 2})["numbers"]
+    assert len(numbers) == 500 and set(numbers) == {-2, -1, 0, 1, 2}
+
+
+def test_passphrase_of_a_served_wordlist(service, wordlist):
+    response = ask(service, {"op": "passphrase", "wordlist": wordlist,
+        "count": 3, "batch": 4, "separator": "-"})
+    assert len(response["passphrases"]) == 4
+    assert all(len(p.split("-")) == 3 for p in response["passphrases"])
+
+
+def test_wordlist_dir(pool, wordlist):
+    service = server.RandomService(pool, wordlist_dir=os.path.dirname(wordlist))
+    assert "passphrases" in ask(service, {"op": "passphrase", "wordlist": wordlist})
+
+
+@pytest.mark.parametrize("request_, error", [
+    ("not json", "Expecting value"),
+    ("[1, 2]", "must be JSON objects"),
+    ({"op": "nope"}, "unknown op 'nope'"),
+    ({"op": "numbers", "count": 0}, "count must be between"),
+    ({"op": "numbers", "count": server.MAX_COUNT + 1}, "count must be between"),
+    ({"op": "numbers", "count": "many"}, "invalid literal"),
+    ({"op": "numbers", "min": 5, "max": 1}, "max must not be smaller"),
+    ({"op": "numbers", "max": 1 << server.MAX_RANGE_BITS}, "must fit"),
+    ({"op": "numbers", "count": server.MAX_COUNT, "max": 1 << 64},
+        "at most {} bits".format(server.MAX_BITS)),
+    ({"op": "passphrase"}, "need a wordlist path"),
+    ({"op": "passphrase", "wordlist": "/etc/passwd"}, "isn't served"),
+    ({"op": "passphrase", "wordlist": "/no/such/file"}, "isn't served"),
+    ({"op": "passphrase", "wordlist": 3}, "need a wordlist path"),
+])
+def test_error_paths(service, request_, error):
+    assert error in ask(service, request_)["error"]
+
+
+def test_clients_cant_set_the_pattern(service, wordlist):
+    for pattern in ("(", "[^a-z0-9]"):
+        response = ask(service, {"op": "passphrase", "wordlist": wordlist,
+            "pattern": pattern})
+        assert "can't set a pattern" in response["error"]
+
+
+def test_files_outside_the_wordlist_dir(pool, wordlist, tmp_path):
+    served = tmp_path / "served"
+    served.mkdir()
+    os.symlink(wordlist, served / "link.txt")
+    service = server.RandomService(pool, wordlist_dir=str(served))
+    for name in (wordlist, str(served / ".." / "words.txt"),
+            str(served / "link.txt")):
+        assert "isn't served" in ask(service, {"op": "passphrase",
+            "wordlist": name})["error"]
+
+
+def test_bad_server_pattern(pool):
+    with pytest.raises(Exception):
+        server.RandomService(pool, pattern="(")
+
+
+async def _connect(port):
+    # room for the line of a MAX_COUNT response
+    return await asyncio.open_connection('127.0.0.1', port, limit=1 << 26)
+
+
+async def _ask(reader, writer, request):
+    writer.write((json.dumps(request) + "\n").encode())
+    await writer.drain()
+    return json.loads(await reader.readline())
+
+
+def _run_server(service, client):
+    """ Runs the coroutine function client(port) against a TCP server of
+    the service, the server on its own event loop & thread, the way clients
+    of other processes see it
+    """
+    started = queue.Queue()
+
+    async def serve():
+        tcp = await asyncio.start_server(service.serve_client, '127.0.0.1', 0)
+        stop = asyncio.get_running_loop().create_future()
+        started.put((tcp.sockets[0].getsockname()[1], stop))
+        async with tcp:
+            await stop
+
+    thread = threading.Thread(target=asyncio.run, args=(serve(),))
+    thread.start()
+    port, stop = started.get(timeout=5)
+    try:
+        return asyncio.run(client(port))
+    finally:
+        stop.get_loop().call_soon_threadsafe(stop.set_result, None)
+        thread.join(5)
+
+
+def test_connection_stays_open_after_errors(service):
+    async def client(port):
+        reader, writer = await _connect(port)
+        answers = [await _ask(reader, writer, request) for request in
+                ({"op": "nope"}, {"op": "passphrase", "wordlist": "/etc/passwd"},
+                    {"op": "ping"})]
+        writer.close()
+        return answers
+    answers = _run_server(service, client)
+    assert "error" in answers[0] and "error" in answers[1]
+    assert answers[2] == {"pong": True}
+
+
+def test_ping_stays_fast_during_a_large_request(service):
+    async def client(port):
+        big = await _connect(port)
+        small = await _connect(port)
+        start = time.perf_counter()
+        large = asyncio.ensure_future(_ask(*big, {"op": "numbers",
+            "count": server.MAX_COUNT, "max": 10 ** 12}))
+        await asyncio.sleep(0.05)
+        pinged = time.perf_counter()
+        pong = await _ask(*small, {"op": "ping"})
+        ping_time = time.perf_counter() - pinged
+        numbers = (await large)["numbers"]
+        large_time = time.perf_counter() - start
+        for reader, writer in (big, small):
+            writer.close()
+        return pong, ping_time, large_time, len(numbers)
+    pong, ping_time, large_time, count = _run_server(service, client)
+    assert pong == {"pong": True} and count == server.MAX_COUNT
+    # a ping waiting on the large request would take most of its time
+    assert ping_time < large_time / 10
+
+
+def test_widest_numbers(service):
+    high = (1 << server.MAX_RANGE_BITS) - 1
+    numbers = ask(service, {"op": "numbers", "count": 3, "max": high})["numbers"]
+    assert len(numbers) == 3 and all(0 <= n <= high for n in numbers)
+
+
+def test_vanished_wordlists_are_request_errors(monkeypatch, pool, tmp_path):
+    wordlist = tmp_path / "gone.txt"
+    service = server.RandomService(pool, wordlist_dir=str(tmp_path))
+    # the file goes away between the server's check & the read
+    isfile = os.path.isfile
+    monkeypatch.setattr(os.path, "isfile",
+            lambda p: p == str(wordlist) or isfile(p))
+    response = ask(service, {"op": "passphrase", "wordlist": str(wordlist)})
+    assert "No such file" in response["error"]
+    assert SystemExit not in server.REQUEST_ERRORS
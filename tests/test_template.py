@@ -0,0 +1,85 @@
+""" Tests of template.py: parsing, compiling & bulk generation of templates
+"""
+
+from collections import Counter
+from math import log2
+import re
+import string
+
+import pytest
+
+import template
+
+WORDS = ["apple", "banana", "cherry", "damson"]
+
+
+def test_parse_template():
+    assert template.parse_template("{{x{digit:3}-{Word}}}") == [
+        ('literal', '{'), ('literal', 'x'), ('token', 'digit'),
+        ('token', 'digit'), ('token', 'digit'), ('literal', '-'),
+        ('token', 'Word'), ('literal', '}')]
+
+
+@pytest.mark.parametrize("text", ["{nope}", "{digit", "digit}", "{"])
+def test_parse_template_errors(text):
+    with pytest.raises(ValueError):
+        template.parse_template(text)
+
+
+@pytest.mark.parametrize("text, bits", [
+    ("{digit:2}{symbol}", 2 * log2(10) + log2(len(string.punctuation))),
+    ("{letter}-{LETTER}", 2 * log2(26)),
+    ("{word}{Word}{WORD}", 3 * log2(4)),
+    ("just text", 0.0),
+])
+def test_template_bits(text, bits):
+    assert template.Template(text, WORDS).bits == pytest.approx(bits)
+
+
+def test_casing_merges_words(randbytes):
+    words = ["Polish", "polish", "POLISH", "tea", "", "tea"]
+    plan = template.Template("{word} {Word} {WORD}", words)
+    assert plan.bits == pytest.approx(3 * log2(2))
+    outputs = set(plan.generate(500, randbytes))
+    assert {line.split()[0] for line in outputs} == {"polish", "tea"}
+    assert {line.split()[2] for line in outputs} == {"POLISH", "TEA"}
+
+
+def test_template_errors():
+    with pytest.raises(ValueError):
+        template.Template("")
+    with pytest.raises(ValueError):
+        template.Template("{word}")
+    with pytest.raises(ValueError):
+        template.Template("{word}", ["", ""])
+
+
+def test_generate_follows_the_template(randbytes):
+    plan = template.Template("{digit:2}{Word}-{symbol}{{}}", WORDS)
+    pattern = re.compile(r"\d\d(Apple|Banana|Cherry|Damson)-[{}]\{{\}}".format(
+        re.escape(string.punctuation)))
+    outputs = list(plan.generate(3000, randbytes, chunk_size=1000))
+    assert len(outputs) == 3000
+    assert all(pattern.fullmatch(line) for line in outputs)
+    # every word equally likely, 3 degrees of freedom, p = 0.001
+    counts = Counter(re.search("[A-Z][a-z]+", line).group(0) for line in outputs)
+    assert sum((count - 750) ** 2 / 750 for count in counts.values()) < 16.3
+    assert list(plan.generate(0)) == []
+
+
+def test_generate_is_reproducible(make_randbytes):
+    plan = template.Template("{word}{digit:4}", WORDS)
+    assert list(plan.generate(50, make_randbytes(8))) == \
+            list(plan.generate(50, make_randbytes(8)))
+    assert re.fullmatch("[a-z]+[0-9]{4}", plan.sample())
+
+
+def test_cli_template(run_tool, wordlist):
+    result = run_tool("wl.py", "-i", wordlist, "-t", "{Word}{digit:2}", "-b",
+            "5", "--entropy")
+    lines = result.stdout.splitlines()
+    assert len(lines) == 5
+    assert all(re.fullmatch("[A-Z]word[0-9]{2}", line) for line in lines)
+    assert result.stderr.startswith("{:.2f} bits".format(log2(26) + 2 * log2(10)))
+    result = run_tool("wl.py", "-t", "{nope}", check=False)
+    assert result.returncode == 1 and "unknown template token" in result.stdout
@@ -0,0 +1,221 @@
+""" Tests of wl.py: wordlist reading, caching & passphrase generation
+"""
+
+import pytest
+
+import wl
+
+
+@pytest.fixture
+def cache():
+    return wl.WordlistCache(maxsize=2)
+
+
+def test_cache_hits_and_misses(cache, wordlist):
+    first = cache.get(wordlist)
+    assert cache.get(wordlist) is first
+    assert cache.info() == {"hits": 1, "misses": 1, "size": 1, "maxsize": 2}
+
+
+def test_cache_reloads_changed_files(cache, wordlist):
+    first = cache.get(wordlist)
+    with open(wordlist, 'a') as file:
+        file.write("zzz\n")
+    second = cache.get(wordlist)
+    assert second is not first and second[-1] == "zzz"
+    # the stale entry is dropped, not kept until evicted
+    assert cache.info()["size"] == 1
+
+
+def test_cache_keys_on_the_pattern(cache, tmp_path):
+    path = tmp_path / "mixed.txt"
+    path.write_text("ab1\ncd2\n")
+    assert cache.get(str(path)) == ["ab", "cd"]
+    assert cache.get(str(path), '[^a-z0-9]') == ["ab1", "cd2"]
+    assert cache.info()["size"] == 2
+
+
+def test_cache_evicts_least_recently_used(cache, tmp_path):
+    paths = []
+    for name in "abc":
+        path = tmp_path / (name + ".txt")
+        path.write_text(name + "\n")
+        paths.append(str(path))
+    first = cache.get(paths[0])
+    cache.get(paths[1])
+    cache.get(paths[0])
+    cache.get(paths[2])
+    assert cache.info()["size"] == 2
+    assert cache.get(paths[0]) is first
+    assert cache.info()["misses"] == 3
+    cache.clear()
+    assert cache.info() == {"hits": 0, "misses": 0, "size": 0, "maxsize": 2}
+
+
+def test_read_words_uses_the_shared_cache(wordlist):
+    wl.wordlist_cache.clear()
+    assert wl.read_words(wordlist) is wl.read_words(wordlist)
+    assert wl.wordlist_cache.info()["hits"] == 1
+    wl.wordlist_cache.clear()
+
+
+def test_generate_passphrases(wordlist, randbytes):
+    words = set(wl.read_words(wordlist))
+    passphrases = list(wl.generate_passphrases(wordlist, 10, count=4,
+        chunk_size=3, randbytes=randbytes))
+    assert len(passphrases) == 10
+    for passphrase in passphrases:
+        picked = passphrase.split(' ')
+        assert len(picked) == 4 and set(picked) <= words
+
+
+def test_generate_passphrases_as_lists(wordlist, randbytes):
+    words = set(wl.read_words(wordlist))
+    passphrases = list(wl.generate_passphrases(wordlist, 5, count=3,
+        separator=None, randbytes=randbytes))
+    assert len(passphrases) == 5
+    assert all(len(picked) == 3 and set(picked) <= words for picked in passphrases)
+    assert list(wl.generate_passphrases(wordlist, 0)) == []
+
+
+def test_generate_passphrases_is_reproducible(wordlist, make_randbytes):
+    first = list(wl.generate_passphrases(wordlist, 20, chunk_size=7,
+        randbytes=make_randbytes(1)))
+    second = list(wl.generate_passphrases(wordlist, 20, chunk_size=7,
+        randbytes=make_randbytes(1)))
+    assert first == second
+
+
+@pytest.mark.parametrize("format, check", [
+    ("lines", lambda line: len(line.split(' ')) == 3),
+    ("csv", lambda line: len(line.split(',')) == 3),
+    ("json", lambda line: len(__import__('json').loads(line)) == 3),
+])
+def test_batch_cli(run_tool, wordlist, format, check):
+    output = run_tool("wl.py", "-i", wordlist, "-n", "3", "-b", "7",
+            "--format", format).stdout
+    lines = output.splitlines()
+    assert len(lines) == 7 and all(map(check, lines))
+
+
+def test_batch_cli_separator(run_tool, wordlist):
+    lines = run_tool("wl.py", "-i", wordlist, "-n", "2", "-b", "3",
+            "--separator", "-").stdout.splitlines()
+    assert len(lines) == 3 and all(line.count("-") == 1 for line in lines)
+
+@pytest.fixture
+def gz_wordlist(tmp_path):
+    """ A gzipped wordlist of 1000 distinct words, with noise to clean out
+    """
+    import gzip
+    file_path = tmp_path / "words.txt.gz"
+    with gzip.open(str(file_path), "wt") as file:
+        for i in range(1000):
+            file.write("w{}ord\n\n12\n".format("".join(
+                chr(ord('a') + int(digit)) for digit in str(i))))
+    return str(file_path)
+
+
+def test_is_stream(gz_wordlist, wordlist):
+    assert wl.is_stream("-") and wl.is_stream(gz_wordlist)
+    assert not wl.is_stream(wordlist)
+    with open(wordlist, "rb") as file:
+        assert wl.is_stream(file)
+
+
+def test_stream_words_cleans_across_chunks(monkeypatch, gz_wordlist):
+    monkeypatch.setattr(wl, "STREAM_CHUNK_SIZE", 7)
+    words = list(wl.stream_words(gz_wordlist))
+    assert len(words) == 1000 == len(set(words))
+    assert words[:3] == ["waord", "wbord", "wcord"]
+
+
+def test_read_random_words_from_streams(make_randbytes, gz_wordlist, wordlist):
+    picked = wl.read_random_words(gz_wordlist, 8, randbytes=make_randbytes(4))
+    assert len(picked) == 8 and all(word.startswith("w") for word in picked)
+    assert picked == wl.read_random_words(gz_wordlist, 8,
+            randbytes=make_randbytes(4))
+    unique = wl.read_random_words(gz_wordlist, 500, unique=True)
+    assert len(set(unique)) == 500
+    with open(wordlist, "rb") as file:
+        assert len(set(wl.read_random_words(file, 26, unique=True))) == 26
+    with pytest.raises(ValueError):
+        wl.read_random_words(gz_wordlist, 2, weights=[1] * 1000)
+
+
+def test_stream_cli(run_tool, wordlist, gz_wordlist):
+    with open(wordlist) as file:
+        text = file.read()
+    lines = run_tool("wl.py", "-i", "-", "-n", "26", "--sampling", "unique",
+            input=text).stdout.split()
+    assert sorted(lines) == sorted(text.split())
+    batch = run_tool("wl.py", "-i", gz_wordlist, "-n", "3", "-b", "4",
+            "--seed", "x").stdout.splitlines()
+    assert len(batch) == 4 and all(len(line.split()) == 3 for line in batch)
+    assert batch == run_tool("wl.py", "-i", gz_wordlist, "-n", "3", "-b", "4",
+            "--seed", "x").stdout.splitlines()
+    result = run_tool("wl.py", "-i", gz_wordlist, "--entropy", check=False)
+    assert result.returncode == 1 and "Streamed wordlists" in result.stdout
+
+
+@pytest.fixture
+def gappy_wordlist(tmp_path):
+    """ A wordlist of 3 words between blank & non-alphabetic lines
+    """
+    file_path = tmp_path / "gappy.txt"
+    file_path.write_text("\n\napple\n1234\n\nbanana\n  \ncherry\n\n")
+    return str(file_path)
+
+
+def test_blank_words_are_left_out(randbytes, gappy_wordlist):
+    assert wl.read_words(gappy_wordlist) == ["apple", "banana", "cherry"]
+    picked = wl.read_random_words(gappy_wordlist, 200, randbytes=randbytes)
+    assert set(picked) == {"apple", "banana", "cherry"}
+    passphrases = list(wl.generate_passphrases(gappy_wordlist, 100, count=4,
+        separator=None, randbytes=randbytes))
+    assert all(all(passphrase) for passphrase in passphrases)
+    unique = list(wl.generate_passphrases(gappy_wordlist, 20, count=3,
+        unique=True, randbytes=randbytes))
+    assert all(sorted(line.split()) == ["apple", "banana", "cherry"]
+            for line in unique)
+
+
+def test_weights_stay_aligned_with_blank_words(randbytes, tmp_path):
+    import sampling
+    file_path = tmp_path / "weighted.txt"
+    file_path.write_text("\napple 0\n12 5\n\nbanana 1\n")
+    table = sampling.load_alias_table(str(file_path))
+    assert list(sampling.read_weights(str(file_path))) == [0, 1]
+    picked = wl.read_random_words(str(file_path), 50, weights=table,
+            randbytes=randbytes)
+    assert picked == ["banana"] * 50
+
+
+def test_repeated_words_count_once(randbytes, tmp_path):
+    file_path = tmp_path / "repeats.txt"
+    file_path.write_text("apple\nbanana\napple\napple\n\ncherry\napple\n")
+    assert wl.read_words(str(file_path)) == ["apple", "banana", "cherry"]
+    for line in wl.generate_passphrases(str(file_path), 50, count=3,
+            separator=None, unique=True, randbytes=randbytes):
+        assert sorted(line) == ["apple", "banana", "cherry"]
+    index = str(tmp_path / "repeats.wlx")
+    assert wl.compile_wordlist(str(file_path), index) == 3
+    assert list(wl.read_words(index)) == ["apple", "banana", "cherry"]
+
+
+
+@pytest.mark.parametrize("pattern", ['[^a-zA-Z]', '[^a-z]', '[^a-zA-Z]|q'])
+def test_load_wordlist_cleans_like_clean_words(tmp_path, pattern):
+    file_path = tmp_path / "mixed.txt"
+    file_path.write_bytes("Apple\r\nba-na-na\rcherry\n\ncafé 42\nquince\nApple"
+            .encode())
+    with open(file_path) as file:
+        expected = list(dict.fromkeys(filter(None,
+            wl.clean_words(file.readlines(), pattern))))
+    assert wl.load_wordlist(str(file_path), pattern) == expected
+
+@pytest.mark.parametrize("words, error", [("not a file", ValueError),
+    (3, TypeError)])
+def test_read_words_raises_on_bad_input(words, error):
+    with pytest.raises(error):
+        wl.read_words(words)
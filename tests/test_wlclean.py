@@ -0,0 +1,103 @@
+""" Tests of wlclean.py: streaming wordlist cleaning
+"""
+
+import io
+import re
+
+import pytest
+
+import wlclean
+
+
+@pytest.mark.parametrize("pattern, fast", [
+    ('[^a-zA-Z]', True), ('[^a-z0-9]', True), ('[0-9]', True),
+    ('[^a-zé]', False), ('x+', False), ('[^a-z]|q', False),
+])
+def test_delete_table_only_for_simple_classes(pattern, fast):
+    assert (wlclean.delete_table(pattern) is not None) == fast
+
+
+@pytest.mark.parametrize("pattern", ['[^a-zA-Z]', '[^a-z0-9]', '[^a-zé]', 'o+'])
+@pytest.mark.parametrize("lower", [False, True])
+def test_clean_chunk_matches_the_regex(pattern, lower):
+    lines = ["Hello", "wörld", "a1b2", "", "x-y_z", "café", "中文", "FOO bar"]
+    chunk = "\n".join(lines).encode() + b"\n"
+    expected = [re.sub(pattern, '', line.lower() if lower else line)
+            for line in lines]
+    assert wlclean.clean_chunk(chunk, pattern, lower) == expected
+
+
+def test_clean_chunk_without_final_newline():
+    assert wlclean.clean_chunk(b"ab\ncd") == ["ab", "cd"]
+
+
+def test_filter_words():
+    words = ["a", "", "bb", "ccc", "bb", "dddd"]
+    assert wlclean.filter_words(words) == ["a", "bb", "ccc", "bb", "dddd"]
+    assert wlclean.filter_words(words, 2, 3) == ["bb", "ccc", "bb"]
+    assert wlclean.filter_words(words, seen=set()) == ["a", "bb", "ccc", "dddd"]
+
+
+def test_iter_line_chunks_end_on_line_boundaries():
+    data = b"".join(b"word%d\n" % i for i in range(500)) + b"tail"
+    chunks = list(wlclean.iter_line_chunks(io.BytesIO(data), chunk_size=64))
+    assert b"".join(chunks) == data
+    assert all(chunk.endswith(b"\n") for chunk in chunks[:-1])
+    assert list(wlclean.iter_line_chunks(io.BytesIO(data), 12,
+        chunk_size=5)) == [b"word0\n", b"word1\n"]
+
+
+
+def test_iter_line_chunks_drop_overlong_lines():
+    data = b"one\n" + b"x" * 10000 + b"\ntwo\n" + b"y" * 3000 + b"\nthree\n"
+    chunks = list(wlclean.iter_line_chunks(io.BytesIO(data), chunk_size=64,
+        max_line=1000))
+    assert b"".join(chunks).split() == [b"one", b"two", b"three"]
+    # nothing held back between chunks ever grows past the cap
+    assert max(map(len, chunks)) <= 64 + 1000
+    data = b"z" * 10000
+    assert list(wlclean.iter_line_chunks(io.BytesIO(data), chunk_size=64,
+        max_line=1000)) == []
+    assert list(wlclean.iter_line_chunks(io.BytesIO(data), 500,
+        chunk_size=64, max_line=1000)) == [b"z" * 500]
+
+def test_line_ranges_cover_the_file(tmp_path):
+    path = tmp_path / "words.txt"
+    path.write_bytes(b"".join(b"w%d\n" % i for i in range(1000)))
+    ranges = wlclean.line_ranges(str(path), shard_size=100)
+    assert ranges[0][0] == 0 and ranges[-1][1] == path.stat().st_size
+    assert all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))
+    data = path.read_bytes()
+    assert all(data[start - 1:start] == b"\n" for start, end in ranges[1:])
+
+
+@pytest.fixture
+def dirty(tmp_path):
+    path = tmp_path / "dirty.txt"
+    path.write_text("".join("{}\tWord-{}\n".format(i, "abcde"[i % 5])
+        for i in range(2000)))
+    return str(path)
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_iter_clean_words(dirty, jobs, monkeypatch):
+    monkeypatch.setattr(wlclean, 'SHARD_SIZE', 1000)
+    words = [w for chunk in wlclean.iter_clean_words(dirty, lower=True,
+        dedupe=True, jobs=jobs) for w in chunk]
+    assert words == ["worda", "wordb", "wordc", "wordd", "worde"]
+
+
+def test_clean_file(dirty, tmp_path):
+    import wlindex
+    out, index = str(tmp_path / "clean.txt"), str(tmp_path / "clean.wlx")
+    stats = wlclean.clean_file(dirty, out, index, min_len=5)
+    assert stats["words"] == 2000
+    lines = open(out).read().splitlines()
+    assert lines[:2] == ["Worda", "Wordb"] and len(lines) == 2000
+    assert list(wlindex.WordIndex(index)) == lines
+
+
+def test_cli(run_tool, dirty, tmp_path):
+    out = tmp_path / "clean.txt"
+    run_tool("wlclean.py", dirty, "-o", out, "--lower", "--dedupe")
+    assert out.read_text().split() == ["worda", "wordb", "wordc", "wordd", "worde"]
@@ -0,0 +1,88 @@
+""" Tests of wlgen.py: wordlists out of text corpora
+"""
+
+from collections import Counter
+import gzip
+import io
+import random
+
+import pytest
+
+import wlgen
+
+
+def test_read_chunks_end_on_whitespace():
+    data = b"".join(b"w%d%s" % (i, b" \n\t"[i % 3:i % 3 + 1]) for i in range(3000))
+    chunks = list(wlgen.read_chunks(io.BytesIO(data), chunk_size=100))
+    assert b"".join(chunks) == data
+    assert all(chunk[-1:].isspace() for chunk in chunks[:-1])
+
+
+def test_read_chunks_drops_oversized_tokens():
+    data = b"one two " + b"x" * 5000 + b" three " + b"y" * 5000
+    chunks = list(wlgen.read_chunks(io.BytesIO(data), chunk_size=64,
+        max_token=1000))
+    assert b"".join(chunks).split() == [b"one", b"two", b"three"]
+    # nothing held back between chunks ever grows past the cap
+    assert max(map(len, chunks)) <= 64 + 1000
+    data = b"z" * 10000
+    assert list(wlgen.read_chunks(io.BytesIO(data), 64, 1000)) == []
+    assert list(wlgen.read_chunks(io.BytesIO(b"short"), 64, 1000)) == [b"short"]
+
+
+@pytest.mark.parametrize("pattern", ['[^a-zA-Z]', '[^a-z]|q'])
+def test_tokenize(pattern):
+    assert wlgen.tokenize(b"The cat's  hat,\n 42 QUIZ", pattern) == \
+            ["the", "cats", "hat", "uiz" if "q" in pattern else "quiz"]
+    assert wlgen.tokenize(b"The Cat", lower=False) == ["The", "Cat"]
+
+
+def test_dice():
+    assert wlgen.is_dice_count(7776) and wlgen.is_dice_count(6)
+    assert not wlgen.is_dice_count(7000)
+    assert wlgen.dice_label(0, 7776) == "11111"
+    assert wlgen.dice_label(7775, 7776) == "66666"
+    assert wlgen.dice_label(6, 36) == "21"
+
+
+def test_space_saving_is_exact_within_capacity():
+    summary = wlgen.SpaceSaving(10)
+    summary.update({"a": 3, "b": 1})
+    summary.update({"a": 1, "c": 2})
+    assert summary.top(2) == [("a", 4), ("c", 2)]
+    with pytest.raises(ValueError):
+        wlgen.SpaceSaving(0)
+
+
+def test_space_saving_keeps_the_heavy_hitters():
+    rand = random.Random(5)
+    words = ["w{}".format(min(int(rand.paretovariate(1.2)), 5000))
+            for null in range(50000)]
+    truth = Counter(words)
+    summary = wlgen.SpaceSaving(100)
+    for start in range(0, len(words), 1000):
+        summary.update(Counter(words[start:start + 1000]))
+    assert len(summary) <= 100
+    top = [word for word, n in truth.most_common(10)]
+    assert [word for word, n in summary.top(10)] == top
+    for word, n in summary.top(10):
+        assert truth[word] <= n <= truth[word] + summary.errors.get(word, 0)
+
+
+def test_generate_wordlist(tmp_path):
+    corpus = tmp_path / "corpus.txt.gz"
+    with gzip.open(corpus, 'wt') as file:
+        file.write("the cat and the hat, THE bat and a cat " * 50)
+    words, report = wlgen.generate_wordlist([str(corpus)], count=3)
+    assert words == ["the", "and", "cat"]
+    assert report["tokens"] == 500
+
+
+def test_cli(run_tool, tmp_path):
+    corpus = tmp_path / "corpus.txt"
+    corpus.write_text(" ".join("word{}".format(chr(97 + i % 6)) * (i % 6 + 1)
+        for i in range(600)))
+    output = run_tool("wlgen.py", corpus, "-n", "6", "--dice", "--max-len", "0").stdout
+    assert [line.split("\t")[0] for line in output.splitlines()] == \
+            ["1", "2", "3", "4", "5", "6"]
+    assert run_tool("wlgen.py", corpus, "-n", "7", "--dice", check=False).returncode == 1
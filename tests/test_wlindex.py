@@ -0,0 +1,70 @@
+""" Tests of wlindex.py: compiled, memory-mapped wordlist indices
+"""
+
+import os
+import stat
+
+import pytest
+
+import wl
+import wlindex
+
+
+WORDS = ["alpha", "", "beta", "ünïcødé", "x" * 300, "gamma"]
+
+
+@pytest.fixture
+def index(tmp_path):
+    path = str(tmp_path / "words.wlx")
+    assert wlindex.write_index(iter(WORDS), path) == len(WORDS)
+    with wlindex.WordIndex(path) as words:
+        yield words
+
+
+def test_round_trip(index):
+    assert len(index) == len(WORDS)
+    assert list(index) == WORDS
+    assert index[-1] == "gamma" and index[3] == "ünïcødé"
+    assert index[1:4] == WORDS[1:4]
+    with pytest.raises(IndexError):
+        index[len(WORDS)]
+
+
+def test_is_index(index, tmp_path, wordlist):
+    assert wlindex.is_index(index.path)
+    assert not wlindex.is_index(wordlist)
+    assert not wlindex.is_index(str(tmp_path / "missing"))
+
+
+def test_rejects_other_files(wordlist):
+    with pytest.raises(ValueError):
+        wlindex.WordIndex(wordlist)
+
+
+def test_rewrite_leaves_no_temporary_files(tmp_path):
+    path = str(tmp_path / "words.wlx")
+    wlindex.write_index(["one"], path)
+    with wlindex.WordIndex(path) as old:
+        # replaced atomically, so a mapped older version stays readable
+        wlindex.write_index(["two", "three"], path)
+        assert list(old) == ["one"]
+    assert os.listdir(str(tmp_path)) == ["words.wlx"]
+    umask = os.umask(0)
+    os.umask(umask)
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o666 & ~umask
+
+
+def test_failed_write_cleans_up(tmp_path):
+    def words():
+        yield "one"
+        raise RuntimeError("broken source")
+    with pytest.raises(RuntimeError):
+        wlindex.write_index(words(), str(tmp_path / "words.wlx"))
+    assert os.listdir(str(tmp_path)) == []
+
+
+def test_compiled_wordlist_reads_like_the_file(wordlist, tmp_path):
+    path = str(tmp_path / "words.wlx")
+    assert wl.compile_wordlist(wordlist, path) == 26
+    assert list(wl.read_words(path)) == list(wl.read_words(wordlist))
+    assert set(wl.read_random_words(path, count=50)) <= set(wl.read_words(wordlist))
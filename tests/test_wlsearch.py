@@ -0,0 +1,147 @@
+""" Tests of wlsearch.py: exact, prefix & substring search indices
+"""
+
+import os
+import random
+import shutil
+
+import pytest
+
+import wlsearch
+
+
+def make_words(seed=0, count=600):
+    rand = random.Random(seed)
+    letters = "abcdeABCé中ß"
+    words = ["".join(rand.choices(letters, k=rand.randint(0, 7)))
+            for null in range(count)]
+    return words + ["a", "A", "ab", "Straße", "STRASSE", ""]
+
+
+def brute_force(words, query, match, case_sensitive):
+    fold = lambda w: wlsearch.fold(w, case_sensitive)
+    key = fold(query)
+    test = {"exact": lambda w: fold(w) == key,
+            "prefix": lambda w: fold(w).startswith(key),
+            "substring": lambda w: key in fold(w)}[match]
+    return [i for i, word in enumerate(words) if test(word)]
+
+
+QUERIES = ["", "a", "A", "b", "ab", "abc", "aBc", "é", "中a", "ss", "strasse",
+        "cab", "eee", "abcde", "zz", "\x00"]
+
+
+@pytest.fixture(params=[False, True], ids=["folded", "case_sensitive"])
+def indexed(request, tmp_path):
+    words = make_words()
+    built = wlsearch.WordSearch.build(words, request.param)
+    path = str(tmp_path / "words.wls")
+    built.save(path)
+    with wlsearch.WordSearch.load(path) as loaded:
+        yield words, request.param, built, loaded
+
+
+@pytest.mark.parametrize("match", wlsearch.MATCHES)
+def test_search_matches_brute_force(indexed, match):
+    words, case_sensitive, built, loaded = indexed
+    for query in QUERIES:
+        expected = brute_force(words, query, match, case_sensitive)
+        assert built.search(query, match) == expected, query
+        assert loaded.search(query, match) == expected, query
+
+
+def test_contains(indexed):
+    words, case_sensitive, built, loaded = indexed
+    assert "Straße" in loaded and "zzz" not in loaded
+    assert ("strasse" in loaded) == (not case_sensitive)
+    with pytest.raises(ValueError):
+        loaded.search("a", "regex")
+
+
+def test_gram_packing():
+    for gram in ("abc", "\x00a\x00", "中ß\U0001f600"):
+        assert wlsearch.unpack_gram(wlsearch.pack_gram(gram)) == gram
+
+
+def test_load_rejects_other_files(tmp_path):
+    path = tmp_path / "other.wls"
+    path.write_bytes(b"\x00" * 64)
+    with pytest.raises(ValueError):
+        wlsearch.WordSearch.load(str(path))
+
+
+def test_open_search_saves_only_when_asked(wordlist):
+    with wlsearch.open_search(wordlist, lambda: open(wordlist).read().split()) \
+            as search:
+        assert search.exact("mword") == [12]
+        assert search.source == wlsearch.source_identity(wordlist)
+    assert os.listdir(os.path.dirname(wordlist)) == ["words.txt"]
+
+
+def test_open_search_saves_and_rebuilds(wordlist, tmp_path):
+    index_dir = str(tmp_path / "cache" / "wls")
+    calls = []
+    def words():
+        calls.append(1)
+        return open(wordlist).read().split()
+    with wlsearch.open_search(wordlist, words, index_dir=index_dir) as search:
+        assert search.exact("MWORD") == [12]
+    index_path = wlsearch.search_path(wordlist, index_dir)
+    assert os.path.dirname(index_path) == index_dir and os.path.isfile(index_path)
+    with wlsearch.open_search(wordlist, words, index_dir=index_dir) as search:
+        assert len(calls) == 1
+    # the other case sensitivity gets rebuilt
+    with wlsearch.open_search(wordlist, words, True, index_dir) as search:
+        assert search.exact("MWORD") == [] and len(calls) == 2
+    assert [name for name in os.listdir(index_dir) if name.endswith('.tmp')] == []
+
+
+@pytest.mark.parametrize("edit", ["same_mtime", "copy2"])
+def test_open_search_sees_edits_the_mtime_hides(wordlist, tmp_path, edit):
+    index_dir = str(tmp_path / "cache")
+    words = lambda: open(wordlist).read().split()
+    wlsearch.open_search(wordlist, words, index_dir=index_dir).close()
+    stat = os.stat(wordlist)
+    if edit == "same_mtime":
+        with open(wordlist, "a") as file:
+            file.write("zzzword\n")
+        os.utime(wordlist, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    else:
+        other = tmp_path / "other.txt"
+        other.write_text("newword\n")
+        os.utime(str(other), ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        shutil.copy2(str(other), wordlist)
+    assert os.stat(wordlist).st_mtime_ns == stat.st_mtime_ns
+    with wlsearch.open_search(wordlist, words, index_dir=index_dir) as search:
+        assert search.count == len(words())
+
+
+def test_open_search_falls_back_to_memory(wordlist, tmp_path, monkeypatch):
+    def read_only(*args, **kwargs):
+        raise PermissionError("read-only directory")
+    monkeypatch.setattr(wlsearch.tempfile, 'mkstemp', read_only)
+    index_dir = str(tmp_path / "cache")
+    search = wlsearch.open_search(wordlist, lambda: open(wordlist).read().split(),
+            index_dir=index_dir)
+    assert search.prefix("b") == [1]
+    assert os.listdir(index_dir) == []
+
+
+def test_failed_save_leaves_no_files(tmp_path, monkeypatch):
+    search = wlsearch.WordSearch.build(["abc"])
+    def broken(out):
+        raise OSError("disk full")
+    monkeypatch.setattr(search, '_write', broken)
+    with pytest.raises(OSError):
+        search.save(str(tmp_path / "words.wls"))
+    assert os.listdir(tmp_path) == []
+
+
+def test_search_cli(run_tool, wordlist, tmp_path):
+    assert run_tool("wl.py", "-i", wordlist, "-s", "MW").stdout == "mword\n"
+    assert os.listdir(os.path.dirname(wordlist)) == ["words.txt"]
+    index_dir = tmp_path / "cache"
+    result = run_tool("wl.py", "-i", wordlist, "-s", "word", "--match", "exact",
+            "--search-index", index_dir)
+    assert result.stdout == ""
+    assert [name.endswith(".wls") for name in os.listdir(index_dir)] == [True]
@@ -12,7 +12,6 @@
             - File path input
             - File input
             - Generic 'collection' type input
-            - std_in input
             - Single string input
             - Byte input
             - Unclean string input
@@ -28,11 +27,17 @@
 ## Imports
 ################################################################################
 
-import optparse
+from collections import OrderedDict
+from itertools import chain
+import os
 from os import path
-from re import sub, compile
+import entropy
+import instrument
 import rng
+import sys
 from sys import exit
+import threading
+import wlindex
 
 
 
@@ -52,7 +57,7 @@ def get_file(file_path):
     """
     # TODO: Add input type validation
     # first check to see if the input file exists
-    if not path.isfile(words_path):
+    if not path.isfile(file_path):
         print()
         print("[ERROR]: The given input file path, doesn't lead to a file!")
         print("======== Please try again with a valid file path to a wordlist")
@@ -76,7 +81,8 @@ def read_file_lines(file):
         - Perform some basic filetype validation for being a wordlist file
     """
     # TODO: Validate the file
-    return file.readlines()
+    with instrument.stage('wl.read'):
+        return file.readlines()
 
 def clean_word(dirty_word, pattern='[^a-zA-Z]'):
     """ Reads a single word string from unwanted characters
@@ -90,12 +96,11 @@ def clean_word(dirty_word, pattern='[^a-zA-Z]'):
         str: a string of a cleaned/filtered version of dirty_word
 
     TODO:
-        - Take in a regex pattern to clean word with
         - Perform some classification algorithm to improve cleaning
         - GPGPU acceleration
     """
-    regex = re.compile(pattern)
-    return regex.sub('', dirty_word)
+    import wlclean
+    return wlclean.compile_pattern(pattern).sub('', dirty_word)
 
 def clean_words(dirty_words, pattern='[^a-zA-Z]'):
     """ Reads a wordlist ( a list of strings ) & strips them of unwanted chars 
@@ -110,10 +115,76 @@ def clean_words(dirty_words, pattern='[^a-zA-Z]'):
         [str]: a list of strings with only alphabetic characters
     """
     # setup the regex engine for the characters to strip
-    regex = compile(pattern)
-    return [regex.sub('', word) for word in dirty_words]
+    import wlclean
+    regex = wlclean.compile_pattern(pattern)
+    with instrument.stage('wl.clean'):
+        words = [regex.sub('', word) for word in dirty_words]
+    if instrument.enabled:
+        instrument.count('wl.words_cleaned', len(words))
+    return words
     
 
+def compile_wordlist(words, dst, pattern='[^a-zA-Z]', jobs=1):
+    """ Cleans a wordlist & compiles it into a memory-mapped index file
+        (see wlindex), so later reads only cost a lookup per picked word
+
+    Args:
+        words (object): words can be any of the valid data types from
+            read_words() function
+        dst (str): the path of the index file to write
+        pattern (str): a string representing a regex pattern of valid chars
+        jobs (int): the number of worker processes cleaning a wordlist file,
+            0 for every core [default = 1]
+
+    Returns:
+        int: the amount of words in the compiled index. Words that end up
+            empty after cleaning (ie. blank lines) & repeats of a word are
+            left out, as in load_wordlist()
+    """
+    if isinstance(words, str) and not wlindex.is_index(words):
+        import wlclean
+        # stream plain wordlist files in chunks rather than reading them whole
+        return wlclean.clean_file(words, index=dst, pattern=pattern,
+                dedupe=True, jobs=jobs)["words"]
+    return wlindex.write_index(dict.fromkeys(
+            word for word in read_words(words, pattern=pattern) if word), dst)
+
+def load_wordlist(file_path, pattern='[^a-zA-Z]'):
+    """ Loads a wordlist file from disk, bypassing the wordlist cache
+
+    Args:
+        file_path (str): a path to a wordlist file or compiled index
+        pattern (str): a string representing a regex pattern of valid chars
+
+    Returns:
+        [str]: a clean list of distinct words, or a wlindex.WordIndex for
+            indices. Words that end up empty after cleaning (ie. blank
+            lines) & repeats of a word are left out, as in compiled indices,
+            so every pick (& unique picks in particular) counts each word once
+    """
+    if wlindex.is_index(file_path):
+        # compiled indices are already clean, so map them as they are
+        return wlindex.WordIndex(file_path)
+    import wlclean
+    # open() rather than get_file(), so library callers get an OSError, not
+    # an exit
+    if wlclean.delete_table(pattern) is None:
+        with open(file_path, "r") as file:
+            words = clean_words(read_file_lines(file), pattern)
+    else:
+        # simple character classes clean the whole file in a few C level
+        # passes, rather than a regex call per line
+        with open(file_path, "rb") as file:
+            with instrument.stage('wl.read'):
+                data = file.read()
+        with instrument.stage('wl.clean'):
+            # the line endings text mode reads as newlines
+            data = data.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+            words = wlclean.clean_chunk(data, pattern)
+        if instrument.enabled:
+            instrument.count('wl.words_cleaned', len(words))
+    return list(dict.fromkeys(filter(None, words)))
+
 def read_words(words, pattern='[^a-zA-Z]', isdebug=False):
     """ A flexible version of previous functions that 'intelligently'
         interprets the input source and returns a clean list of words
@@ -125,12 +196,19 @@ def read_words(words, pattern='[^a-zA-Z]', isdebug=False):
         throw exceptions.
         Valid types of 'words':
             - A string representing a valid filepath
+            - A string representing a path to a compiled index (see wlindex)
             - A string containing several delimited words
             - A python opened file of type '_io.TextIOWrapper'
             - A list of strings of individual words
 
     Returns:
-        [str]: A list of cleanly parsed word strings
+        [str]: A list of cleanly parsed word strings. Lists read from file
+            paths are shared through wordlist_cache, so don't modify them
+
+    Raises:
+        ValueError: for strings that aren't wordlist files & bad lists
+        TypeError: for any other type of 'words'
+        OSError: when a wordlist file can't be read
 
     TODO:
         - Inteligent-ish input source heuristics or learned classification
@@ -155,15 +233,16 @@ def read_words(words, pattern='[^a-zA-Z]', isdebug=False):
         if path.isfile(words):
             if isdebug:
                 print("[DEBUG]: in read_words(): words is valid path")
-            # it is a file path so treat it as one to return wordlist
-            return clean_words(read_file_lines(get_file(words)), pattern)
+            # it is a file path so treat it as one to return wordlist,
+            # served from the cache unless the file changed since last read
+            return wordlist_cache.get(words, pattern)
         else:
-            if not isdebug:
+            if isdebug:
                 print("[DEBUG]: in read_words(): words isn't valid path")
             # TODO: check for common delimiters
             #if so split string into list of words using most common one
-            print("[ERROR]: Interpretation of str delimiter not implemented")
-            exit(1)
+            raise ValueError("'{}' isn't a wordlist file, interpretation of "
+                    "str delimiters isn't implemented".format(words))
     elif type(words) == '_io.TextIOWrapper':
         return clean_words(red_file_lines(words), pattern)
     elif type(words) == 'list':
@@ -171,45 +250,370 @@ def read_words(words, pattern='[^a-zA-Z]', isdebug=False):
         if all(isinstance(n, str) for n in words):
             return clean_words(words, pattern)
         else:
-            print("[ERROR]: read_words() not a valid list of words")
-            print("======== read_words() needs a list of strings")
-            exit(1)
+            raise ValueError("read_words() needs a list of strings")
     else:
-        print("[ERROR]: read_words() was given an invalid input type")
-        exit(1)
+        raise TypeError("read_words() was given an invalid input type")
+
+
+# compressed wordlist files get streamed (see wlgen.open_corpus()), not loaded
+STREAM_EXTENSIONS = ('.gz', '.bz2', '.xz')
 
+# the amount of bytes of a stream read & cleaned at once
+STREAM_CHUNK_SIZE = 1 << 20
 
-def read_random_words(words, count=5, pattern='[^a-zA-Z]'):
+def is_stream(words):
+    """ Checks if words come as a stream to read through once rather than a
+        wordlist to load: '-' for stdin, a compressed file path or an opened
+        file
+
+    Args:
+        words (object): anything read_random_words() takes
+
+    Returns:
+        bool: True for streams of words, see stream_words()
+    """
+    if isinstance(words, str):
+        return words == '-' or path.splitext(words)[1] in STREAM_EXTENSIONS
+    return hasattr(words, 'read')
+
+def stream_words(words, pattern='[^a-zA-Z]'):
+    """ Lazily reads the clean, non-empty words of a stream, a chunk of
+        lines at a time, so memory doesn't grow with the stream
+
+    Args:
+        words (object): '-' for stdin, a path to a .gz, .bz2 or .xz wordlist
+            or an opened file (binary, or text with a .buffer like stdin)
+        pattern (str): a string representing a regex pattern of valid chars
+
+    Returns:
+        iterator of str: the words of the stream, in order
+    """
+    return chain.from_iterable(_stream_chunks(words, pattern))
+
+def _stream_chunks(words, pattern):
+    """ Yields the clean, non-empty words of every chunk of a stream
+    """
+    import wlclean
+    if isinstance(words, str):
+        import wlgen
+        file = wlgen.open_corpus(words)
+    else:
+        file = getattr(words, 'buffer', words)
+    try:
+        for chunk in wlclean.iter_line_chunks(file,
+                chunk_size=STREAM_CHUNK_SIZE):
+            with instrument.stage('wl.clean'):
+                yield list(filter(None, wlclean.clean_chunk(chunk, pattern)))
+    finally:
+        if isinstance(words, str) and file is not sys.stdin.buffer:
+            file.close()
+
+def read_random_words(words, count=5, pattern='[^a-zA-Z]', randbytes=None,
+        unique=False, weights=None, seen=None):
     """ From a valid collection (read Args: section) returns a list of
     'count' number of random & cleaned (with pattern) words
 
     Args:
         words (object): words can be any of the valid data types from
-            read_words() function
+            read_words() function, or a stream (see is_stream()) that gets
+            sampled in one pass, holding only the picked words in memory
         count (int): the number of random words to pick from 'words' and clean
         pattern (str): a string representing a regex pattern of valid chars
+        randbytes (callable): an optional source of random bytes, ie.
+            entropy.shared_pool().randbytes or a drbg.CounterDRBG for
+            reproducible picks [default = os.urandom]
+        unique (bool): picks 'count' distinct words, see sampling.py
+        weights (object): picks words by weight instead of uniformly, a
+            sampling.AliasTable (ie. sampling.load_alias_table()) or a
+            weight per word
+        seen (bloom.BloomFilter): redraws the whole pick while the filter
+            has seen it (as its words joined by spaces), then adds it
 
     Returns:
         [str]: a list of strings of cleaned, randomly selected words
     """
     # TODO: check arguments for type
+    if is_stream(words):
+        import sampling
+        if weights is not None:
+            raise ValueError("weighted picks need a wordlist file, streams " +
+                    "hold no weights")
+        if seen is not None:
+            raise ValueError("streams can't be read again to redraw a pick " +
+                    "the Bloom filter has seen")
+        return sampling.reservoir_sample(stream_words(words, pattern), count,
+                unique, randbytes or os.urandom)
     # get words, using read_words()
     # TODO: cleanup
     words = read_words(words, pattern=pattern)
-    rand = rng.RandomNumbers(count=count, max=(len(words)-1))
-    rand_words = [words[x] for x in rand.numbers]
-    return rand_words
+    if unique or weights is not None:
+        import sampling
+        table = None if weights is None else sampling.alias_table(weights)
+        def pick():
+            return [words[x] for x in sampling.draw_indices(len(words), count,
+                unique=unique, table=table, randbytes=randbytes or os.urandom)]
+    else:
+        def pick():
+            rand = rng.RandomNumbers(count=count, max=(len(words)-1),
+                    randbytes=randbytes)
+            return [words[x] for x in rand.numbers]
+    if seen is None:
+        return pick()
+    return next(seen.unique([pick()], lambda n: [pick() for null in range(n)],
+        key=' '.join))
     #return [read_words(words, pattern=pattern)[x] for 
     #        x in rng.RandomNumbers(count=count, max=(len(words) - 1)).numbers]
 
 
-def search_word(pattern, words, case_sensitive=False):
-    """ Searches for a string pattern within a list of strings and returns its index
+def generate_passphrases(words, batch, count=5, separator=' ',
+        pattern='[^a-zA-Z]', chunk_size=4096, jobs=1, randbytes=os.urandom,
+        seed=None, unique=False, weights=None, seen=None):
+    """ Generates 'batch' passphrases of 'count' random words each, loading
+    the wordlist once and drawing the word indices of a whole chunk of
+    passphrases from a single entropy buffer
 
     Args:
-        pattern (str): a string pattern for the substring to be searched after.
-        words ([str]): a list of words to search for 
-"""
+        words (object): words can be any of the valid data types from
+            read_words() function
+        batch (int): the number of passphrases to generate
+        count (int): the number of random words in every passphrase
+        separator (str): the string placed between words of a passphrase,
+            None yields each passphrase as its list of words instead
+        pattern (str): a string representing a regex pattern of valid chars
+        chunk_size (int): the number of passphrases drawn per entropy buffer
+        jobs (int): the number of worker processes splitting the work, see
+            parallel.parallel_passphrases(), 0 for every core [default = 1]
+        randbytes (callable): the source of random bytes, workers started
+            with jobs != 1 always draw from their own os.urandom
+        seed (int, str or bytes): makes the passphrases reproducible, drawn
+            in shards from the streams of a drbg.CounterDRBG of the seed
+            (see parallel.parallel_passphrases()), the same for any 'jobs'
+        unique (bool): keeps words from repeating within a passphrase
+        weights (object): picks words by weight, see read_random_words()
+        seen (bloom.BloomFilter): drops the passphrases it has seen before,
+            across runs, and adds the rest, regenerating every dropped one
+
+    Yields:
+        str: the next passphrase, or [str] when separator is None
+    """
+    table = None
+    if unique or weights is not None:
+        import sampling
+        if weights is not None:
+            # build the table once, not once per worker or chunk
+            table = sampling.alias_table(weights)
+    if seen is not None:
+        import bloom
+        passphrases = generate_passphrases(words, batch, count, None, pattern,
+                chunk_size, jobs, randbytes, seed, unique, table)
+        # one source for every top up, so seeded ones don't repeat each other
+        top_up = bloom.top_up_source(seed, randbytes) or os.urandom
+        fresh = seen.unique(passphrases, lambda n: generate_passphrases(words,
+            n, count, None, pattern, chunk_size, randbytes=top_up,
+            unique=unique, weights=table), key=' '.join)
+        if separator is None:
+            yield from fresh
+        else:
+            yield from map(separator.join, fresh)
+        return
+    if jobs != 1 or seed is not None:
+        import parallel
+        passphrases = parallel.parallel_passphrases(words, batch, count,
+                pattern=pattern, jobs=jobs, seed=seed, unique=unique,
+                weights=table)
+        if separator is None:
+            yield from passphrases
+        else:
+            yield from map(separator.join, passphrases)
+        return
+    words = read_words(words, pattern=pattern)
+    remaining = batch
+    while remaining > 0:
+        size = chunk_size if remaining > chunk_size else remaining
+        if table is None and not unique:
+            indices = entropy.randbelow_bulk(len(words), size * count,
+                    randbytes=randbytes)
+        else:
+            indices = sampling.draw_indices(len(words), count, size,
+                    unique=unique, table=table, randbytes=randbytes)
+        picked = list(map(words.__getitem__, indices))
+        if separator is None:
+            yield from (picked[i:i + count] for i in range(0, len(picked), count))
+        else:
+            yield from (separator.join(picked[i:i + count])
+                    for i in range(0, len(picked), count))
+        remaining -= size
+
+def write_passphrases(passphrases, file=sys.stdout, format='lines'):
+    """ Writes passphrases (lists of words) to a file, a chunk at a time
+
+    Args:
+        passphrases (iterable of [str]): as generate_passphrases() yields
+            with separator=None
+        file (file): a writable text file [default = stdout]
+        format (str): one of PASSPHRASE_FORMATS, or any other string to use
+            as the separator of a plain one passphrase per line output
+    """
+    if format == 'json':
+        import json
+        line = json.dumps
+    else:
+        separator = PASSPHRASE_FORMATS.get(format, format)
+        line = separator.join
+    chunk = []
+    for words in passphrases:
+        chunk.append(line(words))
+        if len(chunk) >= 4096:
+            chunk.append("")
+            file.write("\n".join(chunk))
+            chunk = []
+    if chunk:
+        chunk.append("")
+        file.write("\n".join(chunk))
+    file.flush()
+
+# built-in passphrase output formats and the separator between their words
+#   lines: one passphrase per line, words separated by spaces
+#   csv: one passphrase per line, words separated by commas
+#   json: one JSON array of words per line
+PASSPHRASE_FORMATS = {'lines': ' ', 'csv': ',', 'json': None}
+
+def search_word(pattern, words, case_sensitive=False, match='substring',
+        index_dir=None):
+    """ Searches a wordlist for words equal to, starting with or containing
+        a string pattern and returns their indices
+
+    Searches go through a wlsearch.WordSearch index. The index of a wordlist
+    file gets kept open for later calls, so only the first search of a file
+    pays for building it, and with an 'index_dir' saved there for later runs
+    (see wlsearch.open_search()).
+
+    Args:
+        pattern (str): a string pattern for the word, prefix or substring
+            to be searched after
+        words (object): a path to a wordlist file or compiled index, a list
+            of words, or an already built wlsearch.WordSearch
+        case_sensitive (bool): matches the case of pattern & words when set
+        match (str): one of wlsearch.MATCHES [default = substring]
+        index_dir (str): a cache directory to save & load the search
+            indices of wordlist files in [default = None (save nothing)]
+
+    Returns:
+        [int]: the ascending indices of the matching words
+    """
+    import wlsearch
+    if isinstance(words, wlsearch.WordSearch):
+        search = words
+    elif isinstance(words, str):
+        search = _open_search(words, case_sensitive, index_dir)
+    else:
+        search = wlsearch.WordSearch.build(words, case_sensitive)
+    return search.search(pattern, match)
+
+# (path, case_sensitive) -> (wordlist identity, open search index)
+_search_indices = {}
+_search_lock = threading.Lock()
+
+def _open_search(file_path, case_sensitive=False, index_dir=None):
+    """ Returns the open search index of a wordlist file for search_word(),
+        keyed on the file's identity like WordlistCache
+    """
+    import wlsearch
+    key = (path.abspath(file_path), case_sensitive)
+    identity = wlsearch.source_identity(file_path)
+    with _search_lock:
+        entry = _search_indices.get(key)
+        if entry is not None and entry[0] == identity:
+            return entry[1]
+        search = wlsearch.open_search(file_path,
+                lambda: read_words(file_path), case_sensitive, index_dir)
+        _search_indices[key] = (identity, search)
+        return search
+
+################################################################################
+## Module Classes
+################################################################################
+
+class WordlistCache(object):
+    """ A bounded, thread-safe LRU cache of cleaned wordlists for long running
+        callers that read the same wordlist files over and over
+
+    Entries are keyed on the file path, the cleaning pattern and the file's
+    identity (inode, size & modification time), so a file that changes on
+    disk gets reloaded on its next read and its stale entry dropped.
+
+    Attributes:
+        maxsize (int): the most wordlists held before evicting the least
+            recently used one
+        hits (int): the amount of reads served from the cache
+        misses (int): the amount of reads that had to load from disk
+    """
+    def __init__(self, maxsize=8):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        # (path, pattern) -> the key of its current entry, to drop stale ones
+        self._current = {}
+        self._lock = threading.Lock()
+
+    def get(self, file_path, pattern='[^a-zA-Z]'):
+        """ Returns the clean wordlist of a file, loading it only on a miss
+
+        Args:
+            file_path (str): a path to a wordlist file or compiled index
+            pattern (str): a string representing a regex pattern of valid chars
+
+        Returns:
+            [str]: a clean list of words, see load_wordlist()
+        """
+        real_path = path.realpath(file_path)
+        stat = os.stat(real_path)
+        name = (real_path, pattern)
+        key = name + (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            if key in self._entries:
+                self.hits += 1
+                if instrument.enabled:
+                    instrument.count('wl.cache.hits')
+                self._entries.move_to_end(key)
+                return self._entries[key]
+            self.misses += 1
+            if instrument.enabled:
+                instrument.count('wl.cache.misses')
+        words = load_wordlist(real_path, pattern)
+        with self._lock:
+            stale = self._current.get(name)
+            if stale is not None and stale != key:
+                self._entries.pop(stale, None)
+            self._current[name] = key
+            self._entries[key] = words
+            while len(self._entries) > self.maxsize:
+                evicted, null = self._entries.popitem(last=False)
+                if self._current.get(evicted[:2]) == evicted:
+                    del self._current[evicted[:2]]
+        return words
+
+    def clear(self):
+        """ Drops every cached wordlist & resets the hit/miss counters
+        """
+        with self._lock:
+            self._entries.clear()
+            self._current.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        """ Returns a dict of the hit & miss counters and the cache size
+        """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses,
+                    "size": len(self._entries), "maxsize": self.maxsize}
+
+# the cache read_words() serves wordlist files from
+wordlist_cache = WordlistCache()
+
+
 
 ################################################################################
 ## Main Execution
@@ -217,6 +621,10 @@ def search_word(pattern, words, case_sensitive=False):
 
 if __name__ == '__main__':
     # main execution
+    import atexit
+    import optparse
+    import sampling
+    import wlsearch
     
     # Parse arguments
     parser = optparse.OptionParser()
@@ -225,6 +633,46 @@ if __name__ == '__main__':
         "output": "specifies the path to the random generated words file " +
         "[default = ./random.txt]",
         "number": "specifies the number of words to string together [default = 5]",
+        "compile": "compiles the input wordlist into an index file at the " +
+        "given path for fast repeated reads, then exits",
+        "batch": "generates the given number of passphrases, each of " +
+        "--number words, and writes them to stdout one per line",
+        "format": "sets the batch output format, one of: " +
+        ", ".join(PASSPHRASE_FORMATS) + " [default = lines]",
+        "separator": "sets the string between words of a batch passphrase, " +
+        "overriding the separator of --format",
+        "jobs": "sets the number of worker processes generating a batch " +
+        "or compiling an index, " +
+        "0 for every core [default = 1]",
+        "profile": "times every stage & counts hot path events, writing " +
+        "a report to stderr in the given format: json or prometheus",
+        "search": "prints every word of the wordlist matching the given " +
+        "pattern, one per line, then exits",
+        "match": "sets how --search matches words, one of: " +
+        ", ".join(wlsearch.MATCHES) + " [default = substring]",
+        "case_sensitive": "makes --search match the case of words",
+        "search_index": "saves the --search index of the wordlist in the " +
+        "given cache directory, so later searches load it instead of " +
+        "rebuilding it [default = no saved index]",
+        "seed": "picks words with a deterministic generator of the given " +
+        "seed (see drbg.py), so runs can be replayed, with any --jobs",
+        "sampling": "sets how words get picked: uniform, unique (no word " +
+        "repeats within a passphrase) or weighted (by the weight column " +
+        "of the wordlist) [default = uniform]",
+        "weight_column": "sets the whitespace separated field of every " +
+        "wordlist line holding its weight [default = -1 (the last one)]",
+        "entropy": "writes the exact entropy in bits of every passphrase " +
+        "to stderr",
+        "template": "generates passphrases of a template instead of bare " +
+        "words, ie. '{Word}{Word}{digit:2}{symbol}', see template.py, " +
+        "one or --batch of them",
+        "bloom": "never outputs a passphrase twice across runs: keeps " +
+        "every passphrase issued in a persistent Bloom filter at the given " +
+        "path (see bloom.py) and regenerates the ones it has seen",
+        "bloom_capacity": "sets the amount of passphrases a new --bloom " +
+        "filter is sized for [default = 1000000]",
+        "bloom_error": "sets the false positive rate of a new --bloom " +
+        "filter at its capacity [default = 1e-06]",
         }
     
     parser.add_option('-i', '--input', '--file',
@@ -233,13 +681,143 @@ if __name__ == '__main__':
             dest='output', help=help_strings["output"], type="string", default="./random.txt")
     parser.add_option('-n', '--words', '--number', '--count',
             dest='number', help=help_strings["number"], type=int, default=5)
+    parser.add_option('--compile',
+            dest='compile', help=help_strings["compile"], type="string", default=None)
+    parser.add_option('-b', '--batch',
+            dest='batch', help=help_strings["batch"], type=int, default=None)
+    parser.add_option('--format',
+            dest='format', help=help_strings["format"], type="choice",
+            choices=list(PASSPHRASE_FORMATS), default="lines")
+    parser.add_option('--separator',
+            dest='separator', help=help_strings["separator"], type="string", default=None)
+    parser.add_option('-j', '--jobs',
+            dest='jobs', help=help_strings["jobs"], type=int, default=1)
+    parser.add_option('--profile',
+            dest='profile', help=help_strings["profile"], type="choice",
+            choices=list(instrument.FORMATS), default=None)
+    parser.add_option('-s', '--search',
+            dest='search', help=help_strings["search"], type="string", default=None)
+    parser.add_option('--match',
+            dest='match', help=help_strings["match"], type="choice",
+            choices=list(wlsearch.MATCHES), default="substring")
+    parser.add_option('--case-sensitive',
+            dest='case_sensitive', help=help_strings["case_sensitive"],
+            action="store_true", default=False)
+    parser.add_option('--search-index',
+            dest='search_index', help=help_strings["search_index"],
+            type="string", default=None)
+    parser.add_option('--seed',
+            dest='seed', help=help_strings["seed"], type="string", default=None)
+    parser.add_option('--sampling',
+            dest='sampling', help=help_strings["sampling"], type="choice",
+            choices=list(sampling.SAMPLING_MODES), default="uniform")
+    parser.add_option('--weight-column',
+            dest='weight_column', help=help_strings["weight_column"], type=int,
+            default=-1)
+    parser.add_option('--entropy',
+            dest='entropy', help=help_strings["entropy"], action="store_true",
+            default=False)
+    parser.add_option('-t', '--template',
+            dest='template', help=help_strings["template"], type="string",
+            default=None)
+    parser.add_option('--bloom',
+            dest='bloom', help=help_strings["bloom"], type="string", default=None)
+    parser.add_option('--bloom-capacity',
+            dest='bloom_capacity', help=help_strings["bloom_capacity"],
+            type=int, default=10**6)
+    parser.add_option('--bloom-error',
+            dest='bloom_error', help=help_strings["bloom_error"], type=float,
+            default=1e-6)
    
     (opts, args) = parser.parse_args()
 
+    if opts.profile:
+        instrument.enable()
+        atexit.register(instrument.dump, None, opts.profile)
+
     words_path = opts.input
     out_file = opts.output
     num_words = opts.number
 
+    streaming = is_stream(words_path)
+    if streaming:
+        if opts.compile or opts.search is not None or opts.template is not None \
+                or opts.sampling == 'weighted' or opts.entropy:
+            print("[ERROR]: Streamed wordlists (- or .gz, .bz2 & .xz files) " +
+                    "can only have words picked uniformly or uniquely")
+            exit(1)
+        if opts.sampling == 'unique' and opts.batch is not None:
+            print("[ERROR]: Streamed wordlists can't make a --batch of " +
+                    "unique passphrases")
+            exit(1)
+        if opts.bloom is not None:
+            print("[ERROR]: Streamed wordlists can't be read again to " +
+                    "regenerate what the --bloom filter has seen")
+            exit(1)
+        if words_path != '-':
+            get_file(words_path).close()
+
+    seen = None
+    if opts.bloom is not None and not (opts.compile or opts.search is not None):
+        import bloom
+        try:
+            seen = bloom.open_filter(opts.bloom, opts.bloom_capacity,
+                    opts.bloom_error)
+        except (OSError, ValueError) as err:
+            print("[ERROR]: {}".format(err))
+            exit(1)
+        # runs last to first, so the stats come before the close
+        atexit.register(seen.close)
+        atexit.register(seen.print_stats)
+
+    if opts.compile:
+        count = compile_wordlist(get_file(words_path).name, opts.compile,
+                jobs=opts.jobs)
+        print("Compiled {} words into {}".format(count, opts.compile))
+        exit(0)
+
+    if opts.search is not None:
+        words = read_words(get_file(words_path).name)
+        for i in search_word(opts.search, words_path, opts.case_sensitive,
+                opts.match, opts.search_index):
+            print(words[i])
+        exit(0)
+
+    if opts.template is not None:
+        import template
+        if opts.sampling != 'uniform':
+            print("[ERROR]: Templates only support uniform sampling")
+            exit(1)
+        try:
+            parts = template.parse_template(opts.template)
+            words = None
+            if any(value in template.WORD_CASES for kind, value in parts):
+                words = read_words(get_file(words_path).name)
+            plan = template.Template(opts.template, words)
+        except ValueError as err:
+            print("[ERROR]: {}".format(err))
+            exit(1)
+        if opts.entropy:
+            sys.stderr.write("{:.2f} bits of entropy per passphrase ({})\n"
+                    .format(plan.bits, opts.template))
+        randbytes = os.urandom
+        if opts.seed is not None:
+            import drbg
+            randbytes = drbg.CounterDRBG(opts.seed)
+        lines = plan.generate(1 if opts.batch is None else opts.batch, randbytes)
+        if seen is not None:
+            lines = seen.unique(lines, lambda n: plan.generate(n, randbytes))
+        try:
+            sys.stdout.writelines(line + "\n" for line in lines)
+            sys.stdout.flush()
+        except ValueError as err:
+            print("[ERROR]: {}".format(err))
+            exit(1)
+        except BrokenPipeError:
+            # the reading end closed early, silence the exit flush
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        exit(0)
+
     # check to make sure a valid number of words has been given
     if num_words < 1:
         print()
@@ -248,6 +826,70 @@ if __name__ == '__main__':
         print()
         exit(1)
 
+    unique = opts.sampling == 'unique'
+    if streaming:
+        # one pass over the stream picks the words of every passphrase
+        randbytes = None
+        if opts.seed is not None:
+            import drbg
+            randbytes = drbg.CounterDRBG(opts.seed)
+        batch = 1 if opts.batch is None else opts.batch
+        try:
+            picked = read_random_words(words_path, count=num_words * batch,
+                    unique=unique, randbytes=randbytes)
+        except ValueError as err:
+            print("[ERROR]: {}".format(err))
+            exit(1)
+        try:
+            if opts.batch is None:
+                for word in picked:
+                    print(word)
+            else:
+                write_passphrases((picked[i:i + num_words] for i in
+                    range(0, len(picked), num_words)), format=opts.format
+                    if opts.separator is None else opts.separator)
+        except BrokenPipeError:
+            # the reading end closed early, silence the exit flush
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        exit(0)
+    table = None
+    if opts.sampling == 'weighted':
+        if wlindex.is_index(words_path):
+            print("[ERROR]: Weighted sampling needs the plain wordlist file, " +
+                    "compiled indices hold no weights")
+            exit(1)
+        try:
+            table = sampling.load_alias_table(words_path, opts.weight_column)
+        except ValueError as err:
+            print("[ERROR]: {}".format(err))
+            exit(1)
+    if unique or opts.entropy:
+        # loaded wordlists hold distinct words, so this is the distinct count
+        size = len(read_words(get_file(words_path).name))
+    if unique and num_words > size:
+        print("[ERROR]: Can't pick {} distinct words out of {}".format(
+            num_words, size))
+        exit(1)
+    if opts.entropy:
+        sys.stderr.write("{:.2f} bits of entropy per passphrase ({} sampling)\n"
+                .format(sampling.entropy_bits(size, num_words, unique, table),
+                    opts.sampling))
+
+    if opts.batch is not None:
+        passphrases = generate_passphrases(get_file(words_path).name,
+                opts.batch, count=num_words, separator=None, jobs=opts.jobs,
+                seed=opts.seed, unique=unique, weights=table, seen=seen)
+        format = opts.format if opts.separator is None else opts.separator
+        try:
+            write_passphrases(passphrases, format=format)
+        except ValueError as err:
+            print("[ERROR]: {}".format(err))
+            exit(1)
+        except BrokenPipeError:
+            # the reading end closed early, silence the exit flush
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        exit(0)
+
     # check to see if the output path already has a file
     # prompt the user to see if they want it replaced
     if path.isfile(out_file):
@@ -278,5 +920,15 @@ if __name__ == '__main__':
 
     # read in the wordlist
     # TODO: better formatting with options
-    for word in read_random_words(words_path, count=num_words):
+    randbytes = None
+    if opts.seed is not None:
+        import drbg
+        randbytes = drbg.CounterDRBG(opts.seed)
+    try:
+        picked = read_random_words(words_path, count=num_words,
+                randbytes=randbytes, unique=unique, weights=table, seen=seen)
+    except ValueError as err:
+        print("[ERROR]: {}".format(err))
+        exit(1)
+    for word in picked:
         print(word)
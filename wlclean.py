@@ -0,0 +1,366 @@
+#!/usr/bin/env python
+""" Streaming, high throughput cleaning of large wordlists
+
+    Wordlists get read in large binary chunks split on line boundaries, so
+    memory use doesn't depend on the size of the list. When the cleaning
+    pattern is a simple character class (like the default '[^a-zA-Z]'),
+    whole chunks get cleaned with a single bytes.translate() deletion table,
+    otherwise every line goes through the same precompiled regex as
+    wl.clean_words(). Words can then be lowercased, deduplicated and
+    filtered by length, and written to a clean wordlist file or straight into
+    a compiled index (see wlindex). Large inputs can fan out across worker
+    processes, each cleaning its own newline aligned byte range of the file.
+
+    Usage:
+        python wlclean.py rockyou.txt -o clean.txt --lower --dedupe
+        python wlclean.py rockyou.txt --index rockyou.wlx --min-len 4 -j 0
+"""
+
+################################################################################
+## Imports
+################################################################################
+
+from functools import lru_cache
+import os
+import re
+import sys
+from sys import exit
+from time import perf_counter
+import instrument
+
+
+
+################################################################################
+## Module Constants
+################################################################################
+
+DEFAULT_PATTERN = '[^a-zA-Z]'
+
+# the amount of bytes read per chunk
+CHUNK_SIZE = 1 << 22
+
+# the amount of bytes of the input every worker task cleans
+SHARD_SIZE = 1 << 25
+
+# the longest line kept, longer ones (ie. binary data, or an input without
+# newlines) get dropped so they can't grow without bound waiting for the
+# newline ending them
+MAX_LINE = 1 << 16
+
+# characters beyond ASCII a pattern has to treat alike for the fast path
+_NON_ASCII_SAMPLES = '\x80\xa0\xe9\xffĀ€中\U0001f600'
+
+
+
+################################################################################
+## Module Functions
+################################################################################
+
+@lru_cache(maxsize=64)
+def compile_pattern(pattern):
+    """ Compiles a cleaning pattern once, for every later call to reuse
+    """
+    return re.compile(pattern)
+
+@lru_cache(maxsize=64)
+def delete_table(pattern):
+    """ Works out the bytes a simple character class pattern deletes
+
+    Args:
+        pattern (str): a regex pattern of chars to remove, ie. '[^a-zA-Z]'
+
+    Returns:
+        bytes: every byte value the pattern removes from UTF-8 text, or None
+            if the pattern isn't a single character class, or treats some
+            non-ASCII characters differently from others
+    """
+    if not re.fullmatch(r'\[\^?(?:\\.|[^\]\\])+\]', pattern):
+        return None
+    regex = compile_pattern(pattern)
+    non_ascii = {bool(regex.fullmatch(c)) for c in _NON_ASCII_SAMPLES}
+    if len(non_ascii) != 1:
+        return None
+    deleted = bytes(b for b in range(128) if b != 10 and regex.fullmatch(chr(b)))
+    if non_ascii.pop():
+        # every byte of a multi-byte UTF-8 character is at least 0x80
+        deleted += bytes(range(128, 256))
+    return deleted
+
+def clean_chunk(chunk, pattern=DEFAULT_PATTERN, lower=False):
+    """ Cleans a chunk of newline delimited words in as few passes as it can
+
+    Args:
+        chunk (bytes): UTF-8 encoded lines, ending on a line boundary
+        pattern (str): a regex pattern of chars to remove from every word
+        lower (bool): lowercases every word
+
+    Returns:
+        [str]: the cleaned words, one per line of the chunk (maybe empty)
+    """
+    table = delete_table(pattern)
+    if table is not None:
+        if lower:
+            # lowercase before deleting, like the regex path, so a pattern
+            # like '[^a-z]' keeps the lowered capitals
+            chunk = chunk.lower()
+        text = chunk.translate(None, table).decode('utf-8', 'replace')
+        if lower:
+            text = text.lower()
+        words = text.split('\n')
+    else:
+        regex = compile_pattern(pattern)
+        text = chunk.decode('utf-8', 'replace')
+        if lower:
+            text = text.lower()
+        words = [regex.sub('', line) for line in text.split('\n')]
+    if chunk.endswith(b'\n'):
+        # the split leaves an empty string after the final newline
+        words.pop()
+    return words
+
+def filter_words(words, min_len=1, max_len=None, seen=None):
+    """ Drops words outside a length range, and already seen words
+
+    Args:
+        words ([str]): cleaned words
+        min_len (int): the shortest word kept, 1 drops only empty words
+        max_len (int): the longest word kept [default = no limit]
+        seen (set): words seen before, updated in place to dedupe words
+
+    Returns:
+        [str]: the words kept, in their original order
+    """
+    if max_len is not None or min_len > 1:
+        high = max_len if max_len is not None else float('inf')
+        words = [w for w in words if min_len <= len(w) <= high]
+    else:
+        words = list(filter(None, words))
+    if seen is not None:
+        add = seen.add
+        words = [w for w in words if not (w in seen or add(w))]
+    return words
+
+def read_line_chunks(file_path, start=0, end=None, chunk_size=CHUNK_SIZE):
+    """ Yields the bytes of a file range in chunks ending on line boundaries
+
+    Args:
+        file_path (str): the path of the file to read
+        start (int): the offset to start reading at, must be a line start
+        end (int): the offset to stop at, must be a line start [default = EOF]
+        chunk_size (int): the amount of bytes read at once
+    """
+    with open(file_path, 'rb') as file:
+        file.seek(start)
+        yield from iter_line_chunks(file, None if end is None else end - start,
+                chunk_size)
+
+def iter_line_chunks(file, size=None, chunk_size=CHUNK_SIZE,
+        max_line=MAX_LINE):
+    """ Yields the bytes of an open binary file in chunks ending on line
+    boundaries, ie. of stdin or a decompressing stream
+
+    Args:
+        file (file): a file opened for binary reading
+        size (int): the amount of bytes to read [default = up to EOF]
+        chunk_size (int): the amount of bytes read at once
+        max_line (int): the longest line kept, longer ones get dropped up to
+            the newline ending them, which bounds the bytes held back
+            between chunks
+    """
+    remaining = size
+    carry = b''
+    skipping = False
+    while remaining is None or remaining > 0:
+        read = chunk_size if remaining is None else min(chunk_size, remaining)
+        with instrument.stage('wl.read'):
+            data = file.read(read)
+        if not data:
+            break
+        if remaining is not None:
+            remaining -= len(data)
+        if skipping:
+            # the rest of a dropped line, up to the next newline
+            end = data.find(b'\n')
+            if end < 0:
+                continue
+            data = data[end + 1:]
+            skipping = False
+        data = carry + data
+        cut = data.rfind(b'\n') + 1
+        carry = data[cut:]
+        if len(carry) > max_line:
+            carry = b''
+            skipping = True
+        if cut:
+            yield data[:cut]
+    if carry:
+        yield carry
+
+def line_ranges(file_path, shard_size=SHARD_SIZE):
+    """ Splits a file into byte ranges of about 'shard_size', each starting
+    right after a newline so no line is split between two ranges
+
+    Returns:
+        [(int, int)]: the (start, end) offset of every range
+    """
+    size = os.path.getsize(file_path)
+    ranges = []
+    start = 0
+    with open(file_path, 'rb') as file:
+        while start < size:
+            end = start + shard_size
+            if end >= size:
+                end = size
+            else:
+                file.seek(end)
+                file.readline()
+                end = min(file.tell(), size)
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+def clean_range(file_path, start, end, pattern=DEFAULT_PATTERN, lower=False,
+        min_len=1, max_len=None):
+    """ Cleans and length filters every word in a byte range of a file
+
+    Returns:
+        [str]: the words kept, in file order
+    """
+    words = []
+    for chunk in read_line_chunks(file_path, start, end):
+        with instrument.stage('wl.clean'):
+            cleaned = clean_chunk(chunk, pattern, lower)
+            words.extend(filter_words(cleaned, min_len, max_len))
+        if instrument.enabled:
+            instrument.count('wl.words_cleaned', len(cleaned))
+    return words
+
+def iter_clean_words(file_path, pattern=DEFAULT_PATTERN, lower=False,
+        dedupe=False, min_len=1, max_len=None, jobs=1):
+    """ Streams the clean words of a wordlist file, chunk by chunk
+
+    Args:
+        file_path (str): the path of the wordlist to clean
+        pattern (str): a regex pattern of chars to remove from every word
+        lower (bool): lowercases every word
+        dedupe (bool): drops every repeat of a word, keeping the first
+        min_len (int): the shortest word kept, 1 drops only empty words
+        max_len (int): the longest word kept [default = no limit]
+        jobs (int): the number of worker processes cleaning byte ranges of
+            the file in parallel, 0 for every core [default = 1]
+
+    Yields:
+        [str]: the next chunk of clean words, in file order
+    """
+    seen = set() if dedupe else None
+    if jobs == 1:
+        for chunk in read_line_chunks(file_path):
+            with instrument.stage('wl.clean'):
+                cleaned = clean_chunk(chunk, pattern, lower)
+                words = filter_words(cleaned, min_len, max_len, seen)
+            if instrument.enabled:
+                instrument.count('wl.words_cleaned', len(cleaned))
+            yield words
+        return
+    import parallel
+    shards = ((file_path, start, end, pattern, lower, min_len, max_len)
+            for start, end in line_ranges(file_path))
+    for words in parallel._run_ordered(clean_range, shards, jobs):
+        if seen is not None:
+            words = filter_words(words, seen=seen)
+        yield words
+
+def clean_file(src, dst=None, index=None, **options):
+    """ Cleans a wordlist file into a clean wordlist file and/or an index
+
+    Args:
+        src (str): the path of the wordlist to clean
+        dst (str): the path of a clean wordlist (one word per line) to write
+        index (str): the path of a compiled index (see wlindex) to write
+        options: passed on to iter_clean_words()
+
+    Returns:
+        dict: the amount of 'words' written, input 'bytes', 'seconds' & 'mb_s'
+    """
+    start = perf_counter()
+    chunks = iter_clean_words(src, **options)
+    out = open(dst, 'w', encoding='utf-8') if dst else None
+    written = [0]
+
+    def words():
+        for chunk in chunks:
+            written[0] += len(chunk)
+            if out:
+                if chunk:
+                    out.write('\n'.join(chunk))
+                    out.write('\n')
+            yield from chunk
+    try:
+        if index:
+            import wlindex
+            wlindex.write_index(words(), index)
+        else:
+            for null in words():
+                pass
+    finally:
+        if out:
+            out.close()
+    seconds = perf_counter() - start
+    size = os.path.getsize(src)
+    return {"words": written[0], "bytes": size, "seconds": seconds,
+            "mb_s": size / seconds / 1e6 if seconds else float('inf')}
+
+
+
+################################################################################
+## Main Execution
+################################################################################
+
+if __name__ == '__main__':
+    import optparse
+    parser = optparse.OptionParser(usage="%prog [options] WORDLIST")
+    help_strings = {
+        "output": "writes the clean words to the given path, one per line",
+        "index": "compiles the clean words into an index at the given path",
+        "pattern": "sets the regex pattern of characters to remove " +
+        "[default = [^a-zA-Z]]",
+        "lower": "lowercases every word",
+        "dedupe": "drops repeated words, keeping the first",
+        "min_len": "sets the shortest word kept [default = 1]",
+        "max_len": "sets the longest word kept [default = no limit]",
+        "jobs": "sets the number of worker processes, 0 for every core " +
+        "[default = 1]",
+        }
+
+    parser.add_option('-o', '--output',
+            dest='output', help=help_strings["output"], type="string", default=None)
+    parser.add_option('--index',
+            dest='index', help=help_strings["index"], type="string", default=None)
+    parser.add_option('-p', '--pattern',
+            dest='pattern', help=help_strings["pattern"], type="string",
+            default=DEFAULT_PATTERN)
+    parser.add_option('-l', '--lower',
+            dest='lower', help=help_strings["lower"], action="store_true", default=False)
+    parser.add_option('-d', '--dedupe',
+            dest='dedupe', help=help_strings["dedupe"], action="store_true", default=False)
+    parser.add_option('--min-len',
+            dest='min_len', help=help_strings["min_len"], type=int, default=1)
+    parser.add_option('--max-len',
+            dest='max_len', help=help_strings["max_len"], type=int, default=None)
+    parser.add_option('-j', '--jobs',
+            dest='jobs', help=help_strings["jobs"], type=int, default=1)
+
+    (opts, args) = parser.parse_args()
+
+    if len(args) != 1 or not os.path.isfile(args[0]):
+        print("[ERROR]: Give the path of one wordlist file to clean")
+        exit(1)
+    if not opts.output and not opts.index:
+        print("[ERROR]: Give an --output path, an --index path or both")
+        exit(1)
+
+    report = clean_file(args[0], opts.output, opts.index, pattern=opts.pattern,
+            lower=opts.lower, dedupe=opts.dedupe, min_len=opts.min_len,
+            max_len=opts.max_len, jobs=opts.jobs)
+    sys.stderr.write("{:,} words from {:,} bytes in {:.3f}s ({:.2f} MB/s)\n".format(
+        report["words"], report["bytes"], report["seconds"], report["mb_s"]))
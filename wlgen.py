@@ -0,0 +1,354 @@
+#!/usr/bin/env python
+""" Generates diceware style wordlists out of large text corpora
+
+    Corpora are streamed in chunks, every token gets cleaned with the same
+    patterns as wl.clean_words() and the most frequent words are counted
+    approximately in a space-saving summary of a fixed capacity, so memory
+    stays bounded however large the corpora are. The top N words that pass
+    the length filters make up the list, ie. 7776 (6^5) or 46656 (6^6)
+    words for lists picked from with five or six dice.
+
+    Usage:
+        python wlgen.py corpus.txt -n 7776 -o wordlist.txt
+        bzcat dump.xml.bz2 | python wlgen.py - -n 46656 --dice -o words.txt
+"""
+
+################################################################################
+## Imports
+################################################################################
+
+import bz2
+from collections import Counter
+from functools import lru_cache
+import gzip
+import lzma
+import optparse
+import os
+import sys
+from sys import exit
+from time import perf_counter
+import wlclean
+
+
+
+################################################################################
+## Module Constants
+################################################################################
+
+DIMENSIONS = (7776, 46656)
+
+# the amount of bytes read per chunk
+CHUNK_SIZE = 1 << 20
+
+# the space-saving summary keeps this many candidates per wanted word
+CAPACITY_FACTOR = 8
+
+# the longest run of bytes without whitespace kept as a token, longer ones
+# (ie. base64 blobs, or corpora without whitespace) get dropped so they
+# can't grow without bound waiting for the whitespace ending them
+MAX_TOKEN = 1 << 16
+
+_WHITESPACE = b' \t\n\r\x0b\x0c'
+
+# openers of compressed corpora, by file extension
+_OPENERS = {'.gz': gzip.open, '.bz2': bz2.open, '.xz': lzma.open}
+
+
+
+################################################################################
+## Module Functions
+################################################################################
+
+def open_corpus(file_path):
+    """ Opens a corpus for binary reading, '-' being stdin, decompressing
+    .gz, .bz2 & .xz files on the fly
+    """
+    if file_path == '-':
+        return sys.stdin.buffer
+    opener = _OPENERS.get(os.path.splitext(file_path)[1], open)
+    return opener(file_path, 'rb')
+
+def read_chunks(file, chunk_size=CHUNK_SIZE, max_token=MAX_TOKEN):
+    """ Yields the bytes of a binary file in chunks ending on whitespace, so
+    no token gets split between two chunks
+
+    Args:
+        file (file): a file opened for binary reading
+        chunk_size (int): the amount of bytes read at once
+        max_token (int): the longest token kept, longer ones get dropped up
+            to the whitespace ending them, which bounds the bytes held back
+            between chunks
+    """
+    carry = b''
+    skipping = False
+    while True:
+        data = file.read(chunk_size)
+        if not data:
+            break
+        if skipping:
+            # the rest of a dropped token, up to the next whitespace
+            ends = [i for i in map(data.find, _WHITESPACE) if i >= 0]
+            if not ends:
+                continue
+            data = data[min(ends):]
+            skipping = False
+        data = carry + data
+        cut = max(map(data.rfind, _WHITESPACE)) + 1
+        carry = data[cut:]
+        if len(carry) > max_token:
+            carry = b''
+            skipping = True
+        if cut:
+            yield data[:cut]
+    if carry:
+        yield carry
+
+@lru_cache(maxsize=64)
+def _token_table(pattern):
+    """ The wlclean.delete_table() of a pattern, minus whitespace
+    """
+    table = wlclean.delete_table(pattern)
+    if table is None:
+        return None
+    return bytes(b for b in table if b not in _WHITESPACE)
+
+def tokenize(chunk, pattern=wlclean.DEFAULT_PATTERN, lower=True):
+    """ Splits a chunk of text on whitespace into clean words
+
+    Args:
+        chunk (bytes): UTF-8 encoded text
+        pattern (str): a regex pattern of chars to remove from every token
+        lower (bool): lowercases every token
+
+    Returns:
+        [str]: the clean, non-empty tokens of the chunk
+    """
+    table = _token_table(pattern)
+    if table is not None:
+        text = chunk.translate(None, table).decode('utf-8', 'replace')
+        return (text.lower() if lower else text).split()
+    text = chunk.decode('utf-8', 'replace')
+    regex = wlclean.compile_pattern(pattern)
+    tokens = (regex.sub('', token) for token in
+            (text.lower() if lower else text).split())
+    return [token for token in tokens if token]
+
+def is_dice_count(count):
+    """ Checks if a wordlist of 'count' words maps to rolls of six sided dice
+    """
+    while count > 1 and count % 6 == 0:
+        count //= 6
+    return count == 1
+
+def dice_label(i, count):
+    """ Returns the dice roll picking word 'i' of a list of 'count' words,
+    ie. '11111' for the first word of 7776
+    """
+    digits = []
+    while count > 1:
+        i, roll = divmod(i, 6)
+        digits.append(str(roll + 1))
+        count //= 6
+    return ''.join(reversed(digits))
+
+def generate_wordlist(corpora, count=7776, pattern=wlclean.DEFAULT_PATTERN,
+        lower=True, min_len=3, max_len=9, capacity=None):
+    """ Picks the 'count' most frequent words of one or more corpora
+
+    Args:
+        corpora ([str]): paths of the corpora to read, '-' for stdin
+        count (int): the amount of words wanted
+        pattern (str): a regex pattern of chars to remove from every token
+        lower (bool): lowercases every token
+        min_len (int): the shortest word kept
+        max_len (int): the longest word kept [None = no limit]
+        capacity (int): the amount of candidates counted at once
+            [default = CAPACITY_FACTOR * count]
+
+    Returns:
+        ([str], dict): the words, most frequent first, and a report of the
+            'words' picked, 'tokens' & 'bytes' read, 'seconds' & 'mb_s'
+    """
+    start = perf_counter()
+    summary = SpaceSaving(capacity or CAPACITY_FACTOR * count)
+    high = max_len if max_len is not None else float('inf')
+    size = 0
+    tokens = 0
+    for corpus in corpora:
+        file = open_corpus(corpus)
+        try:
+            for chunk in read_chunks(file):
+                size += len(chunk)
+                words = tokenize(chunk, pattern, lower)
+                tokens += len(words)
+                counts = Counter(words)
+                if min_len > 1 or max_len is not None:
+                    counts = {w: n for w, n in counts.items()
+                            if min_len <= len(w) <= high}
+                summary.update(counts)
+        finally:
+            if file is not sys.stdin.buffer:
+                file.close()
+    words = [word for word, n in summary.top(count)]
+    seconds = perf_counter() - start
+    return words, {"words": len(words), "tokens": tokens, "bytes": size,
+            "seconds": seconds,
+            "mb_s": size / seconds / 1e6 if seconds else float('inf')}
+
+def write_wordlist(words, file, dice=False):
+    """ Writes a wordlist one word per line, after its dice roll if 'dice'
+    """
+    if dice:
+        lines = ("{}\t{}".format(dice_label(i, len(words)), word)
+                for i, word in enumerate(words))
+    else:
+        lines = words
+    for line in lines:
+        file.write(line + "\n")
+
+
+
+################################################################################
+## Module Classes
+################################################################################
+
+class SpaceSaving(object):
+    """ An approximate, bounded memory counter of the most frequent words
+
+    A space-saving summary (Metwally et al.) merged one chunk of counts at a
+    time: words already tracked add their count, new words enter with the
+    largest count evicted so far added on top (their 'error'), and
+    once more than 'capacity' words are tracked only the largest stay. Any
+    word more frequent than the total count / capacity is guaranteed to be
+    tracked, and every estimate overcounts by at most its error.
+
+    Attributes:
+        capacity (int): the most words tracked after an update
+        counts (dict): word -> estimated count, an upper bound
+        errors (dict): word -> the most its count can be overestimated by
+        floor (int): the count new words enter with on top of their own
+    """
+    def __init__(self, capacity):
+        if capacity < 1:
+            raise ValueError("a SpaceSaving summary needs a capacity of at least 1")
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+        self.floor = 0
+
+    def update(self, counts):
+        """ Adds a mapping of word -> count to the summary
+        """
+        table = self.counts
+        floor = self.floor
+        for word, n in counts.items():
+            if word in table:
+                table[word] += n
+            else:
+                table[word] = n + floor
+                if floor:
+                    self.errors[word] = floor
+        if len(table) > self.capacity:
+            self._evict()
+
+    def _evict(self):
+        """ Drops every word but the 'capacity' largest counts
+        """
+        cut = sorted(self.counts.values(), reverse=True)[self.capacity]
+        # ties with the cut go too, so the summary may end up a little smaller
+        self.counts = {w: n for w, n in self.counts.items() if n > cut}
+        self.errors = {w: e for w, e in self.errors.items() if w in self.counts}
+        self.floor = max(self.floor, cut)
+
+    def top(self, n):
+        """ Returns the 'n' words with the largest counts as (word, count)
+        pairs, largest first & ties broken alphabetically
+        """
+        ranked = sorted(self.counts.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[:n]
+
+    def __len__(self):
+        return len(self.counts)
+
+
+
+################################################################################
+## Main Execution
+################################################################################
+
+if __name__ == '__main__':
+    parser = optparse.OptionParser(usage="%prog [options] CORPUS [CORPUS...]")
+    help_strings = {
+        "count": "sets the amount of words in the list, ie. " +
+        " or ".join(map(str, DIMENSIONS)) + " [default = 7776]",
+        "output": "writes the wordlist to the given path [default = stdout]",
+        "index": "compiles the wordlist into an index at the given path",
+        "pattern": "sets the regex pattern of characters to remove " +
+        "[default = [^a-zA-Z]]",
+        "keep_case": "keeps the case of words instead of lowercasing them",
+        "min_len": "sets the shortest word kept [default = 3]",
+        "max_len": "sets the longest word kept, 0 for no limit [default = 9]",
+        "capacity": "sets the amount of candidate words counted at once " +
+        "[default = {} * --count]".format(CAPACITY_FACTOR),
+        "dice": "prefixes every word with the dice roll picking it, " +
+        "for counts that are a power of 6",
+        }
+
+    parser.add_option('-n', '--count',
+            dest='count', help=help_strings["count"], type=int, default=7776)
+    parser.add_option('-o', '--output',
+            dest='output', help=help_strings["output"], type="string", default=None)
+    parser.add_option('--index',
+            dest='index', help=help_strings["index"], type="string", default=None)
+    parser.add_option('-p', '--pattern',
+            dest='pattern', help=help_strings["pattern"], type="string",
+            default=wlclean.DEFAULT_PATTERN)
+    parser.add_option('--keep-case',
+            dest='keep_case', help=help_strings["keep_case"], action="store_true",
+            default=False)
+    parser.add_option('--min-len',
+            dest='min_len', help=help_strings["min_len"], type=int, default=3)
+    parser.add_option('--max-len',
+            dest='max_len', help=help_strings["max_len"], type=int, default=9)
+    parser.add_option('--capacity',
+            dest='capacity', help=help_strings["capacity"], type=int, default=None)
+    parser.add_option('--dice',
+            dest='dice', help=help_strings["dice"], action="store_true", default=False)
+
+    (opts, args) = parser.parse_args()
+
+    if not args:
+        print("[ERROR]: Give the path of at least one corpus, or - for stdin")
+        exit(1)
+    missing = [corpus for corpus in args if corpus != '-' and not os.path.isfile(corpus)]
+    if missing:
+        print("[ERROR]: The corpus path {} doesn't lead to a file".format(missing[0]))
+        exit(1)
+    if opts.count < 1:
+        print("[ERROR]: Can't generate a wordlist of less than one word")
+        exit(1)
+    if opts.dice and not is_dice_count(opts.count):
+        print("[ERROR]: --dice needs a count that is a power of 6, ie. " +
+                " or ".join(map(str, DIMENSIONS)))
+        exit(1)
+
+    words, report = generate_wordlist(args, opts.count, opts.pattern,
+            lower=not opts.keep_case, min_len=opts.min_len,
+            max_len=opts.max_len or None, capacity=opts.capacity)
+    if len(words) < opts.count:
+        sys.stderr.write("[WARNING]: only {} distinct words found, wanted {}\n".format(
+            len(words), opts.count))
+        if opts.dice:
+            print("[ERROR]: --dice needs the full count of words")
+            exit(1)
+    if opts.index:
+        import wlindex
+        wlindex.write_index(words, opts.index)
+    if opts.output or not opts.index:
+        out = open(opts.output, 'w', encoding='utf-8') if opts.output else sys.stdout
+        write_wordlist(words, out, opts.dice)
+        if out is not sys.stdout:
+            out.close()
+    sys.stderr.write("{:,} words from {:,} tokens, {:,} bytes in {:.3f}s ({:.2f} MB/s)\n"
+            .format(report["words"], report["tokens"], report["bytes"],
+                report["seconds"], report["mb_s"]))
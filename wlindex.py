@@ -0,0 +1,178 @@
+#!/usr/bin/env python
+""" Compiled wordlist index files, memory-mapped for O(1) word lookups.
+
+    A wordlist gets compiled once (see wl.compile_wordlist()) into a compact
+    binary file holding a packed table of offsets and one blob of UTF-8
+    words. Loading it only maps the file into memory, so it is close to
+    instant however long the list is, and every process loading the same
+    index shares the same pages of the OS page cache. Picking k random words
+    then costs k offset lookups instead of a full parse of the wordlist.
+
+    File layout (all integers little-endian):
+        - magic (4 bytes): b'WLIX'
+        - version (uint32)
+        - count (uint64): the amount of words
+        - offsets ((count + 1) * uint64): where each word starts in the blob,
+          followed by the length of the blob
+        - blob: every word UTF-8 encoded, back to back
+"""
+
+################################################################################
+## Imports
+################################################################################
+
+from array import array
+import mmap
+import os
+import struct
+import sys
+
+
+
+################################################################################
+## Module Constants
+################################################################################
+
+MAGIC = b'WLIX'
+VERSION = 1
+EXTENSION = '.wlx'
+_HEADER = struct.Struct('<4sIQ')
+
+
+
+################################################################################
+## Module Functions
+################################################################################
+
+def is_index(file_path):
+    """ Checks if a file path leads to a compiled wordlist index
+
+    Args:
+        file_path (str): a path to a file that may be an index
+
+    Returns:
+        bool: True if the file starts with the index magic bytes
+    """
+    try:
+        with open(file_path, 'rb') as file:
+            return file.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+def write_index(words, dst):
+    """ Compiles an iterable of words into an index file at 'dst'
+
+    The words are streamed into a temporary blob so memory only grows with
+    the offsets table, and the index gets swapped into place atomically so
+    processes mapping an older version of 'dst' are never disturbed.
+
+    Args:
+        words (iterable of str): the words to store, in order
+        dst (str): the path of the index file to write
+
+    Returns:
+        int: the amount of words written
+    """
+    import shutil
+    import tempfile
+    offsets = array('Q', [0])
+    directory = os.path.dirname(os.path.abspath(dst))
+    with tempfile.TemporaryFile(dir=directory) as blob:
+        size = 0
+        for word in words:
+            data = word.encode('utf-8')
+            blob.write(data)
+            size += len(data)
+            offsets.append(size)
+        if sys.byteorder == 'big':
+            offsets.byteswap()
+        blob.seek(0)
+        # a name of its own, so concurrent compiles of 'dst' can't mix,
+        # readable like a file open() creates (mkstemp() makes it private)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        umask = os.umask(0)
+        os.umask(umask)
+        try:
+            with open(fd, 'wb') as out:
+                os.chmod(tmp_path, 0o666 & ~umask)
+                out.write(_HEADER.pack(MAGIC, VERSION, len(offsets) - 1))
+                out.write(offsets.tobytes())
+                shutil.copyfileobj(blob, out, 1 << 20)
+            os.replace(tmp_path, dst)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    return len(offsets) - 1
+
+
+
+################################################################################
+## Module Classes
+################################################################################
+
+class WordIndex(object):
+    """ A read-only, list-like view of a memory-mapped wordlist index
+
+    Attributes:
+        path: the path of the index file
+        count: the amount of words in the index
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            self._map.close()
+            raise ValueError("{} is not a version {} wordlist index".format(
+                path, VERSION))
+        self.count = count
+        start = _HEADER.size
+        self._blob = start + 8 * (count + 1)
+        if sys.byteorder == 'little':
+            self._offsets = memoryview(self._map)[start:self._blob].cast('Q')
+        else:
+            self._offsets = _BigEndianOffsets(self._map, start, count + 1)
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self.count))]
+        if i < 0:
+            i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError("wordlist index out of range")
+        offsets = self._offsets
+        return str(self._map[self._blob + offsets[i]:self._blob + offsets[i + 1]],
+                'utf-8')
+
+    def __iter__(self):
+        for i in range(self.count):
+            yield self[i]
+
+    def close(self):
+        """ Releases the memory map of the index
+        """
+        if isinstance(self._offsets, memoryview):
+            self._offsets.release()
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class _BigEndianOffsets(object):
+    """ Offsets table accessor for hosts whose native byte order is big-endian
+    """
+    def __init__(self, buf, start, count):
+        self._buf = buf
+        self._start = start
+        self._count = count
+
+    def __getitem__(self, i):
+        return struct.unpack_from('<Q', self._buf, self._start + 8 * i)[0]
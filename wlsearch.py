@@ -0,0 +1,436 @@
+#!/usr/bin/env python
+""" Search indices over wordlists, for exact, prefix & substring lookups
+    that stay sub-millisecond on lists of millions of words.
+
+    Every word gets folded into a search key (casefolded, unless the index
+    is case sensitive) and the keys are kept sorted, so exact and prefix
+    matches are a pair of binary searches. Substring matches go through a
+    trigram index: every key is padded with a NUL on both ends and each of
+    its distinct trigrams maps to the sorted positions of the keys holding
+    it. A query only has to check the keys listed under its rarest trigram,
+    and queries shorter than a trigram merge the lists of every trigram
+    they're part of, which the padding makes cover even one letter words.
+
+    An index is built once (see WordSearch.build()) and can be saved to a
+    file that later loads as a memory map, close to instant however long the
+    list is, like a wlindex file. Saving is opt-in: open_search() keeps the
+    indices of wordlists in a cache directory it is given, never next to
+    the wordlists, and records the identity (size, modification time in ns
+    & inode) of the wordlist each was built from, so an index of a changed
+    wordlist gets rebuilt even when its modification time looks the same.
+
+    File layout (all integers little-endian):
+        - magic (4 bytes): b'WLSX'
+        - version (uint32)
+        - flags (uint32): bit 0 set for case sensitive indices
+        - count (uint64): the amount of words
+        - grams (uint64): the amount of distinct trigrams
+        - source size (uint64), source mtime_ns (int64) & source inode
+          (uint64): the identity of the wordlist built from, all 0 if none
+        - order (count * uint32): the word index of each sorted key
+        - key offsets ((count + 1) * uint64): where each sorted key starts in
+          the key blob, followed by the length of the blob
+        - key blob: every sorted key UTF-8 encoded, back to back
+        - trigrams (grams * uint64): every distinct trigram, packed as three
+          21 bit code points, in ascending order
+        - posting offsets ((grams + 1) * uint64): where the postings of each
+          trigram start, followed by the amount of postings
+        - postings (uint32): the sorted key positions holding each trigram
+"""
+
+################################################################################
+## Imports
+################################################################################
+
+from array import array
+from bisect import bisect_left
+import mmap
+import hashlib
+import os
+import struct
+import sys
+import tempfile
+
+
+
+################################################################################
+## Module Constants
+################################################################################
+
+MAGIC = b'WLSX'
+VERSION = 2
+EXTENSION = '.wls'
+MATCHES = ('exact', 'prefix', 'substring')
+FLAG_CASE_SENSITIVE = 1
+_HEADER = struct.Struct('<4sIIQQQqQ')
+
+# pads both ends of every key so short words & queries still have trigrams
+_PAD = '\x00'
+_GRAM = 3
+_CODE_BITS = 21
+_CODE_MASK = (1 << _CODE_BITS) - 1
+
+
+
+################################################################################
+## Module Functions
+################################################################################
+
+def fold(word, case_sensitive=False):
+    """ Returns the search key of a word
+    """
+    return word if case_sensitive else word.casefold()
+
+def pack_gram(gram):
+    """ Packs a trigram into a single integer, ordered like the trigrams
+    """
+    return (ord(gram[0]) << 2 * _CODE_BITS) | (ord(gram[1]) << _CODE_BITS) \
+            | ord(gram[2])
+
+def unpack_gram(code):
+    """ Unpacks an integer from pack_gram() back into its trigram
+    """
+    return chr(code >> 2 * _CODE_BITS) + chr((code >> _CODE_BITS) & _CODE_MASK) \
+            + chr(code & _CODE_MASK)
+
+def key_grams(key):
+    """ Returns the packed, distinct trigrams of a NUL padded search key
+    """
+    padded = _PAD + key + _PAD
+    return {pack_gram(padded[i:i + _GRAM]) for i in range(len(padded) - _GRAM + 1)}
+
+def _section(buf, start, code, count):
+    """ Views 'count' little-endian integers of an array 'code' in a buffer
+    """
+    end = start + count * array(code).itemsize
+    if sys.byteorder == 'little':
+        return memoryview(buf)[start:end].cast(code), end
+    values = array(code, buf[start:end])
+    values.byteswap()
+    return values, end
+
+def _little_endian(values):
+    """ Returns the bytes of an array in little-endian byte order
+    """
+    if sys.byteorder == 'big':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+def source_identity(file_path):
+    """ Returns what tells a wordlist file apart from an edited version of it
+
+    Returns:
+        (int, int, int): the size, modification time in ns & inode
+    """
+    stat = os.stat(file_path)
+    return (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+
+def search_path(file_path, index_dir):
+    """ Returns the path of the saved search index of a wordlist file in a
+    cache directory, named after the file & a digest of its real path
+    """
+    real_path = os.path.realpath(file_path)
+    digest = hashlib.sha256(real_path.encode('utf-8', 'surrogateescape'))
+    return os.path.join(index_dir, "{}-{}{}".format(os.path.basename(real_path),
+        digest.hexdigest()[:16], EXTENSION))
+
+def open_search(file_path, words, case_sensitive=False, index_dir=None):
+    """ Returns the search index of a wordlist file, loading the one saved
+    in 'index_dir' when it was built from the file as it is now, else
+    (re)building it & saving it there
+
+    Args:
+        file_path (str): the path of the wordlist file (or wlindex file)
+        words (callable): returns the words of the file when called, only
+            called if the index has to be built
+        case_sensitive (bool): whether to match the case of queries
+        index_dir (str): the cache directory of saved indices, created when
+            missing [default = None (build in memory, save nothing)]
+
+    Returns:
+        WordSearch: the memory-mapped search index, or the index built in
+            memory when there's no 'index_dir' or it can't be written to
+    """
+    source = source_identity(file_path)
+    if index_dir is None:
+        return WordSearch.build(words(), case_sensitive, source)
+    index_path = search_path(file_path, index_dir)
+    try:
+        search = WordSearch.load(index_path)
+    except (OSError, ValueError):
+        # missing, or of another version
+        search = None
+    if search is not None:
+        if search.source == source and search.case_sensitive == case_sensitive:
+            return search
+        search.close()
+    search = WordSearch.build(words(), case_sensitive, source)
+    try:
+        os.makedirs(index_dir, exist_ok=True)
+        search.save(index_path)
+    except OSError:
+        return search
+    return WordSearch.load(index_path)
+
+
+
+################################################################################
+## Module Classes
+################################################################################
+
+class WordSearch(object):
+    """ A search index over a list of words, see the module docstring
+
+    Every lookup returns the ascending indices of the matching words in the
+    list the index was built from.
+
+    Attributes:
+        count (int): the amount of indexed words
+        case_sensitive (bool): whether queries match the case of words
+        source ((int, int, int)): the identity of the wordlist file the
+            index was built from (see source_identity()), or None
+    """
+    def __init__(self, keys, order, grams, starts, postings, case_sensitive=False,
+            source=None):
+        self.count = len(keys)
+        self.case_sensitive = case_sensitive
+        self.source = source
+        self._keys = keys
+        self._order = order
+        self._grams = grams
+        self._starts = starts
+        self._postings = postings
+        self._map = None
+
+    @classmethod
+    def build(cls, words, case_sensitive=False, source=None):
+        """ Builds the index of an iterable of words in memory
+
+        Args:
+            words (iterable of str): the words to index, in order
+            case_sensitive (bool): whether queries match the case of words
+            source ((int, int, int)): the identity of the wordlist file the
+                words come from, saved along to tell when it changed
+
+        Returns:
+            WordSearch: the built index
+        """
+        folded = [fold(word, case_sensitive) for word in words]
+        if len(folded) >= 1 << 32:
+            raise ValueError("search indices hold at most 2**32 - 1 words")
+        order = array('I', sorted(range(len(folded)), key=folded.__getitem__))
+        keys = [folded[i] for i in order]
+        del folded
+        # key postings on the trigram strings, only distinct ones get packed
+        postings_of = {}
+        get = postings_of.get
+        for position, key in enumerate(keys):
+            padded = _PAD + key + _PAD
+            for gram in {padded[i:i + _GRAM] for i in range(len(padded) - 2)}:
+                postings = get(gram)
+                if postings is None:
+                    postings_of[gram] = array('I', [position])
+                else:
+                    postings.append(position)
+        grams = array('Q')
+        starts = array('Q', [0])
+        postings = array('I')
+        for gram in sorted(postings_of, key=pack_gram):
+            grams.append(pack_gram(gram))
+            postings += postings_of.pop(gram)
+            starts.append(len(postings))
+        return cls(keys, order, grams, starts, postings, case_sensitive, source)
+
+    @classmethod
+    def load(cls, path):
+        """ Memory maps a search index file saved by save()
+        """
+        with open(path, 'rb') as file:
+            buf = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(buf) < _HEADER.size:
+            buf.close()
+            raise ValueError("{} is not a search index".format(path))
+        magic, version, flags, count, grams, size, mtime_ns, ino = \
+                _HEADER.unpack_from(buf, 0)
+        if magic != MAGIC or version != VERSION:
+            buf.close()
+            raise ValueError("{} is not a version {} search index".format(
+                path, VERSION))
+        order, end = _section(buf, _HEADER.size, 'I', count)
+        offsets, blob = _section(buf, end, 'Q', count + 1)
+        keys = _KeyTable(buf, offsets, blob, count)
+        gram_codes, end = _section(buf, blob + offsets[count], 'Q', grams)
+        starts, end = _section(buf, end, 'Q', grams + 1)
+        postings, end = _section(buf, end, 'I', starts[grams])
+        search = cls(keys, order, gram_codes, starts, postings,
+                bool(flags & FLAG_CASE_SENSITIVE),
+                (size, mtime_ns, ino) if size or mtime_ns or ino else None)
+        search._map = buf
+        return search
+
+    def save(self, dst):
+        """ Writes the index to a file at 'dst', swapped into place atomically
+
+        Returns:
+            int: the amount of indexed words
+        """
+        # a name of its own, so concurrent saves of 'dst' can't mix,
+        # readable like a file open() creates (mkstemp() makes it private)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(dst)),
+                suffix='.tmp')
+        umask = os.umask(0)
+        os.umask(umask)
+        try:
+            with open(fd, 'wb') as out:
+                os.chmod(tmp_path, 0o666 & ~umask)
+                self._write(out)
+            os.replace(tmp_path, dst)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return self.count
+
+    def _write(self, out):
+        """ Writes the index in the file layout of the module docstring
+        """
+        out.write(_HEADER.pack(MAGIC, VERSION,
+            FLAG_CASE_SENSITIVE if self.case_sensitive else 0,
+            self.count, len(self._grams), *(self.source or (0, 0, 0))))
+        out.write(_little_endian(array('I', self._order)))
+        offsets = array('Q', [0])
+        blob = []
+        size = 0
+        for key in self._keys:
+            data = key.encode('utf-8')
+            blob.append(data)
+            size += len(data)
+            offsets.append(size)
+        out.write(_little_endian(offsets))
+        out.write(b''.join(blob))
+        del blob
+        out.write(_little_endian(array('Q', self._grams)))
+        out.write(_little_endian(array('Q', self._starts)))
+        out.write(_little_endian(array('I', self._postings)))
+
+    def __len__(self):
+        return self.count
+
+    def _indices(self, positions):
+        """ Maps sorted key positions to ascending word indices
+        """
+        order = self._order
+        return sorted(order[p] for p in positions)
+
+    def _key_range(self, low, high=None):
+        """ Returns the sorted key positions from 'low' up to (not incl.) 'high'
+        """
+        start = bisect_left(self._keys, low)
+        end = self.count if high is None else bisect_left(self._keys, high, start)
+        return range(start, end)
+
+    def _postings_of(self, gram):
+        """ Returns the postings of a packed trigram, empty if not indexed
+        """
+        i = bisect_left(self._grams, gram)
+        if i == len(self._grams) or self._grams[i] != gram:
+            return ()
+        return self._postings[self._starts[i]:self._starts[i + 1]]
+
+    def exact(self, word):
+        """ Returns the indices of the words equal to 'word'
+        """
+        key = fold(word, self.case_sensitive)
+        return self._indices(self._key_range(key, key + _PAD))
+
+    def prefix(self, prefix):
+        """ Returns the indices of the words starting with 'prefix'
+        """
+        key = fold(prefix, self.case_sensitive)
+        if not key:
+            return list(range(self.count))
+        # U+10FFFF sorts after any character a key continues the prefix with
+        return self._indices(self._key_range(key, key + chr(sys.maxunicode)))
+
+    def substring(self, fragment):
+        """ Returns the indices of the words containing 'fragment'
+        """
+        key = fold(fragment, self.case_sensitive)
+        if not key:
+            return list(range(self.count))
+        if _PAD in key:
+            # the padding would match every word, scan the keys instead
+            keys = self._keys
+            return self._indices(p for p in range(self.count) if key in keys[p])
+        if len(key) >= _GRAM:
+            grams = {pack_gram(key[i:i + _GRAM])
+                    for i in range(len(key) - _GRAM + 1)}
+            candidates = min((self._postings_of(gram) for gram in grams), key=len)
+            if len(key) == _GRAM:
+                return self._indices(candidates)
+            keys = self._keys
+            return self._indices(p for p in candidates if key in keys[p])
+        # too short for a trigram of its own, so merge every trigram holding it
+        positions = set()
+        for i, gram in enumerate(self._grams):
+            if key in unpack_gram(gram):
+                positions.update(self._postings[self._starts[i]:self._starts[i + 1]])
+        return self._indices(positions)
+
+    def search(self, query, match='substring'):
+        """ Returns the indices of the words matching 'query'
+
+        Args:
+            query (str): the word, prefix or fragment to look for
+            match (str): one of MATCHES [default = substring]
+
+        Returns:
+            [int]: the ascending indices of the matching words
+        """
+        if match not in MATCHES:
+            raise ValueError("unknown match '{}'".format(match))
+        return getattr(self, match)(query)
+
+    def __contains__(self, word):
+        key = fold(word, self.case_sensitive)
+        i = bisect_left(self._keys, key)
+        return i < self.count and self._keys[i] == key
+
+    def close(self):
+        """ Releases the memory map of a loaded index
+        """
+        if self._map is not None:
+            for view in (self._order, self._keys._offsets, self._grams,
+                    self._starts, self._postings):
+                if isinstance(view, memoryview):
+                    view.release()
+            self._map.close()
+            self._map = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class _KeyTable(object):
+    """ A read-only sequence of the sorted keys of a memory-mapped index
+    """
+    def __init__(self, buf, offsets, blob, count):
+        self._buf = buf
+        self._offsets = offsets
+        self._blob = blob
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, i):
+        offsets = self._offsets
+        return str(self._buf[self._blob + offsets[i]:self._blob + offsets[i + 1]],
+                'utf-8')
+
+    def __iter__(self):
+        for i in range(self._count):
+            yield self[i]